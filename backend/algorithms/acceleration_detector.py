@@ -4,13 +4,29 @@ Analyzes GPS speed data to detect acceleration patterns
 Classifies as Gentle/Moderate/Aggressive
 """
 
-# Acceleration thresholds (m/s²)
-GENTLE_THRESHOLD = 1.5
-MODERATE_THRESHOLD = 2.5
+import sys
+from pathlib import Path
+
+# Run as a script: add parent directory to path to import algorithms
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from algorithms.settings import current_settings
+
+# Acceleration thresholds (m/s²) live in settings (gentle_threshold, moderate_threshold)
 
 # Conversion constant
 KMH_TO_MS = 3.6  # Divide km/h by 3.6 to get m/s
 
+# Sample pairs at or below this acceleration (m/s²) are noise, not events
+EVENT_THRESHOLD = 0.1
+
+# Output detail levels for the analyzers
+DETAIL_SUMMARY = 'summary'  # Trip statistics + category per segment
+DETAIL_SEGMENT = 'segment'  # + per-segment statistics
+DETAIL_FULL = 'full'        # + per-event dicts (debugging / driver display)
+DETAIL_LEVELS = (DETAIL_SUMMARY, DETAIL_SEGMENT, DETAIL_FULL)
+
 
 def calculate_acceleration(speed_start_kmh, speed_end_kmh, time_delta_sec):
     """
@@ -49,14 +65,49 @@ def classify_acceleration(accel_ms2):
         str: 'GENTLE' | 'MODERATE' | 'AGGRESSIVE'
     """
     
-    if accel_ms2 < GENTLE_THRESHOLD:
+    settings = current_settings()
+    if accel_ms2 < settings.gentle_threshold:
         return "GENTLE"
-    elif accel_ms2 < MODERATE_THRESHOLD:
+    elif accel_ms2 < settings.moderate_threshold:
         return "MODERATE"
     else:
         return "AGGRESSIVE"
 
 
+def dominant_segment_category(gentle, moderate, aggressive):
+    """
+    Dominant acceleration category of a segment from its event counts
+    
+    Any aggressive event marks the segment aggressive.
+    """
+    
+    if aggressive > 0:
+        return 'AGGRESSIVE'
+    elif moderate > gentle:
+        return 'MODERATE'
+    else:
+        return 'GENTLE'
+
+
+def dominant_trip_pattern(gentle, moderate, aggressive):
+    """
+    Dominant acceleration pattern of a trip from its event counts
+    
+    Aggressive if >30% of events are aggressive, moderate if >50% moderate.
+    """
+    
+    total = gentle + moderate + aggressive
+    if total == 0:
+        return 'GENTLE'
+    
+    if (aggressive / total) * 100 > 30:
+        return 'AGGRESSIVE'
+    elif (moderate / total) * 100 > 50:
+        return 'MODERATE'
+    else:
+        return 'GENTLE'
+
+
 def detect_acceleration_events(speed_data):
     """
     Detect all acceleration events from speed time-series data
@@ -90,7 +141,7 @@ def detect_acceleration_events(speed_data):
         )
         
         # Only track positive accelerations (speeding up, not braking)
-        if accel > 0.1:  # Threshold to filter out noise
+        if accel > EVENT_THRESHOLD:
             event = {
                 'start_time': current['timestamp'],
                 'end_time': next_sample['timestamp'],
@@ -105,18 +156,175 @@ def detect_acceleration_events(speed_data):
     return events
 
 
-def analyze_segment_acceleration(speed_data, segment_id):
+def _new_stats():
+    """Running event statistics for one trip or segment"""
+    return {
+        'samples': 0, 'events': 0, 'accel_sum': 0.0, 'accel_max': 0.0,
+        'GENTLE': 0, 'MODERATE': 0, 'AGGRESSIVE': 0
+    }
+
+
+def _add_sample_pair(stats, current, next_sample):
+    """
+    Fold one sample pair into running statistics without building an event
+    
+    Mirrors detect_acceleration_events: same noise gate, same rounding.
+    
+    Returns:
+        float: The event's rounded acceleration, None if the pair is no event
+    """
+    
+    time_delta = next_sample['timestamp'] - current['timestamp']
+    
+    if time_delta <= 0:
+        return None
+    
+    accel = calculate_acceleration(current['speed_kmh'], next_sample['speed_kmh'], time_delta)
+    
+    if accel > EVENT_THRESHOLD:
+        rounded = round(accel, 2)
+        stats['events'] += 1
+        stats['accel_sum'] += rounded
+        if rounded > stats['accel_max']:
+            stats['accel_max'] = rounded
+        stats[classify_acceleration(accel)] += 1
+        return rounded
+    return None
+
+
+def _segment_result(segment_id, stats, detail, events=None):
+    """Segment analysis dict from running statistics at a detail level"""
+    
+    if stats['samples'] < 2:
+        result = {
+            'segment_id': segment_id,
+            'category': 'UNKNOWN',
+            'avg_acceleration': 0,
+            'max_acceleration': 0
+        }
+    elif stats['events'] == 0:
+        result = {
+            'segment_id': segment_id,
+            'category': 'GENTLE',
+            'avg_acceleration': 0,
+            'max_acceleration': 0
+        }
+    else:
+        gentle, moderate, aggressive = stats['GENTLE'], stats['MODERATE'], stats['AGGRESSIVE']
+        result = {
+            'segment_id': segment_id,
+            'category': dominant_segment_category(gentle, moderate, aggressive),
+            'avg_acceleration': round(stats['accel_sum'] / stats['events'], 2),
+            'max_acceleration': round(stats['accel_max'], 2),
+            'total_events': stats['events'],
+            'gentle_count': gentle,
+            'moderate_count': moderate,
+            'aggressive_count': aggressive
+        }
+    
+    if detail == DETAIL_SUMMARY:
+        return {'segment_id': segment_id, 'category': result['category']}
+    
+    if detail == DETAIL_FULL:
+        result['acceleration_events'] = events or []
+    
+    return result
+
+
+def _scan_segment_stats(speed_data, num_segments, quality=None, accel_sink=None):
+    """
+    Trip and per-segment statistics in a single pass over the samples
+    
+    Segment pairs are consecutive samples of the same segment, exactly as
+    if speed_data were filtered per segment first. With quality given as
+    (issue counts, limits), data-quality issues are tallied in the same pass;
+    with accel_sink, every trip event is appended as (segment, accel, None).
+    
+    Returns:
+        tuple: (trip stats, list of segment stats)
+    """
+    
+    trip_stats = _new_stats()
+    segment_stats = [_new_stats() for _ in range(num_segments)]
+    last_by_segment = {}
+    previous = None
+    
+    # Data-quality checks, inlined: same counts as trip_validator.check_sample_columns
+    if quality is not None:
+        counts, limits = quality
+        max_speed, max_gap, max_accel = limits['max_speed_kmh'], limits['max_gap_sec'], limits['max_accel_ms2']
+    
+    for sample in speed_data:
+        if quality is not None:
+            speed = sample['speed_kmh']
+            if not 0 <= speed <= max_speed:
+                counts['impossible_speed'] += 1
+            if previous is not None:
+                time_delta = sample['timestamp'] - previous['timestamp']
+                if time_delta > 0:
+                    if time_delta > max_gap:
+                        counts['gps_gap'] += 1
+                    if abs((speed - previous['speed_kmh']) / KMH_TO_MS / time_delta) > max_accel:
+                        counts['impossible_acceleration'] += 1
+                elif sample.get('segment', 0) == previous.get('segment', 0):
+                    # Clock restarts at segment boundaries are expected
+                    counts['duplicate_timestamp' if time_delta == 0 else 'out_of_order'] += 1
+        
+        if previous is not None:
+            accel = _add_sample_pair(trip_stats, previous, sample)
+            if accel is not None and accel_sink is not None:
+                accel_sink.append((previous.get('segment', 0), accel, None))
+        previous = sample
+        
+        seg_id = sample.get('segment')
+        if seg_id is None or not 0 <= seg_id < num_segments:
+            continue
+        
+        stats = segment_stats[seg_id]
+        stats['samples'] += 1
+        if seg_id in last_by_segment:
+            _add_sample_pair(stats, last_by_segment[seg_id], sample)
+        last_by_segment[seg_id] = sample
+    
+    return trip_stats, segment_stats
+
+
+def analyze_segment_acceleration(speed_data, segment_id, event_detector=detect_acceleration_events,
+                                 detail=DETAIL_FULL):
     """
     Analyze acceleration pattern for a specific segment
     
     Args:
         speed_data (list): Speed samples for the trip
         segment_id (int): Segment number to analyze
+        event_detector (callable): Turns speed samples into acceleration events
+            (e.g. gps_filter.make_event_detector() for noisy GPS)
+        detail (str): DETAIL_SUMMARY | DETAIL_SEGMENT | DETAIL_FULL; below
+            DETAIL_FULL no event dicts are built with the default detector
     
     Returns:
         dict: Acceleration analysis for the segment
     """
     
+    if detail != DETAIL_FULL and event_detector is detect_acceleration_events:
+        _, segment_stats = _scan_segment_stats(
+            [s for s in speed_data if s.get('segment') == segment_id], segment_id + 1
+        )
+        return _segment_result(segment_id, segment_stats[segment_id], detail)
+    
+    result = _segment_from_events(speed_data, segment_id, event_detector)
+    
+    if detail == DETAIL_SUMMARY:
+        return {'segment_id': segment_id, 'category': result['category']}
+    if detail == DETAIL_SEGMENT:
+        del result['acceleration_events']
+    
+    return result
+
+
+def _segment_from_events(speed_data, segment_id, event_detector):
+    """Segment analysis built from detected event dicts (DETAIL_FULL shape)"""
+    
     # Filter speed data for this segment
     segment_speeds = [s for s in speed_data if s.get('segment') == segment_id]
     
@@ -130,7 +338,7 @@ def analyze_segment_acceleration(speed_data, segment_id):
         }
     
     # Detect acceleration events in this segment
-    events = detect_acceleration_events(segment_speeds)
+    events = event_detector(segment_speeds)
     
     if not events:
         return {
@@ -152,12 +360,7 @@ def analyze_segment_acceleration(speed_data, segment_id):
     aggressive = sum(1 for e in events if e['category'] == 'AGGRESSIVE')
     
     # Determine dominant category for segment
-    if aggressive > 0:
-        dominant_category = 'AGGRESSIVE'
-    elif moderate > gentle:
-        dominant_category = 'MODERATE'
-    else:
-        dominant_category = 'GENTLE'
+    dominant_category = dominant_segment_category(gentle, moderate, aggressive)
     
     return {
         'segment_id': segment_id,
@@ -172,28 +375,100 @@ def analyze_segment_acceleration(speed_data, segment_id):
     }
 
 
-def analyze_trip_acceleration(trip_data):
+def _summarize_trip_stats(trip_data, speed_data, detail, quality=None, accel_sink=None):
+    """Trip analysis from a single statistics pass (no event dicts)"""
+    
+    num_segments = max(len(trip_data.get('passenger_events', [])) - 1, 0)
+    trip_stats, segment_stats = _scan_segment_stats(speed_data, num_segments, quality, accel_sink)
+    
+    if trip_stats['events'] == 0:
+        return {
+            'trip_id': trip_data['trip_id'],
+            'dominant_pattern': 'GENTLE',
+            'avg_acceleration': 0,
+            'max_acceleration': 0,
+            'total_events': 0
+        }
+    
+    total = trip_stats['events']
+    gentle, moderate, aggressive = (
+        trip_stats['GENTLE'], trip_stats['MODERATE'], trip_stats['AGGRESSIVE']
+    )
+    
+    return {
+        'trip_id': trip_data['trip_id'],
+        'dominant_pattern': dominant_trip_pattern(gentle, moderate, aggressive),
+        'avg_acceleration': round(trip_stats['accel_sum'] / total, 2),
+        'max_acceleration': round(trip_stats['accel_max'], 2),
+        'total_events': total,
+        'gentle_count': gentle,
+        'gentle_percentage': round((gentle / total) * 100, 1),
+        'moderate_count': moderate,
+        'moderate_percentage': round((moderate / total) * 100, 1),
+        'aggressive_count': aggressive,
+        'aggressive_percentage': round((aggressive / total) * 100, 1),
+        'segments': [
+            _segment_result(seg_id, stats, detail)
+            for seg_id, stats in enumerate(segment_stats)
+        ]
+    }
+
+
+def analyze_trip_acceleration(trip_data, event_detector=detect_acceleration_events,
+                              detail=DETAIL_FULL, quality_counts=None, quality_limits=None,
+                              accel_sink=None):
     """
     Complete acceleration analysis for entire trip
     
     Args:
         trip_data (dict): Trip data with speed_data
+        event_detector (callable): Turns speed samples into acceleration events
+        detail (str): DETAIL_SUMMARY (category per segment), DETAIL_SEGMENT
+            (segment statistics) or DETAIL_FULL (also per-event dicts).
+            Below DETAIL_FULL the default detector never allocates events.
+        quality_counts (dict): Issue counter (trip_validator.new_issue_counts)
+            to tally data-quality issues into while scanning the samples
+        quality_limits (dict): Limits for the quality checks
+            (trip_validator.QUALITY_LIMITS); required with quality_counts
+        accel_sink (list): Receives (segment, acceleration_ms2, None) for
+            every trip-level event, e.g. for distribution_sketches
     
     Returns:
         dict: Complete acceleration analysis
     """
     
+    if detail not in DETAIL_LEVELS:
+        raise ValueError(f"Unknown detail level: {detail} (expected one of {DETAIL_LEVELS})")
+    
+    quality = None
+    if quality_counts is not None:
+        if quality_limits is None:
+            raise ValueError("quality_limits are required to tally quality_counts")
+        quality = (quality_counts, quality_limits)
+    
     speed_data = trip_data.get('speed_data', [])
     
     if not speed_data:
+        if quality is not None:
+            quality_counts['missing_data'] += 1
         return {
             'trip_id': trip_data['trip_id'],
             'dominant_pattern': 'UNKNOWN',
             'error': 'No speed data available'
         }
     
+    if detail != DETAIL_FULL and event_detector is detect_acceleration_events:
+        return _summarize_trip_stats(trip_data, speed_data, detail, quality, accel_sink)
+    
+    # Custom detectors and full detail build events; the statistics pass
+    # (no segments) still does the checks for this debugging path
+    if quality is not None:
+        _scan_segment_stats(speed_data, 0, quality)
+    
     # Detect all acceleration events
-    all_events = detect_acceleration_events(speed_data)
+    all_events = event_detector(speed_data)
+    if accel_sink is not None:
+        accel_sink.extend((e['segment'], e['acceleration_ms2'], None) for e in all_events)
     
     if not all_events:
         return {
@@ -216,22 +491,14 @@ def analyze_trip_acceleration(trip_data):
     
     # Determine dominant pattern
     total = len(all_events)
-    aggressive_pct = (aggressive / total) * 100
-    moderate_pct = (moderate / total) * 100
-    
-    if aggressive_pct > 30:  # >30% aggressive events
-        dominant = 'AGGRESSIVE'
-    elif moderate_pct > 50:
-        dominant = 'MODERATE'
-    else:
-        dominant = 'GENTLE'
+    dominant = dominant_trip_pattern(gentle, moderate, aggressive)
     
     # Analyze by segment
     num_segments = len(trip_data.get('passenger_events', [])) - 1
     segment_analyses = []
     
     for seg_id in range(num_segments):
-        seg_analysis = analyze_segment_acceleration(speed_data, seg_id)
+        seg_analysis = analyze_segment_acceleration(speed_data, seg_id, event_detector, detail)
         segment_analyses.append(seg_analysis)
     
     return {
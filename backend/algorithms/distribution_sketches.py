@@ -0,0 +1,274 @@
+"""
+Distribution Sketches
+Mergeable quantile sketches (KLL) for acceleration, fuel rate and trip waste
+per driver, route and load category, so p50/p95/p99 need no event lists
+"""
+
+import bisect
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+# Run as a script: add parent directory to path to import algorithms
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+# Compactor size of the top level; rank error is about 1.7 / SKETCH_K
+SKETCH_K = 200
+
+# Quantiles reported for each sketch
+REPORTED_QUANTILES = {'p50': 0.50, 'p90': 0.90, 'p95': 0.95, 'p99': 0.99}
+
+METRICS = ('acceleration_ms2', 'fuel_rate_per_km', 'trip_waste_liters')
+
+
+class QuantileSketch:
+    """
+    KLL quantile sketch: fixed memory, mergeable, about 1% rank error at k=200
+
+    Values are kept in compactors; level h holds values of weight 2**h.
+    A full level is sorted and every other value (random offset) moves up
+    a level, so total weight always equals the number of values added.
+    """
+
+    def __init__(self, k=SKETCH_K, seed=0):
+        self.k = k
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._rng = random.Random(seed)
+        self._levels = [[]]
+        self._size = 0
+        self._max_size = self._capacity(0)
+
+    def _capacity(self, level):
+        depth = len(self._levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _grow(self):
+        self._levels.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self._levels)))
+
+    def _compress(self):
+        for h, level in enumerate(self._levels):
+            if len(level) < self._capacity(h):
+                continue
+            if h + 1 == len(self._levels):
+                self._grow()
+            level.sort()
+            # An odd value stays behind so promoted pairs keep weight exact
+            kept = [level.pop()] if len(level) % 2 else []
+            self._levels[h + 1].extend(level[self._rng.random() < 0.5::2])
+            self._levels[h] = kept
+            self._size = sum(len(values) for values in self._levels)
+            if self._size < self._max_size:
+                break
+
+    def add(self, value):
+        """Add one value; amortized O(log k)"""
+        self._levels[0].append(value)
+        self.count += 1
+        self._size += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if self._size >= self._max_size:
+            self._compress()
+
+    def merge(self, other):
+        """Fold another sketch into this one"""
+
+        while len(self._levels) < len(other._levels):
+            self._grow()
+        for h, values in enumerate(other._levels):
+            self._levels[h].extend(values)
+
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._size = sum(len(values) for values in self._levels)
+        while self._size >= self._max_size:
+            self._compress()
+        return self
+
+    def quantiles(self, qs):
+        """
+        Approximate quantiles
+
+        Args:
+            qs (iterable): Quantiles in [0, 1]
+
+        Returns:
+            list: One value per quantile (None for an empty sketch)
+        """
+
+        if self.count == 0:
+            return [None for _ in qs]
+
+        weighted = sorted(
+            (value, 1 << h) for h, values in enumerate(self._levels) for value in values
+        )
+        results = []
+        for q in qs:
+            target = q * self.count
+            cumulative = 0
+            for value, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    break
+            results.append(value)
+        return results
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+    def summary(self):
+        """{'count', 'min', 'p50', 'p90', 'p95', 'p99', 'max'} rounded to 3 dp"""
+
+        if self.count == 0:
+            return {'count': 0}
+        values = self.quantiles(REPORTED_QUANTILES.values())
+        return {
+            'count': self.count,
+            'min': round(self.min, 3),
+            **{name: round(value, 3) for name, value in zip(REPORTED_QUANTILES, values)},
+            'max': round(self.max, 3)
+        }
+
+
+class FleetDistributions:
+    """
+    Quantile sketches of each metric for the fleet and per driver, route
+    and load category
+
+    - acceleration_ms2: every event the run's acceleration analyzer counted
+      (load = the event's own load when the analyzer knows it, else its
+      segment's load)
+    - fuel_rate_per_km: every segment's estimated fuel rate
+    - trip_waste_liters: every trip's wasted fuel (load = dominant load)
+
+    Memory is fixed per sketch; the number of sketches grows only with the
+    number of drivers and routes.
+    """
+
+    def __init__(self, k=SKETCH_K):
+        self.k = k
+        self.sketches = {}
+
+    def _sketch(self, metric, dimension, key):
+        sketch = self.sketches.get((metric, dimension, key))
+        if sketch is None:
+            sketch = self.sketches[(metric, dimension, key)] = QuantileSketch(self.k)
+        return sketch
+
+    def _add(self, metric, value, route, driver, load):
+        self._sketch(metric, 'fleet', 'all').add(value)
+        self._sketch(metric, 'by_route', route).add(value)
+        self._sketch(metric, 'by_driver', driver).add(value)
+        self._sketch(metric, 'by_load_category', load).add(value)
+
+    def add_trip(self, result, accelerations=()):
+        """
+        Account one trip
+
+        Args:
+            result (dict): Processed trip (output of process_single_trip)
+            accelerations (iterable): (segment, acceleration_ms2, load category
+                or None) per event, as the analyzer's accel_sink received them
+        """
+
+        fuel = result.get('fuel', {})
+        if 'segments' not in fuel:
+            return
+
+        route = result.get('route')
+        driver = result.get('driver_id')
+        segment_loads = [segment['load_category'] for segment in result['load'].get('segments', [])]
+        dominant_load = result['load']['dominant_load_category']
+
+        for segment, accel, load in accelerations:
+            if load is None:
+                load = segment_loads[segment] if 0 <= segment < len(segment_loads) else dominant_load
+            self._add('acceleration_ms2', accel, route, driver, load)
+
+        for segment in fuel['segments']:
+            self._add('fuel_rate_per_km', segment['fuel_rate_per_km'], route, driver, segment['load_category'])
+
+        self._add('trip_waste_liters', fuel['wasted_fuel_liters'], route, driver, dominant_load)
+
+    def merge(self, other):
+        """Fold another worker's sketches into this one"""
+
+        for key, sketch in other.sketches.items():
+            mine = self.sketches.get(key)
+            if mine is None:
+                self.sketches[key] = sketch
+            else:
+                mine.merge(sketch)
+        return self
+
+    def to_dict(self):
+        """
+        Summaries for the fleet stats:
+        {metric: {'fleet': summary, 'by_route': {route: summary}, ...}}
+        """
+
+        result = {metric: {} for metric in METRICS}
+        for (metric, dimension, key), sketch in sorted(self.sketches.items()):
+            if dimension == 'fleet':
+                result[metric]['fleet'] = sketch.summary()
+            else:
+                result[metric].setdefault(dimension, {})[key] = sketch.summary()
+        return result
+
+
+# Test function
+def test_sketches():
+    """Sketch quantiles against exact ones, for one stream and merged workers"""
+
+    print("🧪 Testing Distribution Sketches\n")
+
+    rng = random.Random(41)
+    values = [rng.lognormvariate(0, 0.6) for _ in range(1_000_000)]
+    exact_sorted = sorted(values)
+
+    def rank_error(sketch):
+        worst = 0.0
+        for q in REPORTED_QUANTILES.values():
+            estimate = sketch.quantile(q)
+            rank = bisect.bisect_right(exact_sorted, estimate)
+            worst = max(worst, abs(rank / len(values) - q))
+        return worst
+
+    # Test 1: One stream
+    print(f"Test 1: {len(values):,} values, k={SKETCH_K}")
+    start = time.perf_counter()
+    sketch = QuantileSketch()
+    for value in values:
+        sketch.add(value)
+    elapsed = time.perf_counter() - start
+    retained = sum(len(level) for level in sketch._levels)
+    print(f"  {len(values) / elapsed:,.0f} values/s, {retained} values retained")
+    print(f"  Max rank error over p50..p99: {rank_error(sketch):.4f}")
+    print(f"  p99 sketch {sketch.quantile(0.99):.3f} vs exact {exact_sorted[int(0.99 * len(values)) - 1]:.3f}")
+    print()
+
+    # Test 2: Eight workers merged
+    print("Test 2: 8 workers merged")
+    workers = [QuantileSketch(seed=i) for i in range(8)]
+    for i, value in enumerate(values):
+        workers[i % 8].add(value)
+    merged = workers[0]
+    for worker in workers[1:]:
+        merged.merge(worker)
+    print(f"  Count {merged.count:,}, max rank error {rank_error(merged):.4f}")
+    print(f"  Summary: {merged.summary()}")
+
+    print("\n✅ Distribution Sketches Test Complete!")
+
+
+if __name__ == "__main__":
+    test_sketches()
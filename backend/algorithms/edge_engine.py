@@ -0,0 +1,595 @@
+"""
+Edge Engine
+Dependency-free load tracking, acceleration detection and fuel estimation
+for onboard units: integer fixed-point arithmetic (speeds in 0.1 km/h, time
+in ms, fuel in mL, distances in m) over buffers preallocated once per engine,
+so streaming a sample builds no containers
+"""
+
+import sys
+from array import array
+from pathlib import Path
+
+# Run as a script: add parent directory to path to import algorithms (server-side helpers only)
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+# Fixed-point units on the device
+SPEED_SCALE = 10       # Speeds in 0.1 km/h
+TIME_SCALE = 1000      # Timestamps in ms
+MILLI = 1000           # Thresholds in mm/s², fuel rates in mL/km, distances in m
+
+# accel (mm/s²) = Δspeed (0.1 km/h) × ACCEL_NUMERATOR / (ACCEL_DENOMINATOR × Δt (ms)),
+# the fixed-point form of acceleration_detector's km/h ÷ KMH_TO_MS
+ACCEL_NUMERATOR = 1_000_000
+ACCEL_DENOMINATOR = 36
+
+# Noise gate of the sample-pair detector (mm/s²)
+NOISE_GATE_MILLI = 100
+
+LOAD_NAMES = ('LIGHT', 'MEDIUM', 'HEAVY')
+ACCEL_NAMES = ('GENTLE', 'MODERATE', 'AGGRESSIVE', 'UNKNOWN')
+UNKNOWN = 3
+
+# Running statistics per slot (slot 0 the trip, slot s + 1 segment s)
+SAMPLES, EVENTS, GENTLE, MODERATE, AGGRESSIVE, ACCEL_SUM, ACCEL_MAX = range(7)
+STRIDE = 7
+
+DEFAULT_MAX_SEGMENTS = 64  # Longest route the buffers are sized for
+DEFAULT_RING_SIZE = 32     # Recent acceleration events kept for the driver display
+
+
+def edge_tables(settings=None):
+    """
+    Integer lookup tables for the edge engine from a settings version
+
+    Built server-side and shipped to the device as JSON; the engine needs
+    nothing else. Thresholds are quantized to mm/s² and fuel rates to mL/km
+    (exact for settings with up to 3 decimals).
+
+    Args:
+        settings (Settings): Settings version (default: current_settings())
+
+    Returns:
+        dict: Passenger thresholds, acceleration thresholds (mm/s²) and fuel
+            rates (mL/km, LOAD_NAMES × ACCEL_NAMES flattened, UNKNOWN at baseline)
+    """
+
+    if settings is None:
+        from algorithms.settings import current_settings
+        settings = current_settings()
+
+    fuel_rates = []
+    for load in LOAD_NAMES:
+        for accel in ACCEL_NAMES[:UNKNOWN]:
+            fuel_rates.append(round(settings.fuel_rates[load][accel] * MILLI))
+        fuel_rates.append(round(settings.baseline_fuel_rates[load] * MILLI))
+
+    return {
+        'version': settings.version,
+        'light_threshold': settings.light_threshold,
+        'medium_threshold': settings.medium_threshold,
+        'gentle_threshold_milli': round(settings.gentle_threshold * MILLI),
+        'moderate_threshold_milli': round(settings.moderate_threshold * MILLI),
+        'fuel_ml_per_km': fuel_rates
+    }
+
+
+def _div_round(numerator, denominator):
+    """numerator / denominator rounded half to even, as round() does (denominator > 0)"""
+    quotient, remainder = divmod(numerator, denominator)
+    twice = remainder * 2
+    if twice > denominator or (twice == denominator and quotient & 1):
+        quotient += 1
+    return quotient
+
+
+def _segment_category(gentle, moderate, aggressive):
+    """Integer twin of acceleration_detector.dominant_segment_category"""
+    if aggressive > 0:
+        return 2
+    if moderate > gentle:
+        return 1
+    return 0
+
+
+class EdgeEngine:
+    """
+    Streaming trip analysis in fixed point
+
+    One engine per onboard unit, reused trip after trip: start_trip() resets
+    the preallocated buffers, push_stop() and push_sample() fold one reading
+    each into running counters, report() builds the uplink record.
+
+    Mirrors the statistics pass of acceleration_detector (trip pairs are
+    consecutive samples, segment pairs consecutive samples of one segment)
+    and fuel_estimator's per-segment rates, with exact integer comparisons
+    where the reference compares floats.
+    """
+
+    __slots__ = (
+        'tables', 'max_segments', '_gate', '_gentle', '_moderate', '_light', '_medium', '_rates',
+        '_stats', '_last_time', '_last_speed', '_has_last', '_distances', '_stop_loads',
+        '_ring', '_ring_size', '_ring_next', '_ring_count',
+        '_num_segments', '_num_stops', '_max_onboard',
+        '_previous_time', '_previous_speed', '_has_previous'
+    )
+
+    def __init__(self, tables, max_segments=DEFAULT_MAX_SEGMENTS, ring_size=DEFAULT_RING_SIZE):
+        self.tables = tables
+        self.max_segments = max_segments
+
+        # Thresholds pre-multiplied so a pair is classified by cross-multiplication
+        self._gate = NOISE_GATE_MILLI * ACCEL_DENOMINATOR
+        self._gentle = tables['gentle_threshold_milli'] * ACCEL_DENOMINATOR
+        self._moderate = tables['moderate_threshold_milli'] * ACCEL_DENOMINATOR
+        self._light = tables['light_threshold']
+        self._medium = tables['medium_threshold']
+        self._rates = array('i', tables['fuel_ml_per_km'])
+
+        self._stats = array('i', bytes(4 * STRIDE * (max_segments + 1)))
+        self._last_time = array('q', bytes(8 * max_segments))
+        self._last_speed = array('i', bytes(4 * max_segments))
+        self._has_last = array('b', bytes(max_segments))
+        self._distances = array('i', bytes(4 * max_segments))
+        self._stop_loads = array('b', bytes(max_segments + 1))
+
+        # Recent trip events: (start ms, accel in 0.01 m/s², category) per entry
+        self._ring = array('q', bytes(8 * 3 * ring_size))
+        self._ring_size = ring_size
+
+        self.start_trip(())
+
+    def start_trip(self, distances_m):
+        """
+        Reset every buffer for a new trip
+
+        Args:
+            distances_m (sequence): Segment distances in m, one per stop pair
+        """
+
+        num_segments = len(distances_m)
+        if num_segments > self.max_segments:
+            raise ValueError(f"Route has {num_segments} segments, engine sized for {self.max_segments}")
+
+        stats = self._stats
+        for i in range(len(stats)):
+            stats[i] = 0
+        for s in range(self.max_segments):
+            self._has_last[s] = 0
+            self._distances[s] = distances_m[s] if s < num_segments else 0
+
+        self._num_segments = num_segments
+        self._num_stops = 0
+        self._max_onboard = 0
+        self._ring_next = 0
+        self._ring_count = 0
+        self._previous_time = 0
+        self._previous_speed = 0
+        self._has_previous = False
+
+    def push_stop(self, onboard):
+        """
+        Passengers on board when leaving the next stop (the load of its segment)
+
+        Args:
+            onboard (int): Passenger count after boarding and alighting
+        """
+
+        if self._num_stops > self.max_segments:
+            raise ValueError(f"More than {self.max_segments + 1} stops in one trip")
+
+        if onboard <= self._light:
+            load = 0
+        elif onboard <= self._medium:
+            load = 1
+        else:
+            load = 2
+
+        self._stop_loads[self._num_stops] = load
+        self._num_stops += 1
+        if onboard > self._max_onboard:
+            self._max_onboard = onboard
+
+    def push_sample(self, time_ms, speed, segment):
+        """
+        Fold one GPS sample into the trip and segment statistics
+
+        Args:
+            time_ms (int): Timestamp in ms
+            speed (int): Speed in 0.1 km/h
+            segment (int): Segment index (out-of-range samples count for the trip only)
+        """
+
+        stats = self._stats
+        stats[SAMPLES] += 1
+
+        if self._has_previous:
+            time_delta = time_ms - self._previous_time
+            if time_delta > 0:
+                self._fold(0, speed - self._previous_speed, time_delta, self._previous_time)
+        self._previous_time = time_ms
+        self._previous_speed = speed
+        self._has_previous = True
+
+        if 0 <= segment < self._num_segments:
+            base = (segment + 1) * STRIDE
+            stats[base + SAMPLES] += 1
+            if self._has_last[segment]:
+                time_delta = time_ms - self._last_time[segment]
+                if time_delta > 0:
+                    self._fold(base, speed - self._last_speed[segment], time_delta, -1)
+            self._last_time[segment] = time_ms
+            self._last_speed[segment] = speed
+            self._has_last[segment] = 1
+
+    def _fold(self, base, speed_delta, time_delta, start_ms):
+        """One sample pair into the slot at base; trip events also enter the ring"""
+
+        scaled = speed_delta * ACCEL_NUMERATOR
+        if scaled <= self._gate * time_delta:
+            return
+
+        if scaled < self._gentle * time_delta:
+            category = 0
+        elif scaled < self._moderate * time_delta:
+            category = 1
+        else:
+            category = 2
+
+        # Acceleration in 0.01 m/s², rounded as the detector rounds each event
+        centi = _div_round(scaled, ACCEL_DENOMINATOR * 10 * time_delta)
+
+        stats = self._stats
+        stats[base + EVENTS] += 1
+        stats[base + GENTLE + category] += 1
+        stats[base + ACCEL_SUM] += centi
+        if centi > stats[base + ACCEL_MAX]:
+            stats[base + ACCEL_MAX] = centi
+
+        if start_ms >= 0:
+            ring = self._ring
+            slot = self._ring_next * 3
+            ring[slot] = start_ms
+            ring[slot + 1] = centi
+            ring[slot + 2] = category
+            self._ring_next = (self._ring_next + 1) % self._ring_size
+            if self._ring_count < self._ring_size:
+                self._ring_count += 1
+
+    def recent_events(self):
+        """
+        Latest trip acceleration events, oldest first
+
+        Returns:
+            list: (start ms, acceleration in 0.01 m/s², category name) tuples
+        """
+
+        ring = self._ring
+        first = (self._ring_next - self._ring_count) % self._ring_size
+        events = []
+        for k in range(self._ring_count):
+            slot = (first + k) % self._ring_size * 3
+            events.append((ring[slot], ring[slot + 1], ACCEL_NAMES[ring[slot + 2]]))
+        return events
+
+    def _slot(self, slot):
+        base = slot * STRIDE
+        return self._stats[base:base + STRIDE]
+
+    def report(self):
+        """
+        The trip in fixed-point units, for the uplink
+
+        Fuel covers the segments fuel_estimator charges: one per stop pair
+        the unit has both a load and a distance for.
+
+        Returns:
+            dict: Integer-only trip record (see edge_analysis for reference units)
+        """
+
+        samples, events, gentle, moderate, aggressive, accel_sum, accel_max = self._slot(0)
+        stop_loads = self._stop_loads[:self._num_stops]
+
+        segments = []
+        fuel_ml = optimal_ml = distance_m = 0
+        for s in range(self._num_segments):
+            seg_samples, seg_events, seg_gentle, seg_moderate, seg_aggressive, seg_sum, seg_max = self._slot(s + 1)
+            if seg_samples < 2:
+                category = UNKNOWN
+            elif seg_events == 0:
+                category = 0
+            else:
+                category = _segment_category(seg_gentle, seg_moderate, seg_aggressive)
+
+            segment = {
+                'samples': seg_samples, 'events': seg_events,
+                'counts': [seg_gentle, seg_moderate, seg_aggressive],
+                'accel_sum_centi': seg_sum, 'accel_max_centi': seg_max,
+                'category': category
+            }
+
+            if s + 1 < self._num_stops:
+                load = stop_loads[s]
+                distance = self._distances[s]
+                segment['load'] = load
+                segment['distance_m'] = distance
+                segment['fuel_ml'] = _div_round(self._rates[load * 4 + category] * distance, MILLI)
+                segment['optimal_ml'] = _div_round(self._rates[load * 4 + UNKNOWN] * distance, MILLI)
+                fuel_ml += segment['fuel_ml']
+                optimal_ml += segment['optimal_ml']
+                distance_m += distance
+
+            segments.append(segment)
+
+        return {
+            'stops': self._num_stops,
+            'max_onboard': self._max_onboard,
+            'stop_load_counts': [stop_loads.count(load) for load in range(len(LOAD_NAMES))],
+            'samples': samples,
+            'events': events,
+            'counts': [gentle, moderate, aggressive],
+            'accel_sum_centi': accel_sum,
+            'accel_max_centi': accel_max,
+            'distance_m': distance_m,
+            'fuel_ml': fuel_ml,
+            'optimal_ml': optimal_ml,
+            'segments': segments
+        }
+
+    def footprint_bytes(self):
+        """Memory held by the engine and its buffers"""
+        return sys.getsizeof(self) + sum(sys.getsizeof(buffer) for buffer in (
+            self._rates, self._stats, self._last_time, self._last_speed, self._has_last,
+            self._distances, self._stop_loads, self._ring
+        ))
+
+
+def edge_analysis(report):
+    """
+    An edge report in the reference algorithms' units and field names
+
+    Server-side: the shared fields of analyze_trip_load, the statistics
+    pass of analyze_trip_acceleration (DETAIL_SUMMARY segments) and
+    estimate_trip_fuel, with the same dominant-pattern rules and errors.
+
+    Args:
+        report (dict): EdgeEngine.report() output
+
+    Returns:
+        dict: {'load', 'acceleration', 'fuel'}
+    """
+
+    from algorithms.acceleration_detector import dominant_trip_pattern
+
+    stops = report['stops']
+    if stops == 0:
+        load = {'dominant_load_category': 'UNKNOWN', 'error': 'No passenger data available'}
+    else:
+        load_counts = report['stop_load_counts']
+        load = {
+            'dominant_load_category': LOAD_NAMES[load_counts.index(max(load_counts))],
+            'max_passenger_count': report['max_onboard'],
+            'heavy_load_segments': load_counts[2],
+            'total_segments': stops
+        }
+
+    total = report['events']
+    num_segments = max(stops - 1, 0)
+    if report['samples'] == 0:
+        accel = {'dominant_pattern': 'UNKNOWN', 'error': 'No speed data available'}
+    elif total == 0:
+        accel = {'dominant_pattern': 'GENTLE', 'avg_acceleration': 0, 'max_acceleration': 0, 'total_events': 0}
+    else:
+        gentle, moderate, aggressive = report['counts']
+        accel = {
+            'dominant_pattern': dominant_trip_pattern(gentle, moderate, aggressive),
+            'avg_acceleration': _div_round(report['accel_sum_centi'], total) / 100,
+            'max_acceleration': report['accel_max_centi'] / 100,
+            'total_events': total,
+            'gentle_count': gentle,
+            'gentle_percentage': round((gentle / total) * 100, 1),
+            'moderate_count': moderate,
+            'moderate_percentage': round((moderate / total) * 100, 1),
+            'aggressive_count': aggressive,
+            'aggressive_percentage': round((aggressive / total) * 100, 1),
+            'segments': [
+                {'segment_id': s, 'category': ACCEL_NAMES[segment['category']]}
+                for s, segment in enumerate(report['segments'][:num_segments])
+            ]
+        }
+
+    charged = [segment for segment in report['segments'] if 'fuel_ml' in segment]
+    if stops == 0 or not accel.get('segments'):
+        fuel = {'error': 'Missing load or acceleration data'}
+    else:
+        fuel = {
+            'total_distance_km': _div_round(report['distance_m'], 100) / 10,
+            'total_fuel_liters': _div_round(report['fuel_ml'], 10) / 100,
+            'optimal_fuel_liters': _div_round(report['optimal_ml'], 10) / 100,
+            'wasted_fuel_liters': _div_round(report['fuel_ml'] - report['optimal_ml'], 10) / 100,
+            'problem_segments': sum(
+                1 for segment in charged if segment['load'] == 2 and segment['category'] == 2
+            ),
+            'segments': [
+                {
+                    'load_category': LOAD_NAMES[segment['load']],
+                    'accel_category': ACCEL_NAMES[segment['category']],
+                    'total_fuel_liters': segment['fuel_ml'] / MILLI,
+                    'optimal_fuel_liters': segment['optimal_ml'] / MILLI
+                }
+                for segment in charged
+            ]
+        }
+
+    return {'load': load, 'acceleration': accel, 'fuel': fuel}
+
+
+def trip_readings(trip, segment_distances_km):
+    """
+    A simulated trip as the readings an onboard unit would push
+
+    Returns:
+        tuple: (segment distances in m, onboard count per stop,
+            (time ms, speed 0.1 km/h, segment) per sample)
+    """
+
+    distances = [round(d * MILLI) for d in segment_distances_km]
+    stops = [event['total_onboard'] for event in trip.get('passenger_events', [])]
+    samples = [
+        (round(s['timestamp'] * TIME_SCALE), round(s['speed_kmh'] * SPEED_SCALE), s.get('segment', -1))
+        for s in trip.get('speed_data', [])
+    ]
+    return distances, stops, samples
+
+
+def run_trip(engine, readings):
+    """Stream one trip's readings through an engine and return its report"""
+    distances, stops, samples = readings
+    engine.start_trip(distances)
+    for onboard in stops:
+        engine.push_stop(onboard)
+    for time_ms, speed, segment in samples:
+        engine.push_sample(time_ms, speed, segment)
+    return engine.report()
+
+
+def benchmark_edge_engine(num_trips=200, seed=49):
+    """
+    Per-sample cost and memory of the edge engine against the reference
+
+    The reference is analyze_trip_acceleration (statistics pass) plus
+    estimate_trip_fuel on the sample dicts; the engine gets the same trips
+    already in fixed-point readings, as a unit receives them.
+
+    Returns:
+        dict: Samples, ns per sample for both, engine footprint and the
+            peak memory of analyzing one trip with each
+    """
+
+    import random
+    import time
+    import tracemalloc
+    from datetime import datetime
+
+    from algorithms.acceleration_detector import DETAIL_SEGMENT, analyze_trip_acceleration
+    from algorithms.fuel_estimator import estimate_trip_fuel
+    from algorithms.load_classifier import analyze_trip_load
+    from pipeline.data_simulator import generate_trip
+    from pipeline.route_registry import get_segment_distances, load_route_registry
+
+    registry = load_route_registry()
+    route_ids = sorted(registry)
+    random.seed(seed)
+    trips = []
+    for i in range(num_trips):
+        route = registry[route_ids[i % len(route_ids)]]
+        trip = generate_trip(f"SBS{i + 1:04d}A", f"D{i % 60 + 1:03d}", i, datetime(2024, 12, 16), 6 + i % 17, route)
+        trips.append((trip, get_segment_distances(route)))
+
+    readings = [trip_readings(trip, distances) for trip, distances in trips]
+    num_samples = sum(len(r[2]) for r in readings)
+    engine = EdgeEngine(edge_tables(), max(len(r[0]) for r in readings))
+
+    def reference(trip, distances):
+        load = analyze_trip_load(trip)
+        accel = analyze_trip_acceleration(trip, detail=DETAIL_SEGMENT)
+        return estimate_trip_fuel(trip, load, accel, distances)
+
+    start = time.perf_counter()
+    for trip, distances in trips:
+        reference(trip, distances)
+    reference_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for r in readings:
+        run_trip(engine, r)
+    edge_sec = time.perf_counter() - start
+
+    # Peak allocation while analyzing the longest trip (inputs already in memory)
+    longest = max(range(len(trips)), key=lambda i: len(readings[i][2]))
+    distances, stops, samples = readings[longest]
+
+    tracemalloc.start()
+    engine.start_trip(distances)
+    for onboard in stops:
+        engine.push_stop(onboard)
+    tracemalloc.reset_peak()
+    for time_ms, speed, segment in samples:
+        engine.push_sample(time_ms, speed, segment)
+    _, stream_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    reference(*trips[longest])
+    _, reference_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'trips': num_trips,
+        'samples': num_samples,
+        'edge_ns_per_sample': round(edge_sec / num_samples * 1e9),
+        'reference_ns_per_sample': round(reference_sec / num_samples * 1e9),
+        'speedup': round(reference_sec / edge_sec, 2),
+        'engine_bytes': engine.footprint_bytes(),
+        'trip_samples': len(samples),
+        'edge_stream_peak_bytes': stream_peak,
+        'reference_peak_bytes': reference_peak - base
+    }
+
+
+# Test function
+def test_edge_engine():
+    """Fixed-point results against the reference algorithms on one trip"""
+
+    from algorithms.acceleration_detector import DETAIL_SUMMARY, analyze_trip_acceleration
+    from algorithms.fuel_estimator import estimate_trip_fuel
+    from algorithms.load_classifier import analyze_trip_load
+
+    print("🧪 Testing Edge Engine\n")
+
+    sample_trip = {
+        'trip_id': 'T001',
+        'speed_data': [
+            {'timestamp': 0, 'speed_kmh': 0, 'segment': 0},
+            {'timestamp': 5, 'speed_kmh': 27.0, 'segment': 0},
+            {'timestamp': 10, 'speed_kmh': 50.5, 'segment': 0},
+            {'timestamp': 15, 'speed_kmh': 50.5, 'segment': 0},
+            {'timestamp': 20, 'speed_kmh': 0, 'segment': 0},
+            {'timestamp': 0, 'speed_kmh': 0, 'segment': 1},
+            {'timestamp': 5, 'speed_kmh': 12.3, 'segment': 1},
+            {'timestamp': 10, 'speed_kmh': 30.1, 'segment': 1},
+        ],
+        'passenger_events': [
+            {'total_onboard': 70},
+            {'total_onboard': 20},
+            {'total_onboard': 10}
+        ]
+    }
+    distances_km = [1.2, 0.85]
+
+    # Test 1: Streaming one trip
+    print("Test 1: Fixed-point report")
+    engine = EdgeEngine(edge_tables(), max_segments=8, ring_size=4)
+    report = run_trip(engine, trip_readings(sample_trip, distances_km))
+    print(f"  Events: {report['events']} {report['counts']}, max {report['accel_max_centi']} cm/s²")
+    print(f"  Fuel: {report['fuel_ml']} mL (optimal {report['optimal_ml']} mL)")
+    print(f"  Recent events: {engine.recent_events()}")
+    print(f"  Engine footprint: {engine.footprint_bytes():,} bytes")
+    print()
+
+    # Test 2: Against the reference algorithms
+    print("Test 2: Reference fields")
+    load = analyze_trip_load(sample_trip)
+    accel = analyze_trip_acceleration(sample_trip, detail=DETAIL_SUMMARY)
+    fuel = estimate_trip_fuel(sample_trip, load, accel, distances_km)
+    edge = edge_analysis(report)
+    for name, expected in (('acceleration', accel), ('fuel', fuel)):
+        shared = {key: expected[key] for key in edge[name] if key != 'segments'}
+        same = shared == {key: value for key, value in edge[name].items() if key != 'segments'}
+        print(f"  {name}: {'identical' if same else 'differs'} ({', '.join(sorted(shared))})")
+
+    print("\n✅ Edge Engine Test Complete!")
+
+
+if __name__ == "__main__":
+    test_edge_engine()
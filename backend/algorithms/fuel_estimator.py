@@ -4,36 +4,22 @@ Estimates fuel consumption based on load + acceleration combination
 This is where the 17% penalty for heavy load + aggressive acceleration is calculated
 """
 
-# Baseline fuel consumption rates (L/km) for GENTLE acceleration
-# Based on industry research and physics
-BASELINE_FUEL_RATES = {
-    'LIGHT': 0.80,    # Light load (0-30 passengers)
-    'MEDIUM': 0.88,   # Medium load (31-60 passengers)
-    'HEAVY': 0.98     # Heavy load (61+ passengers)
-}
+import sys
+from pathlib import Path
 
-# Fuel penalty multipliers for different acceleration styles
-# Key insight: Heavy loads amplify the penalty from aggressive acceleration
-FUEL_PENALTIES = {
-    'LIGHT': {
-        'GENTLE': 1.000,      # No penalty (baseline)
-        'MODERATE': 1.0125,   # 1.25% penalty
-        'AGGRESSIVE': 1.025   # 2.5% penalty ← Minimal impact
-    },
-    'MEDIUM': {
-        'GENTLE': 1.000,      # No penalty
-        'MODERATE': 1.045,    # 4.5% penalty
-        'AGGRESSIVE': 1.074   # 7.4% penalty ← Moderate impact
-    },
-    'HEAVY': {
-        'GENTLE': 1.000,      # No penalty
-        'MODERATE': 1.071,    # 7.1% penalty
-        'AGGRESSIVE': 1.173   # 17.3% penalty ← MAJOR IMPACT (THE KEY FINDING!)
-    }
-}
+# Run as a script: add parent directory to path to import algorithms
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from algorithms.acceleration_detector import dominant_segment_category
+from algorithms.settings import current_settings
+
+# Baseline rates (L/km, gentle acceleration), penalty multipliers per
+# load × acceleration and the fuel price live in settings. Heavy loads
+# amplify the penalty from aggressive acceleration (17.3% vs 2.5% light).
 
-# Fuel cost (SGD per liter)
-FUEL_COST_SGD = 1.50
+# Fallback baseline for an unknown load category (MEDIUM rate)
+DEFAULT_BASELINE_RATE = 0.88
 
 
 def estimate_fuel_per_km(load_category, accel_category):
@@ -48,16 +34,18 @@ def estimate_fuel_per_km(load_category, accel_category):
         float: Fuel consumption in L/km
     """
     
-    # Get baseline rate for this load
-    baseline = BASELINE_FUEL_RATES.get(load_category, 0.88)
+    settings = current_settings()
     
-    # Get penalty multiplier
-    penalty = FUEL_PENALTIES.get(load_category, {}).get(accel_category, 1.0)
+    # Precomputed for known categories
+    fuel_per_km = settings.fuel_rates.get(load_category, {}).get(accel_category)
+    if fuel_per_km is not None:
+        return fuel_per_km
     
-    # Calculate actual fuel consumption
-    fuel_per_km = baseline * penalty
+    # Unknown category: baseline rate without penalty
+    baseline = settings.baseline_fuel_rates.get(load_category, DEFAULT_BASELINE_RATE)
+    penalty = settings.fuel_penalties.get(load_category, {}).get(accel_category, 1.0)
     
-    return round(fuel_per_km, 3)
+    return round(baseline * penalty, 3)
 
 
 def calculate_optimal_fuel(load_category, distance_km):
@@ -72,7 +60,7 @@ def calculate_optimal_fuel(load_category, distance_km):
         float: Optimal fuel consumption in liters
     """
     
-    optimal_rate = BASELINE_FUEL_RATES.get(load_category, 0.88)
+    optimal_rate = current_settings().baseline_fuel_rates.get(load_category, DEFAULT_BASELINE_RATE)
     return round(optimal_rate * distance_km, 3)
 
 
@@ -102,8 +90,8 @@ def estimate_segment_fuel(load_category, accel_category, distance_km):
     excess_fuel = total_fuel - optimal_fuel
     
     # Calculate penalty percentage
-    baseline = BASELINE_FUEL_RATES.get(load_category, 0.88)
-    penalty_multiplier = FUEL_PENALTIES.get(load_category, {}).get(accel_category, 1.0)
+    settings = current_settings()
+    penalty_multiplier = settings.fuel_penalties.get(load_category, {}).get(accel_category, 1.0)
     penalty_pct = (penalty_multiplier - 1.0) * 100
     
     return {
@@ -116,18 +104,111 @@ def estimate_segment_fuel(load_category, accel_category, distance_km):
         'excess_fuel_liters': round(excess_fuel, 3),
         'penalty_percentage': round(penalty_pct, 1),
         'is_optimal': accel_category == 'GENTLE',
-        'cost_sgd': round(total_fuel * FUEL_COST_SGD, 2)
+        'cost_sgd': round(total_fuel * settings.fuel_cost_sgd, 2)
     }
 
 
-def estimate_trip_fuel(trip_data, load_analysis, accel_analysis):
+def estimate_matrix_segment_fuel(load_category, accel_category, matrix, distance_km):
+    """
+    Estimate fuel for a segment from its Load × Acceleration event matrix
+    
+    The distance is split across load categories by their share of the
+    segment's events, and each share is charged at its own load's rate
+    with the category its own events classify to, so events driven heavy
+    pay the heavy penalty even in a segment whose samples were mostly light.
+    
+    Args:
+        load_category (str): Load the segment was driven with (reported)
+        accel_category (str): Segment acceleration category (reported)
+        matrix (dict): {load: {accel: events}} (load_accel_classifier)
+        distance_km (float): Segment distance
+    
+    Returns:
+        dict: estimate_segment_fuel fields, plus 'by_load': {load: {'share',
+            'accel_category', 'total_fuel_liters', 'excess_fuel_liters'}}
+            for every load with events; a segment without events is
+            estimated by estimate_segment_fuel
+    """
+    
+    rows = {load: counts for load, counts in matrix.items() if sum(counts.values())}
+    total_events = sum(sum(counts.values()) for counts in rows.values())
+    
+    if total_events == 0:
+        return estimate_segment_fuel(load_category, accel_category, distance_km)
+    
+    settings = current_settings()
+    by_load = {}
+    total_fuel = 0
+    optimal_fuel = 0
+    
+    for load, counts in rows.items():
+        share = sum(counts.values()) / total_events
+        category = dominant_segment_category(counts['GENTLE'], counts['MODERATE'], counts['AGGRESSIVE'])
+        distance = distance_km * share
+        fuel = estimate_fuel_per_km(load, category) * distance
+        optimal = settings.baseline_fuel_rates.get(load, DEFAULT_BASELINE_RATE) * distance
+        by_load[load] = {
+            'share': round(share, 3),
+            'accel_category': category,
+            'total_fuel_liters': round(fuel, 3),
+            'excess_fuel_liters': round(fuel - optimal, 3)
+        }
+        total_fuel += fuel
+        optimal_fuel += optimal
+    
+    excess_fuel = total_fuel - optimal_fuel
+    
+    return {
+        'load_category': load_category,
+        'accel_category': accel_category,
+        'distance_km': distance_km,
+        'fuel_rate_per_km': round(total_fuel / distance_km, 3) if distance_km else 0,
+        'total_fuel_liters': round(total_fuel, 3),
+        'optimal_fuel_liters': round(optimal_fuel, 3),
+        'excess_fuel_liters': round(excess_fuel, 3),
+        'penalty_percentage': round((total_fuel / optimal_fuel - 1.0) * 100, 1) if optimal_fuel else 0,
+        'is_optimal': all(row['accel_category'] == 'GENTLE' for row in by_load.values()),
+        'cost_sgd': round(total_fuel * settings.fuel_cost_sgd, 2),
+        'by_load': by_load
+    }
+
+
+def heavy_aggressive_excess(segment):
+    """
+    Excess fuel a segment estimate spent driving aggressively under heavy load
+    
+    Args:
+        segment (dict): estimate_segment_fuel / estimate_matrix_segment_fuel output
+    
+    Returns:
+        float: Liters, or None if the segment had no heavy + aggressive driving
+    """
+    
+    by_load = segment.get('by_load')
+    if by_load is not None:
+        heavy = by_load.get('HEAVY')
+        if heavy is not None and heavy['accel_category'] == 'AGGRESSIVE':
+            return heavy['excess_fuel_liters']
+        return None
+    
+    if segment['load_category'] == 'HEAVY' and segment['accel_category'] == 'AGGRESSIVE':
+        return segment['excess_fuel_liters']
+    return None
+
+
+def estimate_trip_fuel(trip_data, load_analysis, accel_analysis, segment_distances=None):
     """
     Estimate fuel consumption for entire trip
     
     Args:
         trip_data (dict): Trip data with route info
         load_analysis (dict): Output from load_classifier
-        accel_analysis (dict): Output from acceleration_detector
+        accel_analysis (dict): Output from acceleration_detector; segments
+            with a 'load_accel_matrix' (load_accel_classifier) are charged
+            per load from it, segments with only a 'load_category' use it
+            instead of the stop's load
+        segment_distances (list): Per-segment distances in km from the route
+            definition (default: trip distance split equally across segments)
     
     Returns:
         dict: Complete fuel estimation for trip
@@ -157,23 +238,36 @@ def estimate_trip_fuel(trip_data, load_analysis, accel_analysis):
         load_seg = load_segments[i]
         accel_seg = accel_segments[i]
         
-        # Estimate fuel for this segment
-        estimate = estimate_segment_fuel(
-            load_seg['load_category'],
-            accel_seg['category'],
-            segment_distance
-        )
+        # Use the route's actual stop spacing when it is known
+        distance = segment_distances[i] if segment_distances else segment_distance
+        
+        # Load-aware analyzers carry the load each segment was driven with
+        load_category = accel_seg.get('load_category', 'UNKNOWN')
+        if load_category == 'UNKNOWN':
+            load_category = load_seg['load_category']
+        
+        # Estimate fuel for this segment, per event load when the analyzer counted them
+        matrix = accel_seg.get('load_accel_matrix')
+        if matrix is not None:
+            estimate = estimate_matrix_segment_fuel(load_category, accel_seg['category'], matrix, distance)
+        else:
+            estimate = estimate_segment_fuel(
+                load_category,
+                accel_seg['category'],
+                distance
+            )
         
         estimate['segment_id'] = i
         estimate['stop_name'] = load_seg.get('stop_name', f'Stop {i}')
         
         segment_estimates.append(estimate)
         
-        total_distance += segment_distance
+        total_distance += distance
         total_fuel += estimate['total_fuel_liters']
         total_optimal += estimate['optimal_fuel_liters']
     
     # Calculate overall statistics
+    fuel_cost = current_settings().fuel_cost_sgd
     total_waste = total_fuel - total_optimal
     waste_pct = (total_waste / total_optimal * 100) if total_optimal > 0 else 0
     avg_fuel_per_km = total_fuel / total_distance if total_distance > 0 else 0
@@ -182,7 +276,7 @@ def estimate_trip_fuel(trip_data, load_analysis, accel_analysis):
     # Identify problematic segments (heavy + aggressive)
     problem_segments = [
         s for s in segment_estimates 
-        if s['load_category'] == 'HEAVY' and s['accel_category'] == 'AGGRESSIVE'
+        if heavy_aggressive_excess(s) is not None
     ]
     
     return {
@@ -194,8 +288,8 @@ def estimate_trip_fuel(trip_data, load_analysis, accel_analysis):
         'waste_percentage': round(waste_pct, 1),
         'avg_fuel_per_km': round(avg_fuel_per_km, 3),
         'optimal_fuel_per_km': round(optimal_fuel_per_km, 3),
-        'total_cost_sgd': round(total_fuel * FUEL_COST_SGD, 2),
-        'wasted_cost_sgd': round(total_waste * FUEL_COST_SGD, 2),
+        'total_cost_sgd': round(total_fuel * fuel_cost, 2),
+        'wasted_cost_sgd': round(total_waste * fuel_cost, 2),
         'problem_segments': len(problem_segments),
         'segments': segment_estimates
     }
@@ -216,7 +310,7 @@ def get_fuel_impact_matrix():
         matrix[load] = {}
         for accel in ['GENTLE', 'MODERATE', 'AGGRESSIVE']:
             fuel_rate = estimate_fuel_per_km(load, accel)
-            baseline = BASELINE_FUEL_RATES[load]
+            baseline = current_settings().baseline_fuel_rates[load]
             penalty_pct = ((fuel_rate - baseline) / baseline) * 100
             
             matrix[load][accel] = {
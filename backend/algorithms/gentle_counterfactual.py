@@ -0,0 +1,413 @@
+"""
+Gentle Driving Counterfactual
+Rewrites each recorded speed trace under a gentle-launch limit, recovers
+the lost distance at cruise so stop timing holds, and charges both traces
+for the acceleration work they actually do to give trip-accurate savings
+
+Fuel model: a segment costs the fuel estimator's gentle (baseline) rate
+over its route distance for the recorded speed profile, plus the kinetic
+energy each trace gains, weighted by the estimator's penalty for each
+step's acceleration category, minus the recorded trace's unweighted gain
+(already in the baseline). The recorded trace therefore pays the penalty
+on the work of its harsh steps, and the gentle trace pays for any extra
+speed it builds up while recovering distance. This is not the estimator's
+whole-segment table difference, which is reported alongside for
+comparison.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Run as a script: add parent directory to path to import algorithms
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from algorithms.acceleration_detector import EVENT_THRESHOLD, KMH_TO_MS
+from algorithms.gps_filter import speed_data_to_arrays
+from algorithms.load_classifier import AVG_PASSENGER_WEIGHT_KG, EMPTY_BUS_WEIGHT_KG
+from algorithms.settings import ACCEL_CATEGORIES, LOAD_CATEGORIES, current_settings, pin_settings
+
+DEFAULT_COUNTERFACTUAL_CONFIG = {
+    'gentle_accel_ms2': 1.2,    # Launch limit, safely below the gentle threshold
+    'speed_margin_kmh': 5.0,    # Cruise may exceed the segment's recorded top speed by this much
+    'max_speed_kmh': 70.0,      # Never cruise faster than this
+    'recovery_passes': 3,       # Recover-then-limit iterations
+    'max_delay_sec': 5.0,       # Segments reaching their stop later than this keep the recorded trace
+    'engine_efficiency': 0.35   # Share of the fuel's energy that reaches the wheels
+}
+
+# Lower heating value of diesel
+DIESEL_J_PER_LITER = 38.6e6
+
+
+def build_trace_columns(trips, segment_distances_by_route):
+    """
+    Concatenate the speed traces of many trips into flat columns
+
+    Only samples inside a trip's analyzed segments (one per passenger event
+    but the last) are kept. Every (trip, segment) gets a global segment key.
+
+    Args:
+        trips (list): Raw trips (JSON or archive-backed)
+        segment_distances_by_route (dict): {route_id: segment distances in km}
+
+    Returns:
+        dict: Sample columns (timestamp, speed_kmh, key) and per-segment
+            columns (trip, load category, mass, distance_km), plus trip ids/routes
+    """
+
+    settings = current_settings()
+    timestamps, speeds, keys = [], [], []
+    seg_trip, seg_load, seg_mass, seg_distance = [], [], [], []
+    trip_ids, routes = [], []
+    offset = 0
+
+    for trip in trips:
+        events = trip.get('passenger_events', [])
+        num_segments = len(events) - 1
+        if num_segments <= 0:
+            continue
+
+        ts, speed, segments, _ = speed_data_to_arrays(trip.get('speed_data', []))
+        inside = (segments >= 0) & (segments < num_segments)
+
+        timestamps.append(ts[inside])
+        speeds.append(speed[inside])
+        keys.append(segments[inside] + offset)
+
+        onboard = np.array([e['total_onboard'] for e in events[:num_segments]])
+        seg_load.append((onboard > settings.light_threshold).astype(np.int64)
+                        + (onboard > settings.medium_threshold))
+        seg_mass.append(EMPTY_BUS_WEIGHT_KG + onboard * AVG_PASSENGER_WEIGHT_KG)
+        seg_distance.append(segment_distances_by_route[trip.get('route')][:num_segments])
+        seg_trip.append(np.full(num_segments, len(trip_ids)))
+        trip_ids.append(trip['trip_id'])
+        routes.append(trip.get('route'))
+        offset += num_segments
+
+    def flat(parts, dtype):
+        return np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype=dtype)
+
+    return {
+        'timestamp': flat(timestamps, float),
+        'speed_kmh': flat(speeds, float),
+        'key': flat(keys, np.int64),
+        'segment_trip': flat(seg_trip, np.int64),
+        'segment_load': flat(seg_load, np.int64),
+        'segment_mass_kg': flat(seg_mass, float),
+        'segment_distance_km': flat(seg_distance, float),
+        'trip_ids': trip_ids,
+        'routes': routes
+    }
+
+
+def _runs(keys):
+    """Run starts, run ids and each sample's run start index for contiguous keys"""
+    starts = np.ones(len(keys), dtype=bool)
+    starts[1:] = keys[1:] != keys[:-1]
+    run_id = np.cumsum(starts) - 1
+    start_index = np.maximum.accumulate(np.where(starts, np.arange(len(keys)), 0))
+    return starts, run_id, start_index
+
+
+def limit_acceleration(speeds, dt, runs, accel_ms2):
+    """
+    Lowest-change trace whose speed never rises faster than accel_ms2
+
+    v'[i] = min(v[i], v'[i-1] + a·dt), solved in closed form for every run
+    at once: v'[i] = C[i] + min over j ≤ i in the run of (v[j] - C[j]),
+    with C the run's cumulative allowed gain.
+
+    Args:
+        speeds (ndarray): km/h
+        dt (ndarray): Seconds since the previous sample (0 at run starts)
+        runs (tuple): Output of _runs
+        accel_ms2 (float): Acceleration limit
+
+    Returns:
+        ndarray: Limited speeds (km/h)
+    """
+
+    _, run_id, start_index = runs
+    allowed = np.cumsum(accel_ms2 * KMH_TO_MS * dt)
+    allowed -= allowed[start_index]
+
+    headroom = speeds - allowed
+    # Shift each run below all earlier ones so one running minimum resets per run
+    shift = (np.abs(headroom).max() * 2 + 1) * run_id if len(speeds) else 0
+    return np.minimum.accumulate(headroom - shift) + shift + allowed
+
+
+def _pair_distance_m(speeds, dt):
+    """Distance covered between each sample and the previous one (trapezoid)"""
+    distance = np.zeros(len(speeds))
+    distance[1:] = (speeds[1:] + speeds[:-1]) / 2 / KMH_TO_MS * dt[1:]
+    return distance
+
+
+def _recover_distance(limited, speeds, dt, runs, keys, num_segments, config):
+    """
+    Raise cruise speeds so each segment covers its recorded distance again
+
+    Speeds are raised toward a ceiling (recorded segment top speed plus a
+    margin) in proportion to the headroom of each sample, then limited
+    again; a few passes converge. Stop samples (first and last of a run)
+    keep their speeds so dwell times and stop arrivals are unchanged.
+
+    Returns:
+        tuple: (counterfactual speeds, remaining distance deficit per segment in m)
+    """
+
+    starts, _, _ = runs
+    ends = np.roll(starts, -1)
+    if len(ends):
+        ends[-1] = True
+
+    top = np.full(num_segments, -np.inf)
+    np.maximum.at(top, keys, speeds)
+    ceiling = np.minimum(top[keys] + config['speed_margin_kmh'], config['max_speed_kmh'])
+
+    # Distance gained per km/h added at a sample: half of each neighbouring step
+    dt_next = np.append(dt[1:], 0)
+    weight = (dt + np.where(ends, 0, dt_next)) / 2 / KMH_TO_MS
+    movable = ~(starts | ends)
+
+    target = np.bincount(keys, _pair_distance_m(speeds, dt), minlength=num_segments)
+    trace = limited
+
+    for _ in range(config['recovery_passes']):
+        deficit = target - np.bincount(keys, _pair_distance_m(trace, dt), minlength=num_segments)
+        headroom = np.where(movable, np.maximum(ceiling - trace, 0), 0)
+        capacity = np.bincount(keys, headroom * weight, minlength=num_segments)
+        fraction = np.clip(np.divide(deficit, capacity, out=np.zeros(num_segments), where=capacity > 0), 0, 1)
+        trace = limit_acceleration(trace + fraction[keys] * headroom, dt, runs, config['gentle_accel_ms2'])
+
+    deficit = target - np.bincount(keys, _pair_distance_m(trace, dt), minlength=num_segments)
+    return trace, np.maximum(deficit, 0)
+
+
+def _acceleration_work(speeds, dt, keys, columns, settings):
+    """
+    Kinetic energy a trace gains per segment
+
+    Each speed-gaining step adds 1/2·m·(v1² - v0²) at the segment's mass.
+    The weighted sum scales each step by the fuel estimator's penalty for
+    the segment load and the step's acceleration category (steps at or
+    below the noise gate are GENTLE).
+
+    Returns:
+        tuple: (penalty-weighted work in J, work in J, per-sample acceleration)
+    """
+
+    num_segments = len(columns['segment_load'])
+
+    accel = np.zeros(len(speeds))
+    moving = dt > 0
+    accel[1:][moving[1:]] = np.diff(speeds)[moving[1:]] / KMH_TO_MS / dt[1:][moving[1:]]
+    category = (accel >= settings.gentle_threshold).astype(np.int64) + (accel >= settings.moderate_threshold)
+    category[accel <= EVENT_THRESHOLD] = 0
+
+    speeds_ms = speeds / KMH_TO_MS
+    work = np.zeros(len(speeds))
+    work[1:] = 0.5 * columns['segment_mass_kg'][keys[1:]] * (speeds_ms[1:] ** 2 - speeds_ms[:-1] ** 2)
+    work[~moving | (work < 0)] = 0
+
+    penalty = np.array([[settings.fuel_penalties[load][a] for a in ACCEL_CATEGORIES] for load in LOAD_CATEGORIES])
+    weighted = work * penalty[columns['segment_load'][keys], category]
+
+    return (np.bincount(keys, weighted, minlength=num_segments),
+            np.bincount(keys, work, minlength=num_segments), accel)
+
+
+def run_counterfactual(columns, config=None):
+    """
+    Gentle-driving counterfactual for every trip in the columns at once
+
+    Args:
+        columns (dict): Output of build_trace_columns
+        config (dict): Overrides for DEFAULT_COUNTERFACTUAL_CONFIG
+
+    Returns:
+        dict: Per-trip arrays (actual_fuel, gentle_fuel, delay_sec,
+            kept_segments, ...) and the counterfactual 'gentle_speed_kmh'
+            sample column; segments kept as driven have zero delay and savings
+    """
+
+    config = {**DEFAULT_COUNTERFACTUAL_CONFIG, **(config or {})}
+    settings = current_settings()
+
+    keys = columns['key']
+    speeds = columns['speed_kmh']
+    num_segments = len(columns['segment_load'])
+    num_trips = len(columns['trip_ids'])
+
+    runs = _runs(keys)
+    dt = np.zeros(len(speeds))
+    dt[1:] = np.maximum(np.diff(columns['timestamp']), 0)
+    dt[runs[0]] = 0
+
+    limited = limit_acceleration(speeds, dt, runs, config['gentle_accel_ms2'])
+    gentle, deficit_m = _recover_distance(limited, speeds, dt, runs, keys, num_segments, config)
+
+    # Time the bus would arrive late at the next stop
+    recorded_m = np.bincount(keys, _pair_distance_m(speeds, dt), minlength=num_segments)
+    duration = np.bincount(keys, dt, minlength=num_segments)
+    mean_speed = np.divide(recorded_m, duration, out=np.zeros(num_segments), where=duration > 0)
+    delay = np.divide(deficit_m, mean_speed, out=np.zeros(num_segments), where=mean_speed > 0)
+
+    # Stop timing is a constraint: segments that would be too late keep the recorded trace
+    kept = delay > config['max_delay_sec']
+    gentle = np.where(kept[keys], speeds, gentle)
+    delay[kept] = 0
+
+    # Both traces pay the baseline over the route distance, and their own
+    # acceleration work against the recorded trace's (already in the baseline)
+    actual_weighted, recorded_work, _ = _acceleration_work(speeds, dt, keys, columns, settings)
+    gentle_weighted, _, gentle_accel = _acceleration_work(gentle, dt, keys, columns, settings)
+
+    baseline = np.array([settings.baseline_fuel_rates[load] for load in LOAD_CATEGORIES])
+    optimal_fuel = baseline[columns['segment_load']] * columns['segment_distance_km']
+    joules_per_liter = config['engine_efficiency'] * DIESEL_J_PER_LITER
+    actual_fuel = optimal_fuel + (actual_weighted - recorded_work) / joules_per_liter
+    gentle_fuel = optimal_fuel + (gentle_weighted - recorded_work) / joules_per_liter
+
+    trip = columns['segment_trip']
+    max_delay = np.zeros(num_trips)
+    np.maximum.at(max_delay, trip, delay)
+
+    return {
+        'actual_fuel': np.bincount(trip, actual_fuel, minlength=num_trips),
+        'gentle_fuel': np.bincount(trip, gentle_fuel, minlength=num_trips),
+        'total_delay_sec': np.bincount(trip, delay, minlength=num_trips),
+        'max_delay_sec': max_delay,
+        'limited_samples': np.bincount(trip[keys], (limited < speeds - 1e-9) & ~kept[keys], minlength=num_trips),
+        'kept_segments': np.bincount(trip, kept, minlength=num_trips),
+        'gentle_speed_kmh': gentle,
+        'max_gentle_accel': float(gentle_accel[~kept[keys]].max()) if (~kept[keys]).any() else 0.0
+    }
+
+
+def analyze_fleet_counterfactual(trips, segment_distances_by_route, config=None):
+    """
+    Trip-accurate gentle-driving savings for a batch of trips
+
+    Args:
+        trips (list): Raw trips (JSON or archive-backed)
+        segment_distances_by_route (dict): {route_id: segment distances in km}
+        config (dict): Overrides for DEFAULT_COUNTERFACTUAL_CONFIG
+
+    Returns:
+        list: One result per trip with at least one segment
+    """
+
+    # Columns, traces and prices from one settings version
+    with pin_settings() as settings:
+        columns = build_trace_columns(trips, segment_distances_by_route)
+        result = run_counterfactual(columns, config)
+
+    trips_out = []
+    for i, trip_id in enumerate(columns['trip_ids']):
+        actual = float(result['actual_fuel'][i])
+        savings = actual - float(result['gentle_fuel'][i])
+        trips_out.append({
+            'trip_id': trip_id,
+            'route': columns['routes'][i],
+            'actual_fuel_liters': round(actual, 3),
+            'gentle_fuel_liters': round(float(result['gentle_fuel'][i]), 3),
+            'savings_liters': round(savings, 3),
+            'savings_sgd': round(savings * settings.fuel_cost_sgd, 2),
+            'savings_percentage': round(savings / actual * 100, 2) if actual > 0 else 0,
+            'limited_samples': int(result['limited_samples'][i]),
+            'max_delay_sec': round(float(result['max_delay_sec'][i]), 1),
+            'total_delay_sec': round(float(result['total_delay_sec'][i]), 1),
+            'kept_segments': int(result['kept_segments'][i])
+        })
+
+    return trips_out
+
+
+def gentle_speed_trace(trip, segment_distances, config=None):
+    """
+    Counterfactual speed_data for one trip (same samples, gentle speeds)
+
+    Samples outside the trip's analyzed segments are left out.
+    """
+
+    columns = build_trace_columns([trip], {trip.get('route'): segment_distances})
+    result = run_counterfactual(columns, config)
+
+    return [
+        {'timestamp': ts, 'speed_kmh': round(speed, 1), 'segment': key}
+        for ts, speed, key in zip(columns['timestamp'].tolist(),
+                                  result['gentle_speed_kmh'].tolist(),
+                                  columns['key'].tolist())
+    ]
+
+
+# Test function
+def test_counterfactual():
+    """Gentle counterfactual over a simulated week"""
+
+    import random
+    from pipeline.data_simulator import generate_week_data
+    from pipeline.route_registry import get_segment_distances, load_route_registry
+    from algorithms.policy_sweep import build_sweep_cache, evaluate_policies
+
+    print("🧪 Testing Gentle Driving Counterfactual\n")
+
+    random.seed(5)
+    registry = load_route_registry()
+    trips = [t for route_trips in generate_week_data(registry=registry).values() for t in route_trips]
+    distances = {route_id: get_segment_distances(route) for route_id, route in registry.items()}
+    num_samples = sum(len(t['speed_data']) for t in trips)
+
+    # Test 1: Fleet week
+    print(f"Test 1: {len(trips)} trips, {num_samples:,} samples")
+    start = time.perf_counter()
+    results = analyze_fleet_counterfactual(trips, distances)
+    elapsed = time.perf_counter() - start
+    print(f"  {elapsed:.2f} s ({num_samples / elapsed:,.0f} samples/s)")
+
+    actual = sum(r['actual_fuel_liters'] for r in results)
+    savings = sum(r['savings_liters'] for r in results)
+    table = evaluate_policies(build_sweep_cache(trips, distances), [{}])[0]['weekly_fuel_waste']
+    kept = sum(r['kept_segments'] for r in results)
+    print(f"  Trace fuel: {actual:.1f} L, gentle savings: {savings:.2f} L "
+          f"({savings / actual * 100:.2f}%, S${sum(r['savings_sgd'] for r in results):.2f})")
+    print(f"  Estimator waste (whole-segment table, for comparison): {table:.2f} L")
+    print(f"  Segments kept as driven (> {DEFAULT_COUNTERFACTUAL_CONFIG['max_delay_sec']:.0f} s late at the stop): {kept}")
+    print()
+
+    # Test 2: Counterfactual respects the limit and keeps distance
+    print("Test 2: Constraints")
+    columns = build_trace_columns(trips, distances)
+    result = run_counterfactual(columns)
+    print(f"  Max launch in counterfactual: {result['max_gentle_accel']:.2f} m/s² "
+          f"(limit {DEFAULT_COUNTERFACTUAL_CONFIG['gentle_accel_ms2']})")
+    print(f"  Worst stop delay: {result['max_delay_sec'].max():.1f} s")
+    tight = run_counterfactual(columns, {'max_delay_sec': 0.1, 'speed_margin_kmh': 0.0})
+    print(f"  No cruise margin, 0.1 s delay limit: {int(tight['kept_segments'].sum())} segments kept as driven, "
+          f"worst delay {tight['max_delay_sec'].max():.2f} s")
+    print()
+
+    # Test 3: One trip
+    best = max(results, key=lambda r: r['savings_liters'])
+    trip = next(t for t in trips if t['trip_id'] == best['trip_id'])
+    gentle = gentle_speed_trace(trip, distances[trip['route']])
+    # Simulator trips have every sample inside a segment, so indices line up
+    changed = next(i for i, s in enumerate(gentle) if abs(s['speed_kmh'] - trip['speed_data'][i]['speed_kmh']) > 0.05)
+    window = slice(max(changed - 2, 0), changed + 6)
+    print(f"Test 3: Trip {best['trip_id']} (largest savings), first limited launch")
+    print(f"  Recorded: {[s['speed_kmh'] for s in trip['speed_data'][window]]}")
+    print(f"  Gentle:   {[s['speed_kmh'] for s in gentle[window]]}")
+    print(f"  Savings: {best['savings_liters']} L ({best['savings_percentage']}%), "
+          f"max delay {best['max_delay_sec']} s")
+
+    print("\n✅ Gentle Driving Counterfactual Test Complete!")
+
+
+if __name__ == "__main__":
+    test_counterfactual()
@@ -0,0 +1,409 @@
+"""
+GPS Filter
+Smooths and resamples raw GPS speed samples before acceleration detection,
+then merges contiguous speeding-up samples into single launch events
+"""
+
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Run as a script: add parent directory to path to import algorithms
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from algorithms.acceleration_detector import (
+    EVENT_THRESHOLD,
+    KMH_TO_MS,
+    classify_acceleration,
+    detect_acceleration_events
+)
+
+SMOOTHING_METHODS = ('none', 'moving_average', 'savgol', 'kalman')
+
+# Default preprocessing settings
+DEFAULT_FILTER_CONFIG = {
+    'smoothing': 'moving_average',  # One of SMOOTHING_METHODS
+    'window_sec': 5,                # Smoothing window (moving average / Savitzky-Golay)
+    'polyorder': 2,                 # Savitzky-Golay polynomial order
+    'process_var': 0.5,             # Kalman: acceleration noise (m/s²)²
+    'measurement_var': 4.0,         # Kalman: GPS speed noise (km/h)²
+    'resample_hz': 1.0,             # Fixed output sample rate
+    'accel_threshold': EVENT_THRESHOLD,  # m/s², same noise gate as the raw detector
+    'max_gap_sec': 2,               # Bridge short dips inside one launch
+    'min_duration_sec': 2,          # Drop launches shorter than this
+    'min_speed_gain_kmh': 5         # Drop cruise jitter that barely changes speed
+}
+
+
+def speed_data_to_arrays(speed_data):
+    """
+    Convert speed samples to column arrays
+
+    Args:
+        speed_data (list): Speed samples
+            {'timestamp', 'speed_kmh', 'segment', 'passenger_load'}
+
+    Returns:
+        tuple: (timestamps, speeds_kmh, segments, passenger_loads) as NumPy arrays
+    """
+
+    # Archive-backed speed_data already is columnar (zero-copy)
+    columns = getattr(speed_data, 'columns', None)
+    if columns is not None:
+        return columns
+
+    n = len(speed_data)
+    timestamps = np.fromiter((s['timestamp'] for s in speed_data), dtype=float, count=n)
+    speeds = np.fromiter((s['speed_kmh'] for s in speed_data), dtype=float, count=n)
+    segments = np.fromiter((s.get('segment', 0) for s in speed_data), dtype=np.int32, count=n)
+    loads = np.fromiter((s.get('passenger_load', 0) for s in speed_data), dtype=np.int32, count=n)
+
+    return timestamps, speeds, segments, loads
+
+
+def _odd_window(window_sec, resample_hz):
+    """Smoothing window in samples, rounded up to an odd count"""
+    window = max(int(round(window_sec * resample_hz)), 1)
+    return window if window % 2 else window + 1
+
+
+def moving_average(speeds, window):
+    """Centered moving average with edge padding (keeps array length)"""
+
+    if window <= 1 or len(speeds) < 2:
+        return speeds.copy()
+
+    half = window // 2
+    padded = np.pad(speeds, half, mode='edge')
+    kernel = np.full(window, 1.0 / window)
+
+    return np.convolve(padded, kernel, mode='valid')
+
+
+def savitzky_golay(speeds, window, polyorder=2):
+    """
+    Savitzky-Golay smoothing with edge padding
+
+    The filter coefficients are the least-squares fit of a polynomial of
+    order polyorder over the window, evaluated at the window centre.
+    """
+
+    if window <= polyorder or len(speeds) < 2:
+        return speeds.copy()
+
+    half = window // 2
+    offsets = np.arange(-half, half + 1)
+    vander = np.vander(offsets, polyorder + 1, increasing=True)
+    coeffs = np.linalg.pinv(vander)[0]
+
+    padded = np.pad(speeds, half, mode='edge')
+
+    return np.convolve(padded, coeffs[::-1], mode='valid')
+
+
+def kalman_smooth(speeds, dt, process_var=0.5, measurement_var=4.0):
+    """
+    Constant-acceleration Kalman filter over speed measurements
+
+    State is [speed (km/h), acceleration (km/h per s)]. The recursion is
+    inherently sequential, so this runs one step per sample.
+    """
+
+    if len(speeds) < 2:
+        return speeds.copy()
+
+    q = process_var * KMH_TO_MS ** 2  # Convert (m/s²)² to (km/h/s)²
+    r = measurement_var
+
+    v, a = speeds[0], 0.0
+    p00, p01, p11 = r, 0.0, q
+    out = np.empty_like(speeds)
+    out[0] = v
+
+    for i in range(1, len(speeds)):
+        # Predict
+        v = v + a * dt
+        p00 = p00 + dt * (2 * p01 + dt * p11) + q * dt ** 4 / 4
+        p01 = p01 + dt * p11 + q * dt ** 3 / 2
+        p11 = p11 + q * dt ** 2
+
+        # Update with the measured speed
+        s = p00 + r
+        k0, k1 = p00 / s, p01 / s
+        residual = speeds[i] - v
+        v, a = v + k0 * residual, a + k1 * residual
+        p00, p01, p11 = (1 - k0) * p00, (1 - k0) * p01, p11 - k1 * p01
+
+        out[i] = v
+
+    return out
+
+
+def smooth_speeds(speeds, config):
+    """Apply the configured smoothing method to a speed array"""
+
+    method = config['smoothing']
+    window = _odd_window(config['window_sec'], config['resample_hz'])
+
+    if method == 'none':
+        return speeds.copy()
+    if method == 'moving_average':
+        return moving_average(speeds, window)
+    if method == 'savgol':
+        return savitzky_golay(speeds, window, config['polyorder'])
+    if method == 'kalman':
+        return kalman_smooth(speeds, 1.0 / config['resample_hz'],
+                             config['process_var'], config['measurement_var'])
+
+    raise ValueError(f"Unknown smoothing method: {method} (expected one of {SMOOTHING_METHODS})")
+
+
+def resample(timestamps, speeds, *held_columns, resample_hz=1.0):
+    """
+    Resample one monotonic block of samples to a fixed rate
+
+    Speeds are linearly interpolated; held columns (segment, load) take
+    the value of the last raw sample at or before each resampled point.
+
+    Returns:
+        tuple: (timestamps, speeds_kmh, *held_columns) on the fixed grid
+    """
+
+    step = 1.0 / resample_hz
+    grid = np.arange(timestamps[0], timestamps[-1] + step / 2, step)
+
+    grid_speeds = np.interp(grid, timestamps, speeds)
+    idx = np.clip(np.searchsorted(timestamps, grid, side='right') - 1, 0, len(timestamps) - 1)
+
+    return (grid, grid_speeds) + tuple(column[idx] for column in held_columns)
+
+
+def split_monotonic_blocks(timestamps):
+    """
+    Split sample indices where time does not increase
+
+    The simulator restarts timestamps at 0 for every segment, and raw
+    feeds can contain resets, so each block is filtered on its own.
+    """
+
+    breaks = np.flatnonzero(np.diff(timestamps) <= 0) + 1
+    bounds = np.concatenate(([0], breaks, [len(timestamps)]))
+
+    return [(s, e) for s, e in zip(bounds[:-1], bounds[1:]) if e - s >= 2]
+
+
+def find_runs(timestamps, mask, max_gap_sec=0):
+    """
+    Contiguous runs of True sample pairs
+
+    Args:
+        timestamps (np.ndarray): Sample times
+        mask (np.ndarray): One flag per sample pair (len(timestamps) - 1)
+        max_gap_sec (float): Merge runs separated by at most this much time
+
+    Returns:
+        tuple: (starts, ends) sample indices; run k spans samples starts[k]..ends[k]
+    """
+
+    edges = np.diff(mask.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    if len(starts) > 1 and max_gap_sec > 0:
+        bridged = (timestamps[starts[1:]] - timestamps[ends[:-1]]) <= max_gap_sec
+        starts = starts[np.concatenate(([True], ~bridged))]
+        ends = ends[np.concatenate((~bridged, [True]))]
+
+    return starts, ends
+
+
+def run_maximum(values, starts, ends, empty=0.0):
+    """
+    Maximum of values[starts[k]:ends[k]] for every run, in one vectorized pass
+
+    Runs with no elements get `empty`.
+    """
+
+    if len(starts) == 0:
+        return np.empty(0)
+
+    # Mask everything outside the runs so reduceat only sees run members
+    depth = np.zeros(len(values) + 1, dtype=np.int32)
+    np.add.at(depth, starts, 1)
+    np.add.at(depth, ends, -1)
+    inside = np.cumsum(depth)[:-1] > 0
+    masked = np.append(np.where(inside, values, -np.inf), -np.inf)
+
+    result = np.maximum.reduceat(masked, np.minimum(starts, len(values)))
+    return np.where(ends > starts, result, empty)
+
+
+def merge_launch_runs(timestamps, speeds, segments, config):
+    """
+    Merge contiguous positive-acceleration samples into launch events
+
+    Args:
+        timestamps, speeds, segments (np.ndarray): One filtered, resampled block
+        config (dict): Filter settings
+
+    Returns:
+        list: Events shaped like detect_acceleration_events output, plus
+            'peak_acceleration_ms2' and 'duration_sec'
+    """
+
+    if len(timestamps) < 2:
+        return []
+
+    dt = np.diff(timestamps)
+    accel = np.diff(speeds) / KMH_TO_MS / dt
+    rising = accel > config['accel_threshold']
+
+    # Run k covers pairs [starts[k], ends[k]); short jitter dips are bridged
+    starts, ends = find_runs(timestamps, rising, config['max_gap_sec'])
+
+    if len(starts) == 0:
+        return []
+
+    durations = timestamps[ends] - timestamps[starts]
+    keep = ((durations >= config['min_duration_sec'])
+            & (speeds[ends] - speeds[starts] >= config['min_speed_gain_kmh']))
+    starts, ends, durations = starts[keep], ends[keep], durations[keep]
+
+    if len(starts) == 0:
+        return []
+
+    mean_accel = (speeds[ends] - speeds[starts]) / KMH_TO_MS / durations
+
+    peak_accel = run_maximum(accel, starts, ends)
+
+    return [
+        {
+            'start_time': float(timestamps[s]),
+            'end_time': float(timestamps[e]),
+            'start_speed_kmh': round(float(speeds[s]), 1),
+            'end_speed_kmh': round(float(speeds[e]), 1),
+            'acceleration_ms2': round(float(m), 2),
+            'peak_acceleration_ms2': round(float(p), 2),
+            'duration_sec': float(d),
+            'category': classify_acceleration(m),
+            'segment': int(segments[s])
+        }
+        for s, e, m, p, d in zip(starts, ends, mean_accel, peak_accel, durations)
+    ]
+
+
+def preprocess_speed_data(speed_data, config=None):
+    """
+    Smooth and resample a trip's speed samples
+
+    Args:
+        speed_data (list): Raw speed samples
+        config (dict): Filter settings (defaults to DEFAULT_FILTER_CONFIG)
+
+    Returns:
+        list: (timestamps, speeds_kmh, segments, passenger_loads) array
+            tuples, one per monotonic block
+    """
+
+    if len(speed_data) < 2:
+        return []
+
+    return preprocess_columns(speed_data_to_arrays(speed_data), config)
+
+
+def preprocess_columns(columns, config=None):
+    """
+    Smooth and resample speed columns already built by speed_data_to_arrays
+
+    Args:
+        columns (tuple): (timestamps, speeds_kmh, segments, passenger_loads)
+        config (dict): Filter settings (defaults to DEFAULT_FILTER_CONFIG)
+
+    Returns:
+        list: Array tuples, one per monotonic block (see preprocess_speed_data)
+    """
+
+    config = {**DEFAULT_FILTER_CONFIG, **(config or {})}
+    timestamps, speeds, segments, loads = columns
+
+    if len(timestamps) < 2:
+        return []
+
+    blocks = []
+
+    for start, end in split_monotonic_blocks(timestamps):
+        t, v, seg, load = resample(timestamps[start:end], speeds[start:end],
+                                   segments[start:end], loads[start:end],
+                                   resample_hz=config['resample_hz'])
+        blocks.append((t, smooth_speeds(v, config), seg, load))
+
+    return blocks
+
+
+def detect_filtered_acceleration_events(speed_data, config=None):
+    """
+    Drop-in replacement for detect_acceleration_events on noisy GPS
+
+    Args:
+        speed_data (list): Raw speed samples
+        config (dict): Filter settings (defaults to DEFAULT_FILTER_CONFIG)
+
+    Returns:
+        list: One event per launch instead of one per sample pair
+    """
+
+    config = {**DEFAULT_FILTER_CONFIG, **(config or {})}
+
+    events = []
+    for t, v, seg, _ in preprocess_speed_data(speed_data, config):
+        events.extend(merge_launch_runs(t, v, seg, config))
+
+    return events
+
+
+def make_event_detector(config=None):
+    """Event detector bound to a filter config, for analyze_trip_acceleration"""
+
+    config = {**DEFAULT_FILTER_CONFIG, **(config or {})}
+
+    def detector(speed_data):
+        return detect_filtered_acceleration_events(speed_data, config)
+
+    return detector
+
+
+# Test function
+def test_filter():
+    """Compare raw and filtered detection on jittery 1 Hz GPS"""
+
+    print("🧪 Testing GPS Filter\n")
+
+    random.seed(3)
+
+    # One launch 0 → 50 km/h over 10 s (1.39 m/s²), cruise, brake, with ±2 km/h jitter
+    true_speeds = [5.0 * i for i in range(11)] + [50.0] * 60 + [50.0 - 5.0 * i for i in range(1, 11)]
+    speed_data = [
+        {'timestamp': t, 'speed_kmh': max(0.0, v + random.gauss(0, 2.0)), 'segment': 0}
+        for t, v in enumerate(true_speeds)
+    ]
+    true_accel = 50 / KMH_TO_MS / 10
+
+    raw_events = detect_acceleration_events(speed_data)
+    print(f"True launch: {true_accel:.2f} m/s² ({classify_acceleration(true_accel)})")
+    print(f"Raw detector: {len(raw_events)} events")
+    print()
+
+    for method in SMOOTHING_METHODS:
+        events = detect_filtered_acceleration_events(speed_data, {'smoothing': method})
+        launch = max(events, key=lambda e: e['end_speed_kmh'] - e['start_speed_kmh'])
+        print(f"{method:<15} {len(events):>3} events, main launch "
+              f"{launch['acceleration_ms2']} m/s² over {launch['duration_sec']:.0f} s ({launch['category']})")
+
+    print("\n✅ GPS Filter Test Complete!")
+
+
+if __name__ == "__main__":
+    test_filter()
@@ -0,0 +1,204 @@
+"""
+Hotspot Index
+Accumulates segment waste per (route, stop, hour) across the network, so the
+dashboard can map where fuel is wasted without loading trip-level data
+"""
+
+import random
+import time
+
+# Row layout of hotspot_index.json
+HOTSPOT_COLUMNS = (
+    'route', 'segment_id', 'stop_name', 'hour',
+    'excess_fuel_liters', 'segments', 'heavy_aggressive_segments',
+    'light_segments', 'medium_segments', 'heavy_segments'
+)
+
+_LOAD_FIELD = {'LIGHT': 3, 'MEDIUM': 4, 'HEAVY': 5}
+
+
+def _start_seconds(start_time):
+    """'HH:MM:SS' (or 'HH:MM') → seconds after midnight"""
+    parts = [int(p) for p in start_time.split(':')]
+    return parts[0] * 3600 + parts[1] * 60 + (parts[2] if len(parts) > 2 else 0)
+
+
+def segment_departure_offsets(speed_data):
+    """
+    Seconds from trip start to the first sample of each segment
+
+    Args:
+        speed_data: Sample dicts, or archived speed data with .columns
+
+    Returns:
+        dict: {segment_id: first timestamp in the segment}
+    """
+
+    columns = getattr(speed_data, 'columns', None)
+    if columns is not None:
+        samples = zip(columns[0].tolist(), columns[2].tolist())
+    else:
+        samples = ((s['timestamp'], s.get('segment')) for s in speed_data)
+
+    offsets = {}
+    for timestamp, segment in samples:
+        if segment is not None and segment not in offsets:
+            offsets[segment] = timestamp
+    return offsets
+
+
+class HotspotIndex:
+    """
+    Per-(route, stop, hour) waste totals, built one trip at a time
+
+    A segment is counted at the stop it departs from, in the hour the bus
+    leaves that stop. Fuel is summed in whole milliliters (segment excess is
+    reported to 3 dp), so indexes built by separate workers merge exactly.
+    """
+
+    def __init__(self):
+        # (route, segment_id, hour) → [stop_name, excess_ml, segments,
+        #                              light, medium, heavy, heavy_aggressive]
+        self.cells = {}
+        self.trips_seen = 0
+
+    def add_trip(self, trip, result):
+        """
+        Account one trip
+
+        Args:
+            trip (dict): Raw trip ('start_time', 'speed_data')
+            result (dict): Processed trip (output of process_single_trip)
+        """
+
+        segments = result.get('fuel', {}).get('segments')
+        if not segments:
+            return
+
+        self.trips_seen += 1
+        route = result.get('route')
+        start = _start_seconds(trip.get('start_time', '00:00:00'))
+        offsets = segment_departure_offsets(trip.get('speed_data') or [])
+        offset = 0
+
+        for segment in segments:
+            segment_id = segment['segment_id']
+            # Segments without samples inherit the previous departure time
+            offset = offsets.get(segment_id, offset)
+            hour = int((start + offset) // 3600) % 24
+
+            cell = self.cells.get((route, segment_id, hour))
+            if cell is None:
+                cell = self.cells[(route, segment_id, hour)] = [segment['stop_name'], 0, 0, 0, 0, 0, 0]
+            cell[1] += round(segment['excess_fuel_liters'] * 1000)
+            cell[2] += 1
+            cell[_LOAD_FIELD[segment['load_category']]] += 1
+            if segment['load_category'] == 'HEAVY' and segment['accel_category'] == 'AGGRESSIVE':
+                cell[6] += 1
+
+    def merge(self, other):
+        """Fold another worker's index into this one"""
+
+        self.trips_seen += other.trips_seen
+        for key, theirs in other.cells.items():
+            cell = self.cells.get(key)
+            if cell is None:
+                self.cells[key] = list(theirs)
+            else:
+                for i in range(1, len(cell)):
+                    cell[i] += theirs[i]
+        return self
+
+    def rows(self):
+        """Cells as HOTSPOT_COLUMNS rows, by route, stop order, hour"""
+
+        return [
+            [route, segment_id, stop_name, hour, round(excess_ml / 1000, 3),
+             segments, heavy_aggressive, light, medium, heavy]
+            for (route, segment_id, hour), (stop_name, excess_ml, segments, light, medium, heavy, heavy_aggressive)
+            in sorted(self.cells.items())
+        ]
+
+    def to_dict(self):
+        """Compact dashboard JSON: column names plus one row per cell"""
+
+        return {
+            'trips_analyzed': self.trips_seen,
+            'columns': list(HOTSPOT_COLUMNS),
+            'rows': self.rows()
+        }
+
+
+# Test function
+def test_hotspot_index():
+    """Build an index from simulated trips in two workers and read the hotspots"""
+
+    print("🧪 Testing Hotspot Index\n")
+
+    rng = random.Random(40)
+    stops = ['Interchange', 'Market', 'School', 'Hospital', 'MRT']
+    loads = ['LIGHT', 'MEDIUM', 'HEAVY']
+    accels = ['GENTLE', 'MODERATE', 'AGGRESSIVE']
+
+    def fake_trip(i):
+        start_hour = rng.randint(6, 21)
+        speed_data = [
+            {'timestamp': s * 600 + k * 5, 'speed_kmh': 20.0, 'segment': s}
+            for s in range(len(stops)) for k in range(3)
+        ]
+        segments = []
+        for s, stop in enumerate(stops):
+            load = 'HEAVY' if stop == 'School' and start_hour in (7, 8) else rng.choice(loads)
+            accel = rng.choice(accels)
+            excess = 0.12 if (load, accel) == ('HEAVY', 'AGGRESSIVE') else rng.choice([0, 0.01, 0.02])
+            segments.append({
+                'segment_id': s, 'stop_name': stop, 'load_category': load,
+                'accel_category': accel, 'excess_fuel_liters': excess
+            })
+        trip = {'trip_id': f"T{i:06d}", 'start_time': f"{start_hour:02d}:45:00", 'speed_data': speed_data}
+        result = {'trip_id': trip['trip_id'], 'route': rng.choice(['12', '17']), 'fuel': {'segments': segments}}
+        return trip, result
+
+    trips = [fake_trip(i) for i in range(50_000)]
+
+    # Test 1: Two workers merged == one pass
+    print(f"Test 1: {len(trips):,} trips")
+    start = time.perf_counter()
+    workers = [HotspotIndex(), HotspotIndex()]
+    for i, (trip, result) in enumerate(trips):
+        workers[i % 2].add_trip(trip, result)
+    merged = workers[0].merge(workers[1])
+    elapsed = time.perf_counter() - start
+
+    single = HotspotIndex()
+    for trip, result in trips:
+        single.add_trip(trip, result)
+
+    index = merged.to_dict()
+    print(f"  {len(trips) / elapsed:,.0f} trips/s, {len(index['rows'])} cells")
+    print(f"  Merged == single pass: {index == single.to_dict()}")
+    print()
+
+    # Test 2: Departure hour follows the segment, not the trip start
+    print("Test 2: Segment hours (trip leaves at 06:45, 10 min per stop)")
+    trip, result = fake_trip(0)
+    one = HotspotIndex()
+    one.add_trip({**trip, 'start_time': '06:45:00'}, result)
+    for values in one.rows():
+        cell = dict(zip(HOTSPOT_COLUMNS, values))
+        print(f"  {cell['stop_name']}: {cell['hour']:02d}:00")
+    print()
+
+    # Test 3: Worst cells
+    print("Test 3: Hotspots")
+    for values in sorted(index['rows'], key=lambda r: r[4], reverse=True)[:3]:
+        cell = dict(zip(HOTSPOT_COLUMNS, values))
+        print(f"  Route {cell['route']} {cell['stop_name']} {cell['hour']:02d}:00: "
+              f"{cell['excess_fuel_liters']} L over {cell['segments']} departures, "
+              f"{cell['heavy_aggressive_segments']} heavy+aggressive")
+
+    print("\n✅ Hotspot Index Test Complete!")
+
+
+if __name__ == "__main__":
+    test_hotspot_index()
@@ -0,0 +1,384 @@
+"""
+Launch Detector Algorithm
+Segments speed data into sustained acceleration events (launches) and
+measures each one: peak and mean acceleration, duration, jerk and energy
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Run as a script: add parent directory to path to import algorithms
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from algorithms.acceleration_detector import (
+    DETAIL_FULL,
+    DETAIL_LEVELS,
+    DETAIL_SEGMENT,
+    DETAIL_SUMMARY,
+    EVENT_THRESHOLD,
+    KMH_TO_MS,
+    dominant_segment_category,
+    dominant_trip_pattern
+)
+from algorithms.gps_filter import (
+    find_runs,
+    preprocess_columns,
+    run_maximum,
+    speed_data_to_arrays,
+    split_monotonic_blocks
+)
+from algorithms.load_classifier import AVG_PASSENGER_WEIGHT_KG, EMPTY_BUS_WEIGHT_KG
+from algorithms.settings import current_settings
+from algorithms.trip_validator import check_sample_columns
+
+CATEGORIES = ('GENTLE', 'MODERATE', 'AGGRESSIVE')
+
+# Default launch segmentation settings
+DEFAULT_LAUNCH_CONFIG = {
+    'accel_threshold': EVENT_THRESHOLD,  # m/s², pairs above this are speeding up
+    'max_gap_sec': 2,         # Merge launches separated by a dip this short
+    'stop_speed_kmh': 3.0,    # Launches starting at or below this are from a stop
+    'gps_filter': None        # gps_filter settings to smooth/resample first
+}
+
+LAUNCH_COLUMNS = (
+    'start_time', 'end_time', 'start_speed_kmh', 'end_speed_kmh',
+    'mean_accel', 'peak_accel', 'peak_jerk', 'energy_kj', 'segment', 'from_stop'
+)
+
+
+def _empty_launches():
+    return {name: np.empty(0) for name in LAUNCH_COLUMNS}
+
+
+def detect_launches(timestamps, speeds, segments, loads, config=None):
+    """
+    Find sustained acceleration events in one monotonic block of samples
+
+    Each run of speeding-up sample pairs (with short dips bridged) is one
+    launch, from the last slow sample to the point where speed levels off.
+
+    Args:
+        timestamps, speeds, segments, loads (np.ndarray): Sample columns
+        config (dict): Launch settings (defaults to DEFAULT_LAUNCH_CONFIG)
+
+    Returns:
+        dict: Column arrays (see LAUNCH_COLUMNS), one entry per launch
+    """
+
+    config = {**DEFAULT_LAUNCH_CONFIG, **(config or {})}
+
+    if len(timestamps) < 2:
+        return _empty_launches()
+
+    dt = np.diff(timestamps)
+    accel = np.diff(speeds) / KMH_TO_MS / dt
+
+    starts, ends = find_runs(timestamps, accel > config['accel_threshold'], config['max_gap_sec'])
+    if len(starts) == 0:
+        return _empty_launches()
+
+    duration = timestamps[ends] - timestamps[starts]
+    v0 = speeds[starts] / KMH_TO_MS
+    v1 = speeds[ends] / KMH_TO_MS
+
+    # Jerk between consecutive pairs; run k has jerk samples [starts[k], ends[k] - 1)
+    if len(accel) > 1:
+        jerk = np.abs(np.diff(accel)) / ((dt[:-1] + dt[1:]) / 2)
+    else:
+        jerk = np.zeros(1)
+
+    # Kinetic energy gained, using the load on board when the launch starts
+    mass_kg = EMPTY_BUS_WEIGHT_KG + loads[starts] * AVG_PASSENGER_WEIGHT_KG
+
+    return {
+        'start_time': timestamps[starts],
+        'end_time': timestamps[ends],
+        'start_speed_kmh': speeds[starts],
+        'end_speed_kmh': speeds[ends],
+        'mean_accel': (v1 - v0) / duration,
+        'peak_accel': run_maximum(accel, starts, ends),
+        'peak_jerk': run_maximum(jerk, starts, ends - 1),
+        'energy_kj': 0.5 * mass_kg * (v1 ** 2 - v0 ** 2) / 1000,
+        'segment': segments[starts],
+        'from_stop': speeds[starts] <= config['stop_speed_kmh']
+    }
+
+
+def detect_trip_launches(speed_data, config=None):
+    """
+    Launch columns for a whole trip (raw or GPS-filtered samples)
+
+    Args:
+        speed_data (list): Speed samples for the trip
+        config (dict): Launch settings (defaults to DEFAULT_LAUNCH_CONFIG)
+
+    Returns:
+        dict: Column arrays for every launch in the trip
+    """
+
+    return detect_column_launches(speed_data_to_arrays(speed_data), config)
+
+
+def detect_column_launches(columns, config=None):
+    """
+    Launch columns for a trip already converted by speed_data_to_arrays
+
+    Args:
+        columns (tuple): (timestamps, speeds_kmh, segments, passenger_loads)
+        config (dict): Launch settings (defaults to DEFAULT_LAUNCH_CONFIG)
+
+    Returns:
+        dict: Column arrays for every launch in the trip
+    """
+
+    config = {**DEFAULT_LAUNCH_CONFIG, **(config or {})}
+
+    if len(columns[0]) < 2:
+        return _empty_launches()
+
+    if config['gps_filter'] is not None:
+        blocks = preprocess_columns(columns, config['gps_filter'])
+    else:
+        blocks = [
+            tuple(column[start:end] for column in columns)
+            for start, end in split_monotonic_blocks(columns[0])
+        ]
+
+    parts = [detect_launches(*block, config) for block in blocks]
+    if not parts:
+        return _empty_launches()
+
+    return {name: np.concatenate([p[name] for p in parts]) for name in LAUNCH_COLUMNS}
+
+
+def categorize_launches(mean_accel):
+    """Category index per launch: 0 GENTLE, 1 MODERATE, 2 AGGRESSIVE"""
+    settings = current_settings()
+    return np.searchsorted([settings.gentle_threshold, settings.moderate_threshold], mean_accel, side='right')
+
+
+def launch_events(launches):
+    """
+    Expand launch columns into event dicts (debugging / driver display)
+
+    Args:
+        launches (dict): Output of detect_trip_launches
+
+    Returns:
+        list: Events shaped like detect_acceleration_events output plus
+            launch metrics
+    """
+
+    categories = categorize_launches(launches['mean_accel'])
+
+    return [
+        {
+            'start_time': float(launches['start_time'][i]),
+            'end_time': float(launches['end_time'][i]),
+            'start_speed_kmh': round(float(launches['start_speed_kmh'][i]), 1),
+            'end_speed_kmh': round(float(launches['end_speed_kmh'][i]), 1),
+            'acceleration_ms2': round(float(launches['mean_accel'][i]), 2),
+            'peak_acceleration_ms2': round(float(launches['peak_accel'][i]), 2),
+            'duration_sec': float(launches['end_time'][i] - launches['start_time'][i]),
+            'peak_jerk_ms3': round(float(launches['peak_jerk'][i]), 2),
+            'energy_kj': round(float(launches['energy_kj'][i]), 1),
+            'from_stop': bool(launches['from_stop'][i]),
+            'category': CATEGORIES[categories[i]],
+            'segment': int(launches['segment'][i])
+        }
+        for i in range(len(categories))
+    ]
+
+
+def _segment_summaries(launches, categories, sample_counts, num_segments, detail=DETAIL_SEGMENT):
+    """Compact per-segment launch summaries, computed with bincount per column"""
+
+    segments = launches['segment'].astype(np.int64)
+    in_range = (segments >= 0) & (segments < num_segments)
+    segments, categories = segments[in_range], categories[in_range]
+
+    by_category = [
+        np.bincount(segments[categories == c], minlength=num_segments)[:num_segments]
+        for c in range(3)
+    ]
+
+    def category_of(seg_id):
+        if sample_counts[seg_id] < 2:
+            return 'UNKNOWN'
+        return dominant_segment_category(*(int(c[seg_id]) for c in by_category))
+
+    if detail == DETAIL_SUMMARY:
+        return [{'segment_id': seg_id, 'category': category_of(seg_id)} for seg_id in range(num_segments)]
+
+    def per_segment(values=None):
+        return np.bincount(segments, weights=values, minlength=num_segments)[:num_segments]
+
+    counts = per_segment()
+    accel_sum = per_segment(launches['mean_accel'][in_range])
+    duration_sum = per_segment((launches['end_time'] - launches['start_time'])[in_range])
+    energy_sum = per_segment(launches['energy_kj'][in_range])
+    from_stop = per_segment(launches['from_stop'][in_range].astype(float))
+
+    peak_accel = np.zeros(num_segments)
+    peak_jerk = np.zeros(num_segments)
+    np.maximum.at(peak_accel, segments, launches['peak_accel'][in_range])
+    np.maximum.at(peak_jerk, segments, launches['peak_jerk'][in_range])
+
+    summaries = []
+
+    for seg_id in range(num_segments):
+        n = int(counts[seg_id])
+
+        summaries.append({
+            'segment_id': seg_id,
+            'category': category_of(seg_id),
+            'avg_acceleration': round(float(accel_sum[seg_id] / n), 2) if n else 0,
+            'max_acceleration': round(float(peak_accel[seg_id]), 2),
+            'total_events': n,
+            'gentle_count': int(by_category[0][seg_id]),
+            'moderate_count': int(by_category[1][seg_id]),
+            'aggressive_count': int(by_category[2][seg_id]),
+            'launches_from_stop': int(from_stop[seg_id]),
+            'avg_duration_sec': round(float(duration_sum[seg_id] / n), 1) if n else 0,
+            'max_jerk_ms3': round(float(peak_jerk[seg_id]), 2),
+            'energy_kj': round(float(energy_sum[seg_id]), 1)
+        })
+
+    return summaries
+
+
+def analyze_trip_launches(trip_data, config=None, detail=DETAIL_SEGMENT, quality_counts=None,
+                          quality_limits=None, accel_sink=None):
+    """
+    Launch-based acceleration analysis for an entire trip
+
+    Returns the same trip-level fields as analyze_trip_acceleration, but
+    each segment holds a compact launch summary instead of an event list.
+
+    Args:
+        trip_data (dict): Trip data with speed_data
+        config (dict): Launch settings (defaults to DEFAULT_LAUNCH_CONFIG)
+        detail (str): DETAIL_SUMMARY (category per segment), DETAIL_SEGMENT
+            (launch summary per segment) or DETAIL_FULL (also per-launch event dicts)
+        quality_counts (dict): Issue counter (trip_validator.new_issue_counts)
+            to tally data-quality issues into from the same sample columns
+        quality_limits (dict): Limits for the quality checks
+        accel_sink (list): Receives (segment, mean acceleration, None) for
+            every launch
+
+    Returns:
+        dict: Complete acceleration analysis
+    """
+
+    if detail not in DETAIL_LEVELS:
+        raise ValueError(f"Unknown detail level: {detail} (expected one of {DETAIL_LEVELS})")
+
+    speed_data = trip_data.get('speed_data', [])
+
+    if not speed_data:
+        if quality_counts is not None:
+            quality_counts['missing_data'] += 1
+        return {
+            'trip_id': trip_data['trip_id'],
+            'dominant_pattern': 'UNKNOWN',
+            'error': 'No speed data available'
+        }
+
+    columns = speed_data_to_arrays(speed_data)
+    timestamps, speeds, sample_segments, _ = columns
+
+    if quality_counts is not None:
+        check_sample_columns(timestamps, speeds, sample_segments, quality_limits, quality_counts)
+
+    launches = detect_column_launches(columns, config)
+    categories = categorize_launches(launches['mean_accel'])
+    if accel_sink is not None:
+        accel_sink.extend(zip(launches['segment'].tolist(), np.round(launches['mean_accel'], 2).tolist(),
+                              [None] * len(categories)))
+
+    num_segments = len(trip_data.get('passenger_events', [])) - 1
+    sample_counts = np.bincount(sample_segments[sample_segments >= 0],
+                                minlength=max(num_segments, 0))
+
+    gentle, moderate, aggressive = (int(np.count_nonzero(categories == c)) for c in range(3))
+    total = len(categories)
+
+    analysis = {
+        'trip_id': trip_data['trip_id'],
+        'detector': 'launch',
+        'dominant_pattern': dominant_trip_pattern(gentle, moderate, aggressive),
+        'avg_acceleration': round(float(launches['mean_accel'].mean()), 2) if total else 0,
+        'max_acceleration': round(float(launches['peak_accel'].max()), 2) if total else 0,
+        'total_events': total,
+        'gentle_count': gentle,
+        'gentle_percentage': round((gentle / total) * 100, 1) if total else 0,
+        'moderate_count': moderate,
+        'moderate_percentage': round((moderate / total) * 100, 1) if total else 0,
+        'aggressive_count': aggressive,
+        'aggressive_percentage': round((aggressive / total) * 100, 1) if total else 0,
+        'launches_from_stop': int(np.count_nonzero(launches['from_stop'])),
+        'energy_kj': round(float(launches['energy_kj'].sum()), 1),
+        'segments': _segment_summaries(launches, categories, sample_counts, max(num_segments, 0), detail)
+    }
+
+    if detail == DETAIL_FULL:
+        analysis['acceleration_events'] = launch_events(launches)
+
+    return analysis
+
+
+# Test function
+def test_launch_detector():
+    """Test the launch detector with sample data"""
+
+    print("🧪 Testing Launch Detector\n")
+
+    sample_trip = {
+        'trip_id': 'T001',
+        'speed_data': [
+            {'timestamp': 0, 'speed_kmh': 0, 'segment': 0, 'passenger_load': 70},
+            {'timestamp': 5, 'speed_kmh': 15, 'segment': 0, 'passenger_load': 70},
+            {'timestamp': 10, 'speed_kmh': 30, 'segment': 0, 'passenger_load': 70},
+            {'timestamp': 15, 'speed_kmh': 45, 'segment': 0, 'passenger_load': 70},
+            {'timestamp': 20, 'speed_kmh': 45, 'segment': 0, 'passenger_load': 70},
+            {'timestamp': 25, 'speed_kmh': 30, 'segment': 0, 'passenger_load': 70},
+            {'timestamp': 30, 'speed_kmh': 0, 'segment': 0, 'passenger_load': 70},
+            {'timestamp': 0, 'speed_kmh': 0, 'segment': 1, 'passenger_load': 20},
+            {'timestamp': 5, 'speed_kmh': 28, 'segment': 1, 'passenger_load': 20},
+            {'timestamp': 10, 'speed_kmh': 55, 'segment': 1, 'passenger_load': 20},
+            {'timestamp': 15, 'speed_kmh': 55, 'segment': 1, 'passenger_load': 20},
+            {'timestamp': 20, 'speed_kmh': 0, 'segment': 1, 'passenger_load': 20},
+        ],
+        'passenger_events': [
+            {'total_onboard': 70},
+            {'total_onboard': 20},
+            {'total_onboard': 10}
+        ]
+    }
+
+    analysis = analyze_trip_launches(sample_trip, detail=DETAIL_FULL)
+    print(f"Trip: {analysis['trip_id']}")
+    print(f"Dominant Pattern: {analysis['dominant_pattern']}")
+    print(f"Launches: {analysis['total_events']} ({analysis['launches_from_stop']} from a stop)")
+    print()
+
+    for event in analysis['acceleration_events']:
+        print(f"  Segment {event['segment']}: {event['start_speed_kmh']} → {event['end_speed_kmh']} km/h "
+              f"in {event['duration_sec']:.0f}s, mean {event['acceleration_ms2']} m/s², "
+              f"peak {event['peak_acceleration_ms2']} m/s², jerk {event['peak_jerk_ms3']} m/s³, "
+              f"{event['energy_kj']} kJ → {event['category']}")
+
+    print()
+    for seg in analysis['segments']:
+        print(f"  Segment {seg['segment_id']} summary: {seg['category']}, "
+              f"{seg['total_events']} launch(es), {seg['energy_kj']} kJ")
+
+    print("\n✅ Launch Detector Test Complete!")
+
+
+if __name__ == "__main__":
+    test_launch_detector()
@@ -0,0 +1,376 @@
+"""
+Load × Acceleration Classifier
+Classifies every acceleration sample pair by the passenger load on board
+when it starts, accumulating a Load × Acceleration event matrix per trip
+and segment in the same vectorized pass that detects the events
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Run as a script: add parent directory to path to import algorithms
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from algorithms.acceleration_detector import (
+    DETAIL_FULL,
+    DETAIL_LEVELS,
+    DETAIL_SUMMARY,
+    EVENT_THRESHOLD,
+    KMH_TO_MS,
+    dominant_segment_category,
+    dominant_trip_pattern
+)
+from algorithms.gps_filter import preprocess_columns, speed_data_to_arrays
+from algorithms.settings import ACCEL_CATEGORIES, LOAD_CATEGORIES, current_settings
+from algorithms.trip_validator import check_sample_columns
+
+EVENT_COLUMNS = (
+    'start_time', 'end_time', 'start_speed_kmh', 'end_speed_kmh',
+    'accel', 'segment', 'passenger_load', 'load_cat', 'accel_cat'
+)
+
+
+def classify_loads(loads):
+    """Load category index per passenger count: 0 LIGHT, 1 MEDIUM, 2 HEAVY"""
+    settings = current_settings()
+    return np.searchsorted([settings.light_threshold, settings.medium_threshold], loads, side='left')
+
+
+def classify_accels(accel):
+    """Acceleration category index per rate: 0 GENTLE, 1 MODERATE, 2 AGGRESSIVE"""
+    settings = current_settings()
+    return np.searchsorted([settings.gentle_threshold, settings.moderate_threshold], accel, side='right')
+
+
+def _pair_events(columns, first, second):
+    """
+    Events among sample pairs (first[k], second[k]): positive time step and
+    acceleration above the noise gate, as in detect_acceleration_events
+
+    Returns:
+        dict: Column arrays (see EVENT_COLUMNS), one entry per event
+    """
+
+    timestamps, speeds, segments, loads = columns
+    dt = timestamps[second] - timestamps[first]
+    accel = np.zeros(len(dt))
+    forward = dt > 0
+    # Same operation order as calculate_acceleration, so values exactly
+    # at a threshold fall on the same side of it
+    speeds_ms = speeds / KMH_TO_MS
+    accel[forward] = (speeds_ms[second] - speeds_ms[first])[forward] / dt[forward]
+    event = forward & (accel > EVENT_THRESHOLD)
+
+    first, second, accel = first[event], second[event], accel[event]
+    return {
+        'start_time': timestamps[first],
+        'end_time': timestamps[second],
+        'start_speed_kmh': speeds[first],
+        'end_speed_kmh': speeds[second],
+        'accel': accel,
+        'segment': segments[first].astype(np.int64),
+        'passenger_load': loads[first],
+        'load_cat': classify_loads(loads[first]),
+        'accel_cat': classify_accels(accel)
+    }
+
+
+def _block_events(columns, num_segments):
+    """
+    Trip and segment events of one block of sample columns
+
+    Trip pairs are consecutive samples; segment pairs are consecutive
+    samples of the same segment (a stable sort by segment), exactly the
+    pairs the single-pass statistics of acceleration_detector use.
+    """
+
+    n = len(columns[0])
+    indices = np.arange(n)
+    trip_events = _pair_events(columns, indices[:-1], indices[1:])
+
+    segments = columns[2]
+    in_range = np.flatnonzero((segments >= 0) & (segments < num_segments))
+    order = in_range[np.argsort(segments[in_range], kind='stable')]
+    same = segments[order[1:]] == segments[order[:-1]]
+    segment_events = _pair_events(columns, order[:-1][same], order[1:][same])
+
+    return trip_events, segment_events
+
+
+def _concat(parts):
+    if len(parts) == 1:
+        return parts[0]
+    return {name: np.concatenate([p[name] for p in parts]) for name in EVENT_COLUMNS}
+
+
+def event_matrix(events, num_segments=None):
+    """
+    Load × Acceleration event counts
+
+    Args:
+        events (dict): Event columns
+        num_segments (int): Count per segment instead of per trip
+
+    Returns:
+        np.ndarray: (3, 3) counts, or (num_segments, 3, 3)
+    """
+
+    cells = events['load_cat'] * 3 + events['accel_cat']
+    if num_segments is None:
+        return np.bincount(cells, minlength=9).reshape(3, 3)
+    bins = events['segment'] * 9 + cells
+    return np.bincount(bins, minlength=num_segments * 9).reshape(num_segments, 3, 3)
+
+
+def matrix_dict(matrix):
+    """{load: {accel: count}} from a (3, 3) matrix (array or nested lists)"""
+    rows = matrix.tolist() if isinstance(matrix, np.ndarray) else matrix
+    return {load: dict(zip(ACCEL_CATEGORIES, row)) for load, row in zip(LOAD_CATEGORIES, rows)}
+
+
+def _rounded(accel):
+    """Per-event accelerations rounded as in detect_acceleration_events"""
+    return [round(a, 2) for a in accel.tolist()]
+
+
+def _event_dicts(events, rows):
+    """Event dicts (detect_acceleration_events shape plus load) for the given rows"""
+    return [
+        {
+            'start_time': events['start_time'][i].item(),
+            'end_time': events['end_time'][i].item(),
+            'start_speed_kmh': events['start_speed_kmh'][i].item(),
+            'end_speed_kmh': events['end_speed_kmh'][i].item(),
+            'acceleration_ms2': round(events['accel'][i].item(), 2),
+            'category': ACCEL_CATEGORIES[events['accel_cat'][i]],
+            'segment': int(events['segment'][i]),
+            'passenger_load': int(events['passenger_load'][i]),
+            'load_category': LOAD_CATEGORIES[events['load_cat'][i]]
+        }
+        for i in rows
+    ]
+
+
+def _segment_results(columns, events, num_segments, detail):
+    """Per-segment analyses with each segment's load and event matrix"""
+
+    segments = columns[2].astype(np.int64)
+    in_range = (segments >= 0) & (segments < num_segments)
+    samples = np.bincount(segments[in_range], minlength=num_segments).tolist()
+
+    # Load category the segment was driven with: most of its samples (ties: lighter)
+    load_counts = np.bincount(
+        segments[in_range] * 3 + classify_loads(columns[3][in_range]), minlength=num_segments * 3
+    ).reshape(num_segments, 3).tolist()
+    matrices = event_matrix(events, num_segments).tolist()
+
+    # Python lists from here on: a few values per segment
+    order = np.argsort(events['segment'], kind='stable')
+    bounds = np.searchsorted(events['segment'][order], np.arange(num_segments + 1)).tolist()
+    order = order.tolist()
+    rounded = _rounded(events['accel'])
+
+    results = []
+    for seg_id in range(num_segments):
+        rows = sorted(order[bounds[seg_id]:bounds[seg_id + 1]])
+        gentle, moderate, aggressive = (sum(column) for column in zip(*matrices[seg_id]))
+        total = len(rows)
+        counts = load_counts[seg_id]
+        load = LOAD_CATEGORIES[counts.index(max(counts))] if samples[seg_id] else 'UNKNOWN'
+
+        if samples[seg_id] < 2:
+            result = {'segment_id': seg_id, 'category': 'UNKNOWN', 'avg_acceleration': 0, 'max_acceleration': 0}
+        elif total == 0:
+            result = {'segment_id': seg_id, 'category': 'GENTLE', 'avg_acceleration': 0, 'max_acceleration': 0}
+        else:
+            values = [rounded[i] for i in rows]
+            result = {
+                'segment_id': seg_id,
+                'category': dominant_segment_category(gentle, moderate, aggressive),
+                'avg_acceleration': round(sum(values) / total, 2),
+                'max_acceleration': round(max(values), 2),
+                'total_events': total,
+                'gentle_count': gentle,
+                'moderate_count': moderate,
+                'aggressive_count': aggressive
+            }
+
+        if detail == DETAIL_SUMMARY:
+            results.append({'segment_id': seg_id, 'category': result['category'], 'load_category': load})
+            continue
+
+        result['load_category'] = load
+        result['load_accel_matrix'] = matrix_dict(matrices[seg_id])
+        if detail == DETAIL_FULL:
+            result['acceleration_events'] = _event_dicts(events, rows)
+        results.append(result)
+
+    return results
+
+
+def analyze_trip_load_accel(trip_data, detail=DETAIL_FULL, gps_filter=None,
+                            quality_counts=None, quality_limits=None, accel_sink=None):
+    """
+    Load-aware acceleration analysis for an entire trip
+
+    Returns the same fields as analyze_trip_acceleration with the default
+    detector, plus the Load × Acceleration event matrix of the trip
+    ('load_accel_matrix', {load: {accel: events}}). Each event is charged
+    to the load category of the passenger_load on board when it starts.
+    Every segment also carries the load category it was driven with (from
+    its own samples, 'UNKNOWN' without any) and, from DETAIL_SEGMENT, its
+    own matrix, so fuel estimation needs no join with the stop events.
+
+    Args:
+        trip_data (dict): Trip data with speed_data (samples with passenger_load)
+        detail (str): DETAIL_SUMMARY | DETAIL_SEGMENT | DETAIL_FULL (event
+            dicts also carry passenger_load and load_category)
+        gps_filter (dict): GPS filter settings to smooth/resample the
+            samples first; None uses them raw
+        quality_counts (dict): Issue counter (trip_validator.new_issue_counts)
+            to tally data-quality issues into from the same sample columns
+        quality_limits (dict): Limits for the quality checks
+        accel_sink (list): Receives (segment, acceleration_ms2, load category
+            on board when it starts) for every trip-level event
+
+    Returns:
+        dict: Complete acceleration analysis
+    """
+
+    if detail not in DETAIL_LEVELS:
+        raise ValueError(f"Unknown detail level: {detail} (expected one of {DETAIL_LEVELS})")
+
+    speed_data = trip_data.get('speed_data', [])
+
+    if not speed_data:
+        if quality_counts is not None:
+            quality_counts['missing_data'] += 1
+        return {
+            'trip_id': trip_data['trip_id'],
+            'dominant_pattern': 'UNKNOWN',
+            'error': 'No speed data available'
+        }
+
+    columns = speed_data_to_arrays(speed_data)
+    if quality_counts is not None:
+        check_sample_columns(columns[0], columns[1], columns[2], quality_limits, quality_counts)
+
+    num_segments = max(len(trip_data.get('passenger_events', [])) - 1, 0)
+    if gps_filter is not None and len(columns[0]) >= 2:
+        blocks = preprocess_columns(columns, gps_filter)
+        columns = tuple(np.concatenate([block[k] for block in blocks]) for k in range(4))
+    else:
+        blocks = [columns]
+    parts = [_block_events(block, num_segments) for block in blocks]
+    trip_events = _concat([trip for trip, _ in parts])
+    segment_events = _concat([segment for _, segment in parts])
+
+    matrix = event_matrix(trip_events)
+    total = len(trip_events['accel'])
+    if accel_sink is not None:
+        accel_sink.extend(zip(
+            trip_events['segment'].tolist(),
+            _rounded(trip_events['accel']),
+            [LOAD_CATEGORIES[c] for c in trip_events['load_cat'].tolist()]
+        ))
+
+    if total == 0:
+        return {
+            'trip_id': trip_data['trip_id'],
+            'dominant_pattern': 'GENTLE',
+            'avg_acceleration': 0,
+            'max_acceleration': 0,
+            'total_events': 0,
+            'load_accel_matrix': matrix_dict(matrix)
+        }
+
+    gentle, moderate, aggressive = (int(c) for c in matrix.sum(axis=0))
+    rounded = _rounded(trip_events['accel'])
+
+    return {
+        'trip_id': trip_data['trip_id'],
+        'dominant_pattern': dominant_trip_pattern(gentle, moderate, aggressive),
+        'avg_acceleration': round(sum(rounded) / total, 2),
+        'max_acceleration': round(max(rounded), 2),
+        'total_events': total,
+        'gentle_count': gentle,
+        'gentle_percentage': round((gentle / total) * 100, 1),
+        'moderate_count': moderate,
+        'moderate_percentage': round((moderate / total) * 100, 1),
+        'aggressive_count': aggressive,
+        'aggressive_percentage': round((aggressive / total) * 100, 1),
+        'load_accel_matrix': matrix_dict(matrix),
+        'segments': _segment_results(columns, segment_events, num_segments, detail)
+    }
+
+
+# Test function
+def test_load_accel_classifier():
+    """Events charged to the load on board, and the default detector's fields"""
+
+    from algorithms.acceleration_detector import DETAIL_SEGMENT, analyze_trip_acceleration
+
+    print("🧪 Testing Load × Acceleration Classifier\n")
+
+    # Segment 0 launches aggressively with 70 on board, then 10 alight mid-segment
+    sample_trip = {
+        'trip_id': 'T001',
+        'speed_data': [
+            {'timestamp': 0, 'speed_kmh': 0, 'segment': 0, 'passenger_load': 70},
+            {'timestamp': 5, 'speed_kmh': 55, 'segment': 0, 'passenger_load': 70},
+            {'timestamp': 10, 'speed_kmh': 60, 'segment': 0, 'passenger_load': 58},
+            {'timestamp': 15, 'speed_kmh': 80, 'segment': 0, 'passenger_load': 58},
+            {'timestamp': 20, 'speed_kmh': 0, 'segment': 0, 'passenger_load': 58},
+            {'timestamp': 0, 'speed_kmh': 0, 'segment': 1, 'passenger_load': 20},
+            {'timestamp': 5, 'speed_kmh': 20, 'segment': 1, 'passenger_load': 20},
+            {'timestamp': 10, 'speed_kmh': 40, 'segment': 1, 'passenger_load': 20},
+        ],
+        'passenger_events': [
+            {'total_onboard': 70},
+            {'total_onboard': 20},
+            {'total_onboard': 10}
+        ]
+    }
+
+    # Test 1: Event matrix
+    print("Test 1: Load × Acceleration events")
+    analysis = analyze_trip_load_accel(sample_trip)
+    for load, row in analysis['load_accel_matrix'].items():
+        print(f"  {load:<7} " + "  ".join(f"{accel}: {count}" for accel, count in row.items()))
+    for event in analysis['segments'][0]['acceleration_events']:
+        print(f"  Segment 0: {event['acceleration_ms2']} m/s² {event['category']} "
+              f"with {event['passenger_load']} on board → {event['load_category']}")
+    print()
+
+    # Test 2: Same statistics as the default detector
+    print("Test 2: Fields shared with analyze_trip_acceleration")
+    expected = analyze_trip_acceleration(sample_trip, detail=DETAIL_SEGMENT)
+    actual = analyze_trip_load_accel(sample_trip, detail=DETAIL_SEGMENT)
+    for segment in actual['segments']:
+        del segment['load_category'], segment['load_accel_matrix']
+    del actual['load_accel_matrix']
+    print(f"  Identical: {expected == actual}")
+    print(f"  Segment loads: {[s['load_category'] for s in analyze_trip_load_accel(sample_trip, DETAIL_SUMMARY)['segments']]}")
+    print()
+
+    # Test 3: Fuel charged per event load, not the segment's single load
+    print("Test 3: Segment 0 fuel per load (1 km)")
+    from algorithms.fuel_estimator import estimate_matrix_segment_fuel, estimate_segment_fuel
+    segment = analyze_trip_load_accel(sample_trip, detail=DETAIL_SEGMENT)['segments'][0]
+    joined = estimate_segment_fuel(segment['load_category'], segment['category'], 1.0)
+    charged = estimate_matrix_segment_fuel(segment['load_category'], segment['category'],
+                                           segment['load_accel_matrix'], 1.0)
+    for load, row in charged['by_load'].items():
+        print(f"  {load:<7} {row['share']:.0%} of events, {row['accel_category']}: "
+              f"{row['total_fuel_liters']} L ({row['excess_fuel_liters']} L excess)")
+    print(f"  Per event load: {charged['total_fuel_liters']} L vs one {joined['load_category']} "
+          f"load: {joined['total_fuel_liters']} L")
+
+    print("\n✅ Load × Acceleration Classifier Test Complete!")
+
+
+if __name__ == "__main__":
+    test_load_accel_classifier()
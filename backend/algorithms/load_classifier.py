@@ -3,14 +3,21 @@ Load Classifier Algorithm
 Classifies passenger load into Light/Medium/Heavy categories
 """
 
+import sys
+from pathlib import Path
+
+# Run as a script: add parent directory to path to import algorithms
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from algorithms.settings import current_settings
+
 # Constants
 EMPTY_BUS_WEIGHT_KG = 12000
 AVG_PASSENGER_WEIGHT_KG = 70
 BUS_CAPACITY = 84
 
-# Load category thresholds
-LIGHT_THRESHOLD = 30
-MEDIUM_THRESHOLD = 60
+# Load category thresholds live in settings (light_threshold, medium_threshold)
 
 
 def classify_load(passenger_count, capacity=BUS_CAPACITY):
@@ -38,9 +45,10 @@ def classify_load(passenger_count, capacity=BUS_CAPACITY):
     capacity_pct = (passenger_count / capacity) * 100
     
     # Classify based on thresholds
-    if passenger_count <= LIGHT_THRESHOLD:
+    settings = current_settings()
+    if passenger_count <= settings.light_threshold:
         category = "LIGHT"
-    elif passenger_count <= MEDIUM_THRESHOLD:
+    elif passenger_count <= settings.medium_threshold:
         category = "MEDIUM"
     else:
         category = "HEAVY"
@@ -123,7 +131,14 @@ def analyze_trip_load(trip_data):
     """
     
     # Classify each segment
-    segments = classify_trip_segments(trip_data['passenger_events'])
+    segments = classify_trip_segments(trip_data.get('passenger_events', []))
+    
+    if not segments:
+        return {
+            'trip_id': trip_data['trip_id'],
+            'dominant_load_category': 'UNKNOWN',
+            'error': 'No passenger data available'
+        }
     
     # Get dominant category
     dominant_category = get_dominant_load_category(segments)
@@ -0,0 +1,312 @@
+"""
+Policy Sweep Engine
+Evaluates many what-if parameter sets (load cutoffs, acceleration
+thresholds, fuel rates and penalties) over the same trips in one
+vectorized batch, without rerunning the pipeline per set
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Run as a script: add parent directory to path to import algorithms
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from algorithms.acceleration_detector import EVENT_THRESHOLD, KMH_TO_MS
+from algorithms.gps_filter import speed_data_to_arrays
+from algorithms.settings import ACCEL_CATEGORIES, LOAD_CATEGORIES, current_settings
+
+# Settings a parameter set may override (the rest come from the current settings)
+POLICY_KEYS = (
+    'light_threshold', 'medium_threshold', 'gentle_threshold', 'moderate_threshold',
+    'baseline_fuel_rates', 'fuel_penalties', 'fuel_cost_sgd'
+)
+
+# Upper bound on (parameter sets × events) elements evaluated at once
+MAX_BATCH_ELEMENTS = 20_000_000
+
+
+def build_sweep_cache(trips, segment_distances_by_route):
+    """
+    Extract the arrays every parameter set is evaluated against
+
+    Segments are flattened across all trips. Acceleration events are the
+    sample pairs the default detector would report for each segment (same
+    pairing, same noise gate), kept as raw accelerations so any threshold
+    can be applied later.
+
+    Args:
+        trips (list): Raw trips (JSON or archive-backed)
+        segment_distances_by_route (dict): {route_id: segment distances in km}
+
+    Returns:
+        dict: Cached arrays
+            segment_onboard, segment_distance, segment_samples, segment_trip,
+            event_accel, event_segment, trip_ids
+    """
+
+    onboard, distance, samples, segment_trip = [], [], [], []
+    event_accel, event_segment = [], []
+    trip_ids = []
+    offset = 0
+
+    for t, trip in enumerate(trips):
+        events = trip.get('passenger_events', [])
+        num_segments = len(events) - 1
+        if num_segments <= 0:
+            continue
+
+        route_distances = segment_distances_by_route[trip.get('route')]
+        timestamps, speeds, segments, _ = speed_data_to_arrays(trip.get('speed_data', []))
+
+        onboard.append([e['total_onboard'] for e in events[:num_segments]])
+        distance.append(route_distances[:num_segments])
+        samples.append(np.bincount(segments[(segments >= 0) & (segments < num_segments)],
+                                   minlength=num_segments))
+        segment_trip.append(np.full(num_segments, len(trip_ids)))
+        trip_ids.append(trip['trip_id'])
+
+        # Consecutive samples of the same segment, positive time step
+        pair = (segments[1:] == segments[:-1]) & (segments[1:] >= 0) & (segments[1:] < num_segments)
+        dt = np.diff(timestamps)
+        pair &= dt > 0
+        accel = np.zeros(len(dt))
+        # Same operation order as calculate_acceleration, so values exactly
+        # at a threshold fall on the same side of it
+        speeds_ms = speeds / KMH_TO_MS
+        accel[pair] = (speeds_ms[1:] - speeds_ms[:-1])[pair] / dt[pair]
+        event = pair & (accel > EVENT_THRESHOLD)
+
+        event_accel.append(accel[event])
+        event_segment.append(segments[1:][event] + offset)
+        offset += num_segments
+
+    def flat(parts, dtype):
+        return np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype=dtype)
+
+    return {
+        'segment_onboard': flat(onboard, np.int64),
+        'segment_distance': flat(distance, float),
+        'segment_samples': flat(samples, np.int64),
+        'segment_trip': flat(segment_trip, np.int64),
+        'event_accel': flat(event_accel, float),
+        'event_segment': flat(event_segment, np.int64),
+        'trip_ids': trip_ids
+    }
+
+
+def _policy_arrays(policies):
+    """Stack parameter sets into per-parameter arrays (one row per set)"""
+
+    settings = current_settings()
+    base = {key: settings.values[key] for key in POLICY_KEYS}
+    policies = [{**base, **p} for p in policies]
+
+    def column(key):
+        return np.array([p[key] for p in policies], dtype=float)
+
+    baseline = np.array(
+        [[p['baseline_fuel_rates'][load] for load in LOAD_CATEGORIES] for p in policies]
+    )
+    # Fourth acceleration column is UNKNOWN (too few samples): no penalty
+    penalty = np.array([
+        [[p['fuel_penalties'][load][accel] for accel in ACCEL_CATEGORIES] + [1.0]
+         for load in LOAD_CATEGORIES]
+        for p in policies
+    ])
+
+    return {
+        'light': column('light_threshold'),
+        'medium': column('medium_threshold'),
+        'gentle': column('gentle_threshold'),
+        'moderate': column('moderate_threshold'),
+        'fuel_cost': column('fuel_cost_sgd'),
+        'baseline': baseline,
+        'penalty': penalty
+    }
+
+
+def _evaluate_batch(cache, params):
+    """Weekly totals for a batch of parameter sets (arrays from _policy_arrays)"""
+
+    num_sets = len(params['light'])
+    num_segments = len(cache['segment_onboard'])
+    rows = np.arange(num_sets)[:, None]
+
+    # (sets × segments) load category: 0 LIGHT, 1 MEDIUM, 2 HEAVY
+    onboard = cache['segment_onboard'][None, :]
+    load_cat = (onboard > params['light'][:, None]).astype(np.int64)
+    load_cat += onboard > params['medium'][:, None]
+
+    # (sets × events) acceleration category, then per-segment counts
+    accel = cache['event_accel'][None, :]
+    event_cat = (accel >= params['gentle'][:, None]).astype(np.int64)
+    event_cat += accel >= params['moderate'][:, None]
+    bins = (rows * num_segments + cache['event_segment'][None, :]) * 3 + event_cat
+    counts = np.bincount(bins.ravel(), minlength=num_sets * num_segments * 3)
+    counts = counts.reshape(num_sets, num_segments, 3)
+
+    # Dominant segment category, as acceleration_detector.dominant_segment_category
+    gentle, moderate, aggressive = counts[..., 0], counts[..., 1], counts[..., 2]
+    accel_cat = np.where(aggressive > 0, 2, np.where(moderate > gentle, 1, 0))
+    accel_cat[:, cache['segment_samples'] < 2] = 3
+
+    # Fuel per segment with fuel_estimator's rounding
+    baseline = params['baseline'][rows, load_cat]
+    rate = np.round(baseline * params['penalty'][rows, load_cat, accel_cat], 3)
+    distance = cache['segment_distance'][None, :]
+    fuel = np.round(rate * distance, 3)
+    optimal = np.round(baseline * distance, 3)
+
+    total_fuel = fuel.sum(axis=1)
+    total_optimal = optimal.sum(axis=1)
+    waste = total_fuel - total_optimal
+
+    heavy_aggressive = np.count_nonzero((load_cat == 2) & (accel_cat == 2), axis=1)
+    load_share = np.stack([np.count_nonzero(load_cat == c, axis=1) for c in range(3)], axis=1)
+
+    return {
+        'total_fuel': total_fuel,
+        'optimal_fuel': total_optimal,
+        'waste': waste,
+        'waste_cost': waste * params['fuel_cost'],
+        'heavy_aggressive': heavy_aggressive,
+        'load_share': load_share / max(num_segments, 1)
+    }
+
+
+def evaluate_policies(cache, policies):
+    """
+    Evaluate parameter sets over the cached trips
+
+    Parameter sets are evaluated together as (sets × segments) and
+    (sets × events) arrays, in batches bounded by MAX_BATCH_ELEMENTS.
+
+    Args:
+        cache (dict): Output of build_sweep_cache
+        policies (list): Parameter sets, each overriding POLICY_KEYS of the
+            current settings
+
+    Returns:
+        list: One result dict per parameter set, in order
+    """
+
+    params = _policy_arrays(policies)
+    width = max(len(cache['event_accel']), len(cache['segment_onboard']) * 3, 1)
+    batch = max(MAX_BATCH_ELEMENTS // width, 1)
+
+    parts = []
+    for start in range(0, len(policies), batch):
+        part = {key: value[start:start + batch] for key, value in params.items()}
+        parts.append(_evaluate_batch(cache, part))
+
+    weeks_per_year = current_settings().weeks_per_year
+    totals = {key: np.concatenate([p[key] for p in parts]) for key in parts[0]} if parts else {}
+    results = []
+
+    for i, policy in enumerate(policies):
+        waste = float(totals['waste'][i])
+        optimal = float(totals['optimal_fuel'][i])
+        results.append({
+            'policy': policy,
+            'weekly_fuel_liters': round(float(totals['total_fuel'][i]), 2),
+            'weekly_fuel_waste': round(waste, 2),
+            'weekly_cost_waste': round(float(totals['waste_cost'][i]), 2),
+            'annual_cost_waste': round(float(totals['waste_cost'][i]) * weeks_per_year, 0),
+            'waste_percentage': round(waste / optimal * 100, 2) if optimal else 0,
+            'heavy_aggressive_segments': int(totals['heavy_aggressive'][i]),
+            'segment_load_share': {
+                load: round(float(totals['load_share'][i][c]) * 100, 1)
+                for c, load in enumerate(LOAD_CATEGORIES)
+            }
+        })
+
+    return results
+
+
+def policy_grid(**ranges):
+    """
+    Cartesian product of parameter values as a list of parameter sets
+
+    Example: policy_grid(medium_threshold=range(50, 71, 5), gentle_threshold=[1.2, 1.5])
+    """
+
+    keys = list(ranges)
+    grids = np.meshgrid(*[np.asarray(list(ranges[k])) for k in keys], indexing='ij')
+    return [
+        {key: grid.flat[i].item() for key, grid in zip(keys, grids)}
+        for i in range(grids[0].size)
+    ] if keys else [{}]
+
+
+# Test function
+def test_sweep():
+    """Sweep heavy cutoffs and acceleration thresholds over simulated trips"""
+
+    import random
+    from pipeline.data_simulator import generate_week_data
+    from pipeline.route_registry import get_segment_distances, load_route_registry
+    from algorithms.load_classifier import analyze_trip_load
+    from algorithms.acceleration_detector import analyze_trip_acceleration, DETAIL_SUMMARY
+    from algorithms.fuel_estimator import estimate_trip_fuel
+
+    print("🧪 Testing Policy Sweep Engine\n")
+
+    random.seed(5)
+    registry = load_route_registry()
+    trips = [t for route_trips in generate_week_data(registry=registry).values() for t in route_trips]
+    distances = {route_id: get_segment_distances(route) for route_id, route in registry.items()}
+
+    start = time.perf_counter()
+    cache = build_sweep_cache(trips, distances)
+    cache_sec = time.perf_counter() - start
+    print(f"Cache: {len(cache['trip_ids'])} trips, {len(cache['segment_onboard']):,} segments, "
+          f"{len(cache['event_accel']):,} events in {cache_sec:.2f} s\n")
+
+    # Test 1: Current policy matches the pipeline
+    print("Test 1: Current settings vs full pipeline")
+    start = time.perf_counter()
+    pipeline_waste = 0.0
+    for trip in trips:
+        load = analyze_trip_load(trip)
+        accel = analyze_trip_acceleration(trip, detail=DETAIL_SUMMARY)
+        fuel = estimate_trip_fuel(trip, load, accel, distances[trip['route']])
+        # Segment figures: trip totals are rounded to 2 dp per trip
+        pipeline_waste += sum(s['total_fuel_liters'] - s['optimal_fuel_liters'] for s in fuel['segments'])
+    pipeline_sec = time.perf_counter() - start
+    current = evaluate_policies(cache, [{}])[0]
+    print(f"  Pipeline weekly waste: {pipeline_waste:.2f} L ({pipeline_sec:.2f} s)")
+    print(f"  Sweep weekly waste:    {current['weekly_fuel_waste']:.2f} L")
+    print()
+
+    # Test 2: Heavy cutoff at 55 passengers
+    print("Test 2: Heavy cutoff 60 → 55 passengers")
+    result = evaluate_policies(cache, [{'medium_threshold': 55}])[0]
+    print(f"  Weekly waste: {result['weekly_fuel_waste']} L, heavy+aggressive segments: "
+          f"{result['heavy_aggressive_segments']} (was {current['heavy_aggressive_segments']})")
+    print()
+
+    # Test 3: 100-point sweep costs about one run
+    print("Test 3: 100-point sweep (heavy cutoff × gentle threshold)")
+    policies = policy_grid(medium_threshold=range(46, 66, 2),
+                           gentle_threshold=np.round(np.linspace(1.1, 1.9, 10), 2))
+    start = time.perf_counter()
+    evaluate_policies(cache, [{}])
+    one_sec = time.perf_counter() - start
+    start = time.perf_counter()
+    results = evaluate_policies(cache, policies)
+    sweep_sec = time.perf_counter() - start
+    print(f"  1 set: {one_sec * 1000:.1f} ms, {len(policies)} sets: {sweep_sec * 1000:.1f} ms")
+    best = min(results, key=lambda r: r['weekly_fuel_waste'])
+    worst = max(results, key=lambda r: r['weekly_fuel_waste'])
+    print(f"  Lowest waste: {best['weekly_fuel_waste']} L at {best['policy']}")
+    print(f"  Highest waste: {worst['weekly_fuel_waste']} L at {worst['policy']}")
+
+    print("\n✅ Policy Sweep Test Complete!")
+
+
+if __name__ == "__main__":
+    test_sweep()
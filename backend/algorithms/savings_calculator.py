@@ -4,10 +4,17 @@ Calculates fuel waste, cost impact, and generates recommendations
 The final algorithm that quantifies the business case
 """
 
-# Constants
-FUEL_COST_SGD = 1.50  # SGD per liter
-DAYS_PER_WEEK = 5
-WEEKS_PER_YEAR = 52
+import sys
+from pathlib import Path
+
+# Run as a script: add parent directory to path to import algorithms
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from algorithms.fuel_estimator import heavy_aggressive_excess
+from algorithms.settings import current_settings
+
+# Fuel price and calendar constants (days_per_week, weeks_per_year) live in settings
 
 
 def calculate_segment_savings(fuel_estimate):
@@ -31,7 +38,7 @@ def calculate_segment_savings(fuel_estimate):
             'recommendation': 'Already optimal'
         }
     
-    wasted_cost = excess_fuel * FUEL_COST_SGD
+    wasted_cost = excess_fuel * current_settings().fuel_cost_sgd
     
     # Generate specific recommendation
     load = fuel_estimate['load_category']
@@ -95,15 +102,16 @@ def calculate_trip_savings(fuel_estimation):
         savings['stop_name'] = seg.get('stop_name', f"Stop {seg['segment_id']}")
         segment_savings.append(savings)
         
-        # Track heavy + aggressive segments
-        if seg['load_category'] == 'HEAVY' and seg['accel_category'] == 'AGGRESSIVE':
+        # Track heavy + aggressive segments (per event load when estimated from a matrix)
+        excess = heavy_aggressive_excess(seg)
+        if excess is not None:
             heavy_aggressive_count += 1
-            heavy_aggressive_waste += seg['excess_fuel_liters']
+            heavy_aggressive_waste += excess
     
     # Generate overall recommendation
     if heavy_aggressive_count > 0:
         main_issue = f"{heavy_aggressive_count} segment(s) with HEAVY load + AGGRESSIVE acceleration"
-        main_action = "Use GENTLE acceleration when passenger count exceeds 60"
+        main_action = f"Use GENTLE acceleration when passenger count exceeds {current_settings().medium_threshold}"
         priority = 'CRITICAL'
     elif fuel_estimation.get('problem_segments', 0) > 0:
         main_issue = "Multiple segments with suboptimal load/acceleration combinations"
@@ -160,8 +168,9 @@ def calculate_fleet_savings(trip_savings_list):
     weekly_waste = total_fuel_waste
     weekly_cost = total_cost_waste
     
-    annual_waste = weekly_waste * WEEKS_PER_YEAR
-    annual_cost = weekly_cost * WEEKS_PER_YEAR
+    weeks_per_year = current_settings().weeks_per_year
+    annual_waste = weekly_waste * weeks_per_year
+    annual_cost = weekly_cost * weeks_per_year
     
     return {
         'period': 'Weekly',
@@ -180,37 +189,6 @@ def calculate_fleet_savings(trip_savings_list):
     }
 
 
-def project_fleet_wide_impact(route_savings, num_routes=127, num_buses=3300):
-    """
-    Project Route 12 savings to entire SBS Transit fleet
-    
-    Args:
-        route_savings (dict): Fleet savings for Route 12
-        num_routes (int): Total number of SBS routes
-        num_buses (int): Total fleet size
-    
-    Returns:
-        dict: Fleet-wide projection
-    """
-    
-    # Conservative multiplier (not all routes same as Route 12)
-    route_multiplier = num_routes * 0.8  # 80% of routes have similar patterns
-    
-    projected_annual_waste = route_savings['annual_fuel_waste'] * route_multiplier
-    projected_annual_cost = route_savings['annual_cost_waste'] * route_multiplier
-    
-    return {
-        'basis': f"Route 12 (Week of Dec 16-20, 2024)",
-        'projection_method': f"Extrapolated to {num_routes} routes (80% applicability)",
-        'total_fleet_buses': num_buses,
-        'projected_annual_fuel_waste': round(projected_annual_waste, 0),
-        'projected_annual_cost_waste': round(projected_annual_cost, 0),
-        'cost_per_bus_per_year': round(projected_annual_cost / num_buses, 2),
-        'savings_if_50pct_adoption': round(projected_annual_cost * 0.5, 0),
-        'savings_if_80pct_adoption': round(projected_annual_cost * 0.8, 0)
-    }
-
-
 def generate_driver_report(driver_trips_savings):
     """
     Generate performance report for individual driver
@@ -234,12 +212,12 @@ def generate_driver_report(driver_trips_savings):
     
     # Calculate weekly savings potential
     weekly_savings = round(total_cost_waste, 2)
-    annual_savings = round(weekly_savings * WEEKS_PER_YEAR, 2)
+    annual_savings = round(weekly_savings * current_settings().weeks_per_year, 2)
     
     # Generate feedback
     if critical_trips > 0:
         feedback = f"⚠️ {critical_trips} trips with critical waste (Heavy load + Aggressive acceleration)"
-        action = "Primary focus: Use GENTLE acceleration when passenger count >60"
+        action = f"Primary focus: Use GENTLE acceleration when passenger count >{current_settings().medium_threshold}"
         performance_level = "NEEDS IMPROVEMENT"
     elif total_waste > 5:
         feedback = f"Some inefficiency detected across {total_trips} trips"
@@ -338,18 +316,8 @@ def test_calculator():
     print(f"  Critical Trips: {fleet_savings['critical_trips']}")
     print()
     
-    # Test 4: Fleet-wide projection
-    print("Test 4: SBS Transit fleet-wide projection")
-    projection = project_fleet_wide_impact(fleet_savings)
-    print(f"  Projected Annual Fleet Waste: {projection['projected_annual_fuel_waste']:,.0f} L")
-    print(f"  Projected Annual Cost: ${projection['projected_annual_cost_waste']:,.0f} SGD")
-    print(f"  Cost per bus per year: ${projection['cost_per_bus_per_year']} SGD")
-    print(f"  Savings at 50% adoption: ${projection['savings_if_50pct_adoption']:,.0f} SGD")
-    print(f"  Savings at 80% adoption: ${projection['savings_if_80pct_adoption']:,.0f} SGD")
-    print()
-    
-    # Test 5: Driver report
-    print("Test 5: Driver performance report")
+    # Test 4: Driver report
+    print("Test 4: Driver performance report")
     driver_report = generate_driver_report([trip_savings] * 6)  # 6 trips
     print(f"  Performance: {driver_report['performance_level']}")
     print(f"  Weekly Savings Potential: ${driver_report['weekly_savings_potential']}")
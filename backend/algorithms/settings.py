@@ -0,0 +1,301 @@
+"""
+Settings
+Versioned thresholds, fuel rates, fuel price and calendar constants loaded
+from backend/data/settings.json, reloadable while the process keeps running
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from types import MappingProxyType
+
+# Default location of the settings file
+SETTINGS_FILE = Path(__file__).parent.parent / "data" / "settings.json"
+
+LOAD_CATEGORIES = ('LIGHT', 'MEDIUM', 'HEAVY')
+ACCEL_CATEGORIES = ('GENTLE', 'MODERATE', 'AGGRESSIVE')
+
+SETTING_KEYS = (
+    'version',
+    'light_threshold',     # Passengers, LIGHT at or below
+    'medium_threshold',    # Passengers, HEAVY above
+    'gentle_threshold',    # m/s², GENTLE below
+    'moderate_threshold',  # m/s², AGGRESSIVE at or above
+    'baseline_fuel_rates', # L/km per load category with gentle acceleration
+    'fuel_penalties',      # Multiplier per load × acceleration category
+    'fuel_cost_sgd',       # SGD per liter
+    'days_per_week',       # Operating days in a simulated week
+    'weeks_per_year'
+)
+
+
+def _validate_settings(values):
+    """Raise ValueError if a settings dict cannot be used by the algorithms"""
+
+    missing = [key for key in SETTING_KEYS if key not in values]
+    if missing:
+        raise ValueError(f"Settings missing: {', '.join(missing)}")
+
+    if not isinstance(values['version'], int):
+        raise ValueError("Settings 'version' must be an integer")
+
+    if not 0 <= values['light_threshold'] < values['medium_threshold']:
+        raise ValueError("Settings need 0 <= light_threshold < medium_threshold")
+
+    if not 0 < values['gentle_threshold'] < values['moderate_threshold']:
+        raise ValueError("Settings need 0 < gentle_threshold < moderate_threshold")
+
+    for load in LOAD_CATEGORIES:
+        if not values['baseline_fuel_rates'].get(load, 0) > 0:
+            raise ValueError(f"Settings need a positive baseline fuel rate for {load}")
+        for accel in ACCEL_CATEGORIES:
+            if not values['fuel_penalties'].get(load, {}).get(accel, 0) > 0:
+                raise ValueError(f"Settings need a positive fuel penalty for {load} × {accel}")
+
+    if not values['fuel_cost_sgd'] > 0:
+        raise ValueError("Settings 'fuel_cost_sgd' must be positive")
+
+    if not (values['days_per_week'] > 0 and values['weeks_per_year'] > 0):
+        raise ValueError("Settings calendar constants must be positive")
+
+
+class Settings:
+    """
+    One settings version with its derived lookup tables
+
+    Built once and never mutated: a reload builds a new object and swaps the
+    reference, so readers always see a complete, consistent version.
+    """
+
+    def __init__(self, values):
+        _validate_settings(values)
+
+        self.version = values['version']
+        self.light_threshold = values['light_threshold']
+        self.medium_threshold = values['medium_threshold']
+        self.gentle_threshold = values['gentle_threshold']
+        self.moderate_threshold = values['moderate_threshold']
+        self.fuel_cost_sgd = values['fuel_cost_sgd']
+        self.days_per_week = values['days_per_week']
+        self.weeks_per_year = values['weeks_per_year']
+
+        self.baseline_fuel_rates = MappingProxyType(dict(values['baseline_fuel_rates']))
+        self.fuel_penalties = MappingProxyType({
+            load: MappingProxyType(dict(penalties)) for load, penalties in values['fuel_penalties'].items()
+        })
+
+        # Derived: L/km per load × acceleration, rounded as fuel_estimator reports it
+        self.fuel_rates = MappingProxyType({
+            load: MappingProxyType({
+                accel: round(self.baseline_fuel_rates[load] * penalty, 3)
+                for accel, penalty in self.fuel_penalties[load].items()
+            })
+            for load in self.fuel_penalties if load in self.baseline_fuel_rates
+        })
+
+        self.values = MappingProxyType({key: values[key] for key in SETTING_KEYS})
+
+    def as_dict(self):
+        """Plain copy of the settings values (e.g. for JSON output)"""
+        return json.loads(json.dumps(dict(self.values)))
+
+
+def load_settings(path=None):
+    """
+    Load and validate a settings file
+
+    Args:
+        path (str | Path): Settings JSON file (default backend/data/settings.json)
+
+    Returns:
+        Settings: Immutable settings version
+    """
+
+    with open(Path(path) if path else SETTINGS_FILE, 'r') as f:
+        return Settings(json.load(f))
+
+
+class SettingsStore:
+    """
+    Current settings version of a file, reloaded when the file changes
+
+    A reload only replaces the current version if the new file is valid and
+    carries a higher version number; otherwise the running version is kept
+    and the reason is stored in last_error.
+    """
+
+    def __init__(self, path=None, poll_interval_sec=2.0):
+        self.path = Path(path) if path else SETTINGS_FILE
+        self.poll_interval_sec = poll_interval_sec
+        self.last_error = None
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+        self._stamp = self._file_stamp()
+        self._settings = load_settings(self.path)
+
+    def _file_stamp(self):
+        stat = self.path.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def current(self):
+        """Settings version in effect"""
+        return self._settings
+
+    def check_for_changes(self):
+        """
+        Reload the file if it changed since the last check
+
+        Returns:
+            bool: True if a new version was installed
+        """
+
+        with self._lock:
+            try:
+                stamp = self._file_stamp()
+            except OSError as e:
+                self.last_error = str(e)
+                return False
+
+            if stamp == self._stamp:
+                return False
+            self._stamp = stamp
+
+            try:
+                settings = load_settings(self.path)
+            except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+                self.last_error = f"Kept version {self._settings.version}: {e}"
+                return False
+
+            if settings.version <= self._settings.version:
+                self.last_error = (f"Kept version {self._settings.version}: "
+                                   f"file version {settings.version} is not newer")
+                return False
+
+            self._settings = settings
+            self.last_error = None
+            return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval_sec):
+            self.check_for_changes()
+
+    def start_watching(self):
+        """Poll the file for changes in a background thread"""
+        if self._watcher is None:
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name='settings-watcher', daemon=True)
+            self._watcher.start()
+
+    def stop_watching(self):
+        """Stop the background poller"""
+        if self._watcher is not None:
+            self._stop.set()
+            self._watcher.join()
+            self._watcher = None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+# Version pinned for the work running in this context (e.g. one trip)
+_pinned = ContextVar('pinned_settings', default=None)
+
+
+def get_store():
+    """Process-wide store for backend/data/settings.json, created on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SettingsStore()
+    return _store
+
+
+def set_store(store):
+    """Replace the process-wide store (e.g. to read another settings file)"""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def current_settings():
+    """Settings pinned by pin_settings in this context, else the store's current version"""
+    return _pinned.get() or get_store().current()
+
+
+@contextmanager
+def pin_settings(settings=None):
+    """
+    Use one settings version for everything inside the block
+
+    Work that must not straddle a reload (one trip from start to finish)
+    runs inside the block; reloads in the meantime apply to later work.
+
+    Args:
+        settings (Settings): Version to pin (default: the current one)
+    """
+
+    settings = settings or current_settings()
+    token = _pinned.set(settings)
+    try:
+        yield settings
+    finally:
+        _pinned.reset(token)
+
+
+# Test function
+def test_settings():
+    """Reload a copy of the settings file while work is pinned to the old version"""
+
+    import shutil
+    import tempfile
+
+    print("🧪 Testing Settings\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "settings.json"
+        shutil.copy(SETTINGS_FILE, path)
+        store = SettingsStore(path, poll_interval_sec=0.05)
+        set_store(store)
+
+        print(f"Loaded version {current_settings().version}: "
+              f"fuel S${current_settings().fuel_cost_sgd}/L, "
+              f"HEAVY × AGGRESSIVE {current_settings().fuel_rates['HEAVY']['AGGRESSIVE']} L/km")
+
+        def write(**changes):
+            values = {**json.loads(path.read_text()), **changes}
+            path.write_text(json.dumps(values))
+
+        # Test 1: In-flight work keeps its version across a reload
+        print("\nTest 1: Fuel price change while a trip is in flight")
+        store.start_watching()
+        with pin_settings() as trip_settings:
+            write(version=2, fuel_cost_sgd=1.80)
+            time.sleep(0.2)
+            print(f"  In-flight trip: version {current_settings().version}, "
+                  f"S${current_settings().fuel_cost_sgd}/L")
+        print(f"  Next trip:      version {current_settings().version}, "
+              f"S${current_settings().fuel_cost_sgd}/L")
+
+        # Test 2: Invalid or stale files are rejected
+        print("\nTest 2: Rejected reloads")
+        write(version=3, gentle_threshold=3.0)
+        time.sleep(0.2)
+        print(f"  Invalid file → version {current_settings().version} ({store.last_error})")
+        write(version=2, gentle_threshold=1.5, fuel_cost_sgd=9.99)
+        time.sleep(0.2)
+        print(f"  Stale version → version {current_settings().version} ({store.last_error})")
+        store.stop_watching()
+
+    set_store(None)
+    print("\n✅ Settings Test Complete!")
+
+
+if __name__ == "__main__":
+    test_settings()
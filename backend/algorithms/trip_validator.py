@@ -0,0 +1,240 @@
+"""
+Trip Validator
+Flags data-quality problems in raw trips (GPS gaps, duplicate or
+out-of-order timestamps, impossible speeds/accelerations, passenger
+counts above capacity) and decides which trips to quarantine
+"""
+
+import sys
+from pathlib import Path
+
+# Run as a script: add parent directory to path to import algorithms
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from algorithms.acceleration_detector import KMH_TO_MS, analyze_trip_acceleration
+from algorithms.load_classifier import BUS_CAPACITY
+
+# NumPy is only needed by the column checks and is imported there, so the
+# per-trip pipeline (passenger checks, reports) starts without it
+
+# Physical and sensor limits a valid trip stays within
+QUALITY_LIMITS = {
+    'max_gap_sec': 30,       # Longer silence between samples is a GPS gap
+    'max_speed_kmh': 120,    # No bus in the fleet goes faster
+    'max_accel_ms2': 5.0,    # |acceleration| beyond this is a GPS glitch
+    'capacity': BUS_CAPACITY
+}
+
+ISSUE_TYPES = (
+    'missing_data',
+    'gps_gap',
+    'duplicate_timestamp',
+    'out_of_order',
+    'impossible_speed',
+    'impossible_acceleration',
+    'over_capacity'
+)
+
+# Issues that make the analysis untrustworthy; the others are only reported
+QUARANTINE_ISSUES = (
+    'missing_data',
+    'out_of_order',
+    'impossible_speed',
+    'impossible_acceleration',
+    'over_capacity'
+)
+
+
+def new_issue_counts():
+    """Zeroed counter for every issue type"""
+    return {issue: 0 for issue in ISSUE_TYPES}
+
+
+def check_sample_columns(timestamps, speeds, segments, limits=None, counts=None):
+    """
+    Vectorized checks over a trip's speed samples
+
+    Timestamps restarting at a segment boundary are not an error (the
+    simulator and some devices reset the clock per segment); going back
+    in time or repeating a timestamp within a segment is.
+    acceleration_detector._scan_segment_stats repeats these checks per sample
+    in its statistics pass; the two must count the same issues.
+
+    Args:
+        timestamps, speeds, segments (np.ndarray): Sample columns
+        limits (dict): Quality limits (defaults to QUALITY_LIMITS)
+        counts (dict): Issue counter to add to (a new one if omitted)
+
+    Returns:
+        dict: Issue counts
+    """
+
+    import numpy as np
+
+    limits = {**QUALITY_LIMITS, **(limits or {})}
+    counts = counts if counts is not None else new_issue_counts()
+
+    if len(timestamps) == 0:
+        counts['missing_data'] += 1
+        return counts
+
+    counts['impossible_speed'] += int(np.count_nonzero(
+        (speeds < 0) | (speeds > limits['max_speed_kmh']) | ~np.isfinite(speeds)
+    ))
+
+    if len(timestamps) < 2:
+        return counts
+
+    dt = np.diff(timestamps)
+    same_segment = segments[1:] == segments[:-1]
+
+    counts['duplicate_timestamp'] += int(np.count_nonzero((dt == 0) & same_segment))
+    counts['out_of_order'] += int(np.count_nonzero((dt < 0) & same_segment))
+    counts['gps_gap'] += int(np.count_nonzero(dt > limits['max_gap_sec']))
+
+    moving = dt > 0
+    accel = np.diff(speeds)[moving] / KMH_TO_MS / dt[moving]
+    counts['impossible_acceleration'] += int(np.count_nonzero(np.abs(accel) > limits['max_accel_ms2']))
+
+    return counts
+
+
+def check_speed_data(speed_data, limits=None, counts=None):
+    """
+    check_sample_columns over a trip's speed_data (sample dicts or archived)
+
+    Args:
+        speed_data (list): Speed samples
+        limits (dict): Quality limits (defaults to QUALITY_LIMITS)
+        counts (dict): Issue counter to add to (a new one if omitted)
+
+    Returns:
+        dict: Issue counts
+    """
+
+    from algorithms.gps_filter import speed_data_to_arrays
+
+    timestamps, speeds, segments, _ = speed_data_to_arrays(speed_data)
+    return check_sample_columns(timestamps, speeds, segments, limits, counts)
+
+
+def check_passenger_events(passenger_events, limits=None, counts=None):
+    """
+    Checks over a trip's passenger counts
+
+    Args:
+        passenger_events (list): Passenger events with 'total_onboard'
+        limits (dict): Quality limits (defaults to QUALITY_LIMITS)
+        counts (dict): Issue counter to add to (a new one if omitted)
+
+    Returns:
+        dict: Issue counts
+    """
+
+    limits = {**QUALITY_LIMITS, **(limits or {})}
+    counts = counts if counts is not None else new_issue_counts()
+
+    if len(passenger_events) < 2:
+        counts['missing_data'] += 1
+        return counts
+
+    counts['over_capacity'] += sum(
+        1 for event in passenger_events
+        if not 0 <= event.get('total_onboard', 0) <= limits['capacity']
+    )
+
+    return counts
+
+
+def build_quality_report(trip_id, counts):
+    """
+    Summarize issue counts for a trip
+
+    Args:
+        trip_id (str): Trip identifier
+        counts (dict): Issue counts
+
+    Returns:
+        dict: {'trip_id', 'valid', 'quarantine', 'issues'} where 'issues'
+            only lists issue types that occurred
+    """
+
+    issues = {issue: count for issue, count in counts.items() if count}
+    quarantine = any(issue in issues for issue in QUARANTINE_ISSUES)
+
+    return {
+        'trip_id': trip_id,
+        'valid': not issues,
+        'quarantine': quarantine,
+        'issues': issues
+    }
+
+
+def validate_trip(trip_data, limits=None):
+    """
+    Standalone data-quality check for a raw trip
+
+    Analyzers that already traverse the samples report the same counts
+    from their own pass; use this when no analysis is running.
+
+    Args:
+        trip_data (dict): Raw trip with speed_data and passenger_events
+        limits (dict): Quality limits (defaults to QUALITY_LIMITS)
+
+    Returns:
+        dict: Quality report (see build_quality_report)
+    """
+
+    counts = check_passenger_events(trip_data.get('passenger_events', []), limits)
+    check_speed_data(trip_data.get('speed_data', []), limits, counts)
+
+    return build_quality_report(trip_data.get('trip_id'), counts)
+
+
+# Test function
+def test_validator():
+    """Test the validator with clean and broken trips"""
+
+    print("🧪 Testing Trip Validator\n")
+
+    clean_trip = {
+        'trip_id': 'T_CLEAN',
+        'speed_data': [
+            {'timestamp': 0, 'speed_kmh': 0, 'segment': 0},
+            {'timestamp': 5, 'speed_kmh': 20, 'segment': 0},
+            {'timestamp': 10, 'speed_kmh': 0, 'segment': 0},
+            {'timestamp': 0, 'speed_kmh': 0, 'segment': 1},
+            {'timestamp': 5, 'speed_kmh': 25, 'segment': 1},
+        ],
+        'passenger_events': [{'total_onboard': 20}, {'total_onboard': 30}, {'total_onboard': 10}]
+    }
+
+    broken_trip = {
+        'trip_id': 'T_BROKEN',
+        'speed_data': [
+            {'timestamp': 0, 'speed_kmh': 0, 'segment': 0},
+            {'timestamp': 5, 'speed_kmh': 20, 'segment': 0},
+            {'timestamp': 5, 'speed_kmh': 21, 'segment': 0},     # Duplicate timestamp
+            {'timestamp': 60, 'speed_kmh': 30, 'segment': 0},    # GPS gap
+            {'timestamp': 61, 'speed_kmh': 180, 'segment': 0},   # Impossible speed + acceleration
+            {'timestamp': 55, 'speed_kmh': 30, 'segment': 0},    # Out of order
+        ],
+        'passenger_events': [{'total_onboard': 40}, {'total_onboard': 95}]  # Over capacity
+    }
+
+    for trip in (clean_trip, broken_trip, {'trip_id': 'T_EMPTY', 'speed_data': [], 'passenger_events': []}):
+        report = validate_trip(trip)
+        status = 'QUARANTINE' if report['quarantine'] else ('OK' if report['valid'] else 'WARN')
+        print(f"{report['trip_id']}: {status} {report['issues']}")
+
+        # The detector's statistics pass tallies the same sample issues
+        scanned = new_issue_counts()
+        analyze_trip_acceleration(trip, quality_counts=scanned, quality_limits=QUALITY_LIMITS)
+        print(f"  Detector pass agrees: {scanned == check_speed_data(trip['speed_data'])}")
+
+    print("\n✅ Trip Validator Test Complete!")
+
+
+if __name__ == "__main__":
+    test_validator()
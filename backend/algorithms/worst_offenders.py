@@ -0,0 +1,241 @@
+"""
+Worst Offenders
+Tracks the K most wasteful trips, segments and stops of a run in bounded
+memory; trackers from separate workers merge into the same result
+"""
+
+import heapq
+import random
+import time
+
+
+class TopK:
+    """
+    The k highest-scoring items seen so far (min-heap of size k)
+
+    Entries are ordered by (score, key), with key a unique string, so the
+    kept set does not depend on insertion or merge order.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self._heap = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, score, key, item):
+        """Offer an item; O(log k), nothing is stored unless it makes the top k"""
+        entry = (score, key, item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def merge(self, other):
+        """Fold another TopK into this one"""
+        for entry in other._heap:
+            self.push(*entry)
+        return self
+
+    def items(self):
+        """Kept items, highest score first"""
+        return [item for _, _, item in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+
+class WorstOffenders:
+    """
+    Worst trips (wasted fuel), segments (excess fuel) and stops (total
+    excess fuel of segments starting there) over processed trips
+
+    Trips and segments keep k entries each. Stops are summed per (route,
+    stop), which is bounded by the network size, and ranked on export.
+    Stop sums are kept in whole milliliters (segment excess is reported to
+    3 dp), so merged totals are exact in any merge order.
+    """
+
+    def __init__(self, k=20):
+        self.k = k
+        self.trips = TopK(k)
+        self.segments = TopK(k)
+        self.stops = {}
+        self.trips_seen = 0
+
+    def add_trip(self, result):
+        """
+        Account one processed trip (output of process_single_trip)
+
+        Args:
+            result (dict): Processed trip with 'fuel' and 'load'/'acceleration'
+        """
+
+        fuel = result.get('fuel', {})
+        if 'segments' not in fuel:
+            return
+
+        self.trips_seen += 1
+        route = result.get('route')
+        trip_id = result['trip_id']
+
+        self.trips.push(fuel['wasted_fuel_liters'], trip_id, {
+            'trip_id': trip_id,
+            'route': route,
+            'driver_id': result.get('driver_id'),
+            'bus_id': result.get('bus_id'),
+            'date': result.get('date'),
+            'wasted_fuel_liters': fuel['wasted_fuel_liters'],
+            'wasted_cost_sgd': fuel['wasted_cost_sgd'],
+            'waste_percentage': fuel['waste_percentage'],
+            'problem_segments': fuel['problem_segments'],
+            'load_category': result['load']['dominant_load_category'],
+            'accel_pattern': result['acceleration']['dominant_pattern']
+        })
+
+        for segment in fuel['segments']:
+            excess = segment['excess_fuel_liters']
+            heavy_aggressive = segment['load_category'] == 'HEAVY' and segment['accel_category'] == 'AGGRESSIVE'
+
+            stop_key = (route, segment['stop_name'])
+            stop = self.stops.get(stop_key)
+            if stop is None:
+                stop = self.stops[stop_key] = {'excess_fuel_ml': 0, 'segments': 0, 'heavy_aggressive': 0}
+            stop['excess_fuel_ml'] += round(excess * 1000)
+            stop['segments'] += 1
+            stop['heavy_aggressive'] += heavy_aggressive
+
+            if excess <= 0:
+                continue
+
+            self.segments.push(excess, f"{trip_id}:{segment['segment_id']:04d}", {
+                'trip_id': trip_id,
+                'route': route,
+                'driver_id': result.get('driver_id'),
+                'segment_id': segment['segment_id'],
+                'from_stop': segment['stop_name'],
+                'load_category': segment['load_category'],
+                'accel_category': segment['accel_category'],
+                'excess_fuel_liters': excess
+            })
+
+    def merge(self, other):
+        """Fold another worker's offenders into this one"""
+
+        self.trips.merge(other.trips)
+        self.segments.merge(other.segments)
+        self.trips_seen += other.trips_seen
+
+        for key, theirs in other.stops.items():
+            stop = self.stops.setdefault(key, {'excess_fuel_ml': 0, 'segments': 0, 'heavy_aggressive': 0})
+            for field, value in theirs.items():
+                stop[field] += value
+
+        return self
+
+    def worst_stops(self, k=None):
+        """Stops with the most total excess fuel, worst first"""
+
+        ranked = heapq.nlargest(
+            k or self.k, self.stops.items(),
+            key=lambda kv: (kv[1]['excess_fuel_ml'], kv[0][0], kv[0][1])
+        )
+        return [
+            {
+                'route': route,
+                'stop_name': stop_name,
+                'excess_fuel_liters': round(stats['excess_fuel_ml'] / 1000, 2),
+                'segments': stats['segments'],
+                'heavy_aggressive_segments': stats['heavy_aggressive'],
+                'heavy_aggressive_percentage': round(stats['heavy_aggressive'] / stats['segments'] * 100, 1)
+            }
+            for (route, stop_name), stats in ranked
+        ]
+
+    def to_dict(self):
+        """Dashboard JSON: worst trips, segments and stops"""
+
+        return {
+            'k': self.k,
+            'trips_analyzed': self.trips_seen,
+            'worst_trips': self.trips.items(),
+            'worst_segments': self.segments.items(),
+            'worst_stops': self.worst_stops()
+        }
+
+
+# Test function
+def test_worst_offenders():
+    """Merging per-worker trackers gives the same result as sorting everything"""
+
+    print("🧪 Testing Worst Offenders\n")
+
+    rng = random.Random(4)
+    loads = ['LIGHT', 'MEDIUM', 'HEAVY']
+    accels = ['GENTLE', 'MODERATE', 'AGGRESSIVE']
+
+    def fake_trip(i):
+        segments = [
+            {
+                'segment_id': s,
+                'stop_name': f"Stop {s}",
+                'load_category': rng.choice(loads),
+                'accel_category': rng.choice(accels),
+                'excess_fuel_liters': round(max(rng.gauss(0.05, 0.08), 0), 3)
+            }
+            for s in range(10)
+        ]
+        wasted = round(sum(s['excess_fuel_liters'] for s in segments), 2)
+        return {
+            'trip_id': f"T{i:07d}",
+            'route': rng.choice(['12', '17', '31', '43']),
+            'driver_id': f"D{i % 500:03d}",
+            'bus_id': f"B{i % 300:03d}",
+            'date': '2024-12-16',
+            'load': {'dominant_load_category': rng.choice(loads)},
+            'acceleration': {'dominant_pattern': rng.choice(accels)},
+            'fuel': {
+                'wasted_fuel_liters': wasted, 'wasted_cost_sgd': round(wasted * 1.5, 2),
+                'waste_percentage': 0.0, 'problem_segments': 0, 'segments': segments
+            }
+        }
+
+    trips = [fake_trip(i) for i in range(200_000)]
+
+    # Test 1: Four workers merged vs one tracker vs full sort
+    print(f"Test 1: {len(trips):,} trips, 4 workers merged")
+    start = time.perf_counter()
+    workers = [WorstOffenders(k=10) for _ in range(4)]
+    for i, trip in enumerate(trips):
+        workers[i % 4].add_trip(trip)
+    merged = workers[0]
+    for worker in workers[1:]:
+        merged.merge(worker)
+    elapsed = time.perf_counter() - start
+
+    single = WorstOffenders(k=10)
+    for trip in trips:
+        single.add_trip(trip)
+
+    expected = sorted(trips, key=lambda t: (t['fuel']['wasted_fuel_liters'], t['trip_id']), reverse=True)[:10]
+    result = merged.to_dict()
+    print(f"  {len(trips) / elapsed:,.0f} trips/s")
+    print(f"  Merged == single tracker: {result == single.to_dict()}")
+    print(f"  Worst trips == full sort: {[t['trip_id'] for t in result['worst_trips']] == [t['trip_id'] for t in expected]}")
+    print()
+
+    # Test 2: Dashboard lists
+    print("Test 2: Worst offenders")
+    for trip in result['worst_trips'][:3]:
+        print(f"  Trip {trip['trip_id']} (route {trip['route']}, driver {trip['driver_id']}): "
+              f"{trip['wasted_fuel_liters']} L wasted")
+    for segment in result['worst_segments'][:3]:
+        print(f"  Segment {segment['trip_id']}#{segment['segment_id']} from {segment['from_stop']}: "
+              f"{segment['excess_fuel_liters']} L")
+    for stop in result['worst_stops'][:3]:
+        print(f"  Stop {stop['stop_name']} (route {stop['route']}): {stop['excess_fuel_liters']} L over "
+              f"{stop['segments']} segments, {stop['heavy_aggressive_percentage']}% heavy+aggressive")
+
+    print("\n✅ Worst Offenders Test Complete!")
+
+
+if __name__ == "__main__":
+    test_worst_offenders()
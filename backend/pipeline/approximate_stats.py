@@ -0,0 +1,481 @@
+"""
+Approximate Fleet Statistics
+Processes a stratified sample of trips (route × peak/off-peak × day) and
+estimates the fleet statistics with error bounds, refining as more of the
+sample is processed until it reaches the exact figures
+"""
+
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+# Run as a script: add parent directory to path to import pipeline modules
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from algorithms.settings import LOAD_CATEGORIES, current_settings
+
+# Sample fractions at which an estimate is reported
+DEFAULT_FRACTIONS = (0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Trips taken from every stratum first, so each stratum has a variance
+MIN_PER_STRATUM = 2
+
+CONFIDENCE_LEVEL = 0.95
+Z_SCORE = 1.96
+
+PRIORITY_FIELDS = {'CRITICAL': 'critical_trips', 'HIGH': 'high_priority_trips', 'MEDIUM': 'medium_priority_trips'}
+
+# 0/1 indicator that is set on every trip where a metric is non-zero
+# (a 0/1 metric is its own indicator)
+METRIC_GATES = {
+    'trips': 'trips', 'with_waste': 'with_waste',
+    'wasted_fuel': 'with_waste', 'wasted_cost': 'with_waste', 'heavy_aggressive': 'with_waste',
+    **{field: field for field in PRIORITY_FIELDS.values()},
+    **{f"{load}_{name}": f"{load}_trips" for load in LOAD_CATEGORIES
+       for name in ('trips', 'fuel_per_km', 'total_fuel')}
+}
+
+
+def stratum_key(trip):
+    """Stratum of a raw trip: (route, peak, date)"""
+    return trip.get('route'), bool(trip.get('is_peak')), trip.get('date')
+
+
+def stratified_order(trips, seed=0):
+    """
+    Processing order in which every prefix is a stratified sample
+
+    The first MIN_PER_STRATUM trips of every stratum (in random order)
+    come first; after that trips follow in proportion to stratum size, so
+    a prefix of n trips holds about n × N_h / N trips of stratum h.
+
+    Args:
+        trips (list): Raw trips
+        seed (int): Random seed
+
+    Returns:
+        list: Trip indices
+    """
+
+    rng = random.Random(seed)
+    strata = {}
+    for i, trip in enumerate(trips):
+        strata.setdefault(stratum_key(trip), []).append(i)
+
+    keys = []
+    for indices in strata.values():
+        rng.shuffle(indices)
+        size = len(indices)
+        for rank, i in enumerate(indices):
+            if rank < MIN_PER_STRATUM:
+                keys.append((rank - MIN_PER_STRATUM, rng.random(), i))
+            else:
+                keys.append(((rank + rng.random()) / size, 0.0, i))
+
+    return [i for _, _, i in sorted(keys)]
+
+
+def trip_metrics(result):
+    """
+    Per-trip values the fleet statistics are totals or ratios of
+
+    Args:
+        result (dict): Processed trip, or None for a trip that was
+            quarantined or failed (it counts as a trip of its stratum
+            that adds nothing, as in the exact statistics)
+
+    Returns:
+        dict: Metric values
+    """
+
+    metrics = {'trips': 0, 'with_waste': 0, 'wasted_fuel': 0.0, 'wasted_cost': 0.0, 'heavy_aggressive': 0}
+    metrics.update({field: 0 for field in PRIORITY_FIELDS.values()})
+    for load in LOAD_CATEGORIES:
+        metrics.update({f"{load}_trips": 0, f"{load}_fuel_per_km": 0.0, f"{load}_total_fuel": 0.0})
+
+    if result is None:
+        return metrics
+
+    metrics['trips'] = 1
+    load = result['load']['dominant_load_category']
+    if load in LOAD_CATEGORIES:
+        metrics[f"{load}_trips"] = 1
+        metrics[f"{load}_fuel_per_km"] = result['fuel']['avg_fuel_per_km']
+        metrics[f"{load}_total_fuel"] = result['fuel']['total_fuel_liters']
+
+    savings = result['savings']
+    if savings['has_savings']:
+        metrics['with_waste'] = 1
+        metrics['wasted_fuel'] = savings['total_wasted_fuel']
+        metrics['wasted_cost'] = savings['total_wasted_cost']
+        metrics['heavy_aggressive'] = savings.get('heavy_aggressive_segments', 0)
+        priority_field = PRIORITY_FIELDS.get(savings.get('priority'))
+        if priority_field:
+            metrics[priority_field] = 1
+
+    return metrics
+
+
+def _variance_floors(samples, metric):
+    """
+    Per-stratum lower bound on the sample variance of metric
+
+    Most metrics are zero on most trips (a load category, waste). A
+    stratum sample without a single non-zero trip has no spread, yet the
+    rest of the stratum may hold some. The floor is the variance of the
+    metric's 0/1 indicator at its Laplace-smoothed proportion, scaled by
+    the mean non-zero value over the whole sample.
+
+    Returns:
+        dict: {stratum: floor}; empty when nothing is known about the scale
+    """
+
+    gate = METRIC_GATES.get(metric)
+    if gate is None:
+        return {}
+    hits = [row[metric] for rows in samples.values() for row in rows if row[gate]]
+    if not hits:
+        return {}
+    scale = sum(abs(v) for v in hits) / len(hits)
+
+    floors = {}
+    for stratum, rows in samples.items():
+        p = (sum(row[gate] for row in rows) + 1) / (len(rows) + 2)
+        floors[stratum] = p * (1 - p) * scale * scale
+    return floors
+
+
+def _stratum_terms(values, size, min_variance=0.0):
+    """(total, variance of the total) of one stratum from its sampled values"""
+
+    n = len(values)
+    total = sum(values)
+    if n == size:
+        return total, 0.0
+    mean = total / n
+    if n < 2:
+        variance = mean * mean
+    else:
+        variance = sum((v - mean) ** 2 for v in values) / (n - 1)
+    variance = max(variance, min_variance)
+    return size * mean, size * size * (1 - n / size) * variance / n
+
+
+def stratified_total(samples, sizes, metric):
+    """
+    Estimate of a population total with its variance
+
+    Args:
+        samples (dict): {stratum: list of trip_metrics dicts}
+        sizes (dict): {stratum: trips in the population}
+        metric (str): Metric to total
+
+    Returns:
+        tuple: (estimate, variance); variance 0 once every trip is sampled
+    """
+
+    floors = _variance_floors(samples, metric)
+    estimate, variance = 0.0, 0.0
+    for stratum, size in sizes.items():
+        rows = samples.get(stratum)
+        if not rows:
+            continue
+        total, var = _stratum_terms([row[metric] for row in rows], size, floors.get(stratum, 0.0))
+        estimate += total
+        variance += var
+    return estimate, variance
+
+
+def stratified_ratio(samples, sizes, numerator, denominator):
+    """
+    Estimate of total(numerator) / total(denominator) with its
+    linearized variance
+
+    A per-trip ratio (denominator 'trips') gets the numerator's variance
+    floors, as in stratified_total.
+
+    Returns:
+        tuple: (estimate, variance); (0, 0) when the denominator is 0
+    """
+
+    top, _ = stratified_total(samples, sizes, numerator)
+    bottom, _ = stratified_total(samples, sizes, denominator)
+    if bottom == 0:
+        return 0.0, 0.0
+    ratio = top / bottom
+
+    floors = _variance_floors(samples, numerator) if denominator == 'trips' else {}
+    variance = 0.0
+    for stratum, size in sizes.items():
+        rows = samples.get(stratum)
+        if not rows:
+            continue
+        residuals = [row[numerator] - ratio * row[denominator] for row in rows]
+        variance += _stratum_terms(residuals, size, floors.get(stratum, 0.0))[1]
+    return ratio, variance / (bottom * bottom)
+
+
+def _with_bounds(target, field, estimate_variance, digits, scale=1.0, as_int=False):
+    """Set target[field] and target[field + '_ci'] ([low, high], not below 0)"""
+
+    estimate, variance = estimate_variance
+    margin = Z_SCORE * math.sqrt(variance)
+    values = [estimate * scale, max(estimate - margin, 0.0) * scale, (estimate + margin) * scale]
+    if as_int:
+        values = [int(round(v)) for v in values]
+    else:
+        values = [round(v, digits) for v in values]
+    target[field] = values[0]
+    target[f"{field}_ci"] = values[1:]
+
+
+def estimate_fleet_statistics(samples, sizes):
+    """
+    Approximate fleet statistics from a stratified sample
+
+    Mirrors aggregate_fleet_statistics' total_trips, by_load_category and
+    fleet_savings (same fields and rounding); every figure also has a
+    <field>_ci [low, high] at CONFIDENCE_LEVEL. With every trip sampled
+    the figures are the exact ones and the intervals collapse.
+
+    Args:
+        samples (dict): {stratum: list of trip_metrics dicts}
+        sizes (dict): {stratum: trips in the population}
+
+    Returns:
+        dict: Estimated statistics
+    """
+
+    sampled = sum(len(rows) for rows in samples.values())
+    population = sum(sizes.values())
+
+    stats = {
+        'sampled_trips': sampled,
+        'population_trips': population,
+        'sample_fraction': round(sampled / population, 4) if population else 0,
+        'strata': len(sizes),
+        'confidence_level': CONFIDENCE_LEVEL
+    }
+    _with_bounds(stats, 'total_trips', stratified_total(samples, sizes, 'trips'), 0, as_int=True)
+
+    by_load = {}
+    for load in LOAD_CATEGORIES:
+        count = stratified_total(samples, sizes, f"{load}_trips")
+        if count[0] <= 0:
+            continue
+        entry = {}
+        _with_bounds(entry, 'count', count, 0, as_int=True)
+        _with_bounds(entry, 'percentage', stratified_ratio(samples, sizes, f"{load}_trips", 'trips'), 1, 100)
+        _with_bounds(entry, 'avg_fuel_per_km',
+                     stratified_ratio(samples, sizes, f"{load}_fuel_per_km", f"{load}_trips"), 3)
+        _with_bounds(entry, 'total_fuel', stratified_total(samples, sizes, f"{load}_total_fuel"), 1)
+        by_load[load] = entry
+    stats['by_load_category'] = by_load
+
+    # Same fields as calculate_fleet_savings over the trips with savings
+    weeks_per_year = current_settings().weeks_per_year
+    with_waste = stratified_total(samples, sizes, 'with_waste')
+    fuel = stratified_total(samples, sizes, 'wasted_fuel')
+    cost = stratified_total(samples, sizes, 'wasted_cost')
+    savings = {'period': 'Weekly'}
+    _with_bounds(savings, 'total_trips', with_waste, 0, as_int=True)
+    _with_bounds(savings, 'trips_with_waste', with_waste, 0, as_int=True)
+    _with_bounds(savings, 'waste_percentage', stratified_ratio(samples, sizes, 'with_waste', 'with_waste'), 1, 100)
+    _with_bounds(savings, 'weekly_fuel_waste', fuel, 1)
+    _with_bounds(savings, 'weekly_cost_waste', cost, 2)
+    _with_bounds(savings, 'annual_fuel_waste', fuel, 1, weeks_per_year)
+    _with_bounds(savings, 'annual_cost_waste', cost, 2, weeks_per_year)
+    for field in PRIORITY_FIELDS.values():
+        _with_bounds(savings, field, stratified_total(samples, sizes, field), 0, as_int=True)
+    _with_bounds(savings, 'total_heavy_aggressive_segments',
+                 stratified_total(samples, sizes, 'heavy_aggressive'), 0, as_int=True)
+    _with_bounds(savings, 'avg_waste_per_trip', stratified_ratio(samples, sizes, 'wasted_fuel', 'with_waste'), 2)
+    stats['fleet_savings'] = savings
+
+    return stats
+
+
+def refine_fleet_statistics(trips_by_route, registry, fractions=DEFAULT_FRACTIONS, seed=0,
+                            accel_analyzer=None):
+    """
+    Process a stratified sample in order and yield an estimate at each fraction
+
+    Args:
+        trips_by_route (dict): {route_id: raw trips}
+        registry (dict): Route registry
+        fractions (iterable): Sample fractions (0-1] to report at, ascending
+        seed (int): Sampling seed
+        accel_analyzer (callable): Acceleration analysis (default: the
+            pipeline's, see process_trips.make_accel_analyzer)
+
+    Yields:
+        dict: estimate_fleet_statistics output plus 'elapsed_sec'
+    """
+
+    from pipeline.process_trips import make_accel_analyzer, process_single_trip
+
+    accel_analyzer = accel_analyzer or make_accel_analyzer()
+    trips = [trip for route_trips in trips_by_route.values() for trip in route_trips]
+    order = stratified_order(trips, seed)
+
+    sizes = {}
+    for trip in trips:
+        key = stratum_key(trip)
+        sizes[key] = sizes.get(key, 0) + 1
+
+    samples = {}
+    processed = 0
+    start = time.perf_counter()
+
+    # The seed round (MIN_PER_STRATUM per stratum) is the smallest report
+    minimum = sum(min(size, MIN_PER_STRATUM) for size in sizes.values())
+    targets = sorted({max(minimum, math.ceil(f * len(trips))) for f in fractions if 0 < f <= 1})
+
+    for target in targets:
+        for i in order[processed:target]:
+            trip = trips[i]
+            try:
+                result = process_single_trip(trip, registry[trip['route']], accel_analyzer)
+            except Exception:
+                result = None
+            if result is not None and result['data_quality']['quarantine']:
+                result = None
+            samples.setdefault(stratum_key(trip), []).append(trip_metrics(result))
+        processed = target
+
+        stats = estimate_fleet_statistics(samples, sizes)
+        stats['elapsed_sec'] = round(time.perf_counter() - start, 3)
+        yield stats
+
+
+def format_estimate(value, bounds):
+    """'value ± half-width' (or just the value once exact)"""
+    half = (bounds[1] - bounds[0]) / 2
+    return f"{value:,}" if half == 0 else f"{value:,} ± {half:,.{3 if isinstance(value, float) else 0}g}"
+
+
+def print_estimate(stats):
+    """One block per refinement: sample size, time, and the key figures"""
+
+    savings = stats['fleet_savings']
+    print(f"\n  {stats['sample_fraction'] * 100:.1f}% sampled ({stats['sampled_trips']:,}/"
+          f"{stats['population_trips']:,} trips, {stats['elapsed_sec']:.2f} s)")
+    print(f"    Weekly waste: {format_estimate(savings['weekly_fuel_waste'], savings['weekly_fuel_waste_ci'])} L, "
+          f"${format_estimate(savings['weekly_cost_waste'], savings['weekly_cost_waste_ci'])}")
+    for load, entry in stats['by_load_category'].items():
+        print(f"    {load}: {format_estimate(entry['percentage'], entry['percentage_ci'])}% of trips, "
+              f"{format_estimate(entry['avg_fuel_per_km'], entry['avg_fuel_per_km_ci'])} L/km")
+
+
+def main(route_ids=None, fractions=DEFAULT_FRACTIONS, seed=0):
+    """
+    Approximate fleet statistics from the simulated trips, refined at each
+    fraction; writes the last estimate to approximate_fleet_stats.json
+
+    Args:
+        route_ids (list): Routes to sample (default: all with simulated data)
+        fractions (iterable): Sample fractions to report at; stop below 1
+            for a quick answer
+        seed (int): Sampling seed
+    """
+
+    from pipeline.process_trips import has_trip_data, load_trip_data, save_output
+    from pipeline.route_registry import load_route_registry
+
+    registry = load_route_registry()
+    if route_ids is None:
+        route_ids = [r for r in registry if has_trip_data(r)]
+
+    trips_by_route = {}
+    for route_id in route_ids:
+        trips = load_trip_data(route_id)
+        if trips:
+            trips_by_route[route_id] = trips
+    if not trips_by_route:
+        print("❌ Error: no route trip files found!")
+        print("   Run data_simulator.py first: python3 backend/pipeline/data_simulator.py")
+        return None
+
+    print(f"\n🎯 Approximate fleet statistics ({CONFIDENCE_LEVEL:.0%} bounds, stratified by route × peak × day)")
+    refinements = []
+    stats = None
+    for stats in refine_fleet_statistics(trips_by_route, registry, fractions, seed):
+        print_estimate(stats)
+        savings = stats['fleet_savings']
+        refinements.append({
+            'sampled_trips': stats['sampled_trips'],
+            'sample_fraction': stats['sample_fraction'],
+            'elapsed_sec': stats['elapsed_sec'],
+            'weekly_fuel_waste': savings['weekly_fuel_waste'],
+            'weekly_fuel_waste_ci': savings['weekly_fuel_waste_ci']
+        })
+
+    print()
+    save_output({**stats, 'route': ', '.join(trips_by_route), 'seed': seed, 'refinements': refinements},
+                'approximate_fleet_stats.json')
+    return stats
+
+
+# Test function
+def test_approximate_stats():
+    """Estimates against the exact statistics at each fraction"""
+
+    from pipeline.data_simulator import generate_week_data
+    from pipeline.process_trips import aggregate_fleet_statistics, make_accel_analyzer, process_single_trip
+    from pipeline.route_registry import load_route_registry
+
+    print("🧪 Testing Approximate Fleet Statistics\n")
+
+    random.seed(47)
+    registry = load_route_registry()
+    trips_by_route = generate_week_data(registry=registry)
+
+    start = time.perf_counter()
+    analyzer = make_accel_analyzer()
+    processed = [
+        result for route_id, trips in trips_by_route.items() for trip in trips
+        for result in [process_single_trip(trip, registry[route_id], analyzer)]
+        if not result['data_quality']['quarantine']
+    ]
+    exact = aggregate_fleet_statistics(processed)
+    exact_sec = time.perf_counter() - start
+    print(f"Exact: {len(processed)} trips in {exact_sec:.2f} s, "
+          f"weekly waste {exact['fleet_savings']['weekly_fuel_waste']} L")
+
+    # Test 1: Progressive refinement
+    print("\nTest 1: Refinement (95% bounds)")
+    fields = [('fleet_savings', 'weekly_fuel_waste')] + [
+        ('by_load_category', load) for load in exact['by_load_category']
+    ]
+    final = None
+    for stats in refine_fleet_statistics(trips_by_route, registry, seed=1):
+        print_estimate(stats)
+        covered = []
+        for section, field in fields:
+            if section == 'fleet_savings':
+                value, (low, high) = exact[section][field], stats[section][f"{field}_ci"]
+            else:
+                value = exact[section][field]['percentage']
+                low, high = stats[section].get(field, {}).get('percentage_ci', (0, 0))
+            covered.append(low <= value <= high)
+        print(f"    Exact values inside the bounds: {sum(covered)}/{len(covered)}")
+        final = stats
+
+    # Test 2: Full sample is exact
+    print("\nTest 2: Full sample")
+    same = all(
+        final['fleet_savings'][key] == value for key, value in exact['fleet_savings'].items()
+    ) and all(
+        final['by_load_category'][load][key] == value
+        for load, entry in exact['by_load_category'].items() for key, value in entry.items()
+    )
+    print(f"  Equals aggregate_fleet_statistics: {same}")
+
+    print("\n✅ Approximate Fleet Statistics Test Complete!")
+
+
+if __name__ == "__main__":
+    test_approximate_stats()
@@ -0,0 +1,222 @@
+"""
+Run Checkpoints
+Committed shards of processed trips and accumulator state per route, so an
+interrupted pipeline run resumes after the last committed shard
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+from pathlib import Path
+
+# Run as a script: add parent directory to path to import pipeline modules
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from algorithms.settings import current_settings
+from pipeline.route_registry import route_trips_filename
+
+OUTPUT_DIR = Path(__file__).parent.parent / "output"
+CHECKPOINT_DIR = OUTPUT_DIR / "checkpoints"
+
+DEFAULT_CHECKPOINT_CONFIG = {
+    'shard_size': 100,  # Trips per committed shard
+    'dir': None         # Checkpoint root (default: output/checkpoints)
+}
+
+
+def _write_atomic(path, data):
+    """Pickle data next to path, flush it to disk, then rename it into place"""
+
+    staging = path.with_name(path.name + '.tmp')
+    with open(staging, 'wb') as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(staging, path)
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def run_checkpoint_dir(options, config=None):
+    """
+    Checkpoint directory of a run
+
+    Runs with different options or settings versions never share
+    checkpoints: the directory is named after a hash of both.
+
+    Args:
+        options (dict): Run options that change the outputs (JSON-serializable)
+        config (dict): Overrides for DEFAULT_CHECKPOINT_CONFIG
+
+    Returns:
+        Path: Run checkpoint directory (not created)
+    """
+
+    config = {**DEFAULT_CHECKPOINT_CONFIG, **(config or {})}
+    key = json.dumps({**options, 'settings_version': current_settings().version}, sort_keys=True)
+    root = Path(config['dir']) if config['dir'] else CHECKPOINT_DIR
+    return root / hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def input_signature(route_id, output_dir=OUTPUT_DIR):
+    """(size, mtime) of a route's trip file and archive, to detect new input data"""
+
+    data_file = output_dir / route_trips_filename(route_id)
+    signature = []
+    for path in (data_file, data_file.with_suffix('') / 'trips.json'):
+        if path.exists():
+            stat = path.stat()
+            signature.append([path.name, stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+class RouteCheckpoint:
+    """
+    Shards and accumulator state of one route in a run
+
+    Layout: route_<id>/shard_<k>.pkl holds one shard's processed trips,
+    errors and quarantined trips; route_<id>/state.pkl names how many
+    shards are committed, the index of the next trip to process and the
+    cumulative accumulator state. A shard is written before the state that
+    counts it, both by atomic rename, so a crash at any point leaves the
+    last committed state and its shards intact.
+    """
+
+    def __init__(self, run_dir, route_id, signature=None):
+        self.dir = Path(run_dir) / f"route_{route_id}"
+        self.route_id = route_id
+        self.signature = signature if signature is not None else input_signature(route_id)
+
+    def load(self):
+        """
+        Committed state, or None to start the route from the first trip
+
+        Returns:
+            dict: {'next_trip', 'shards', 'done', 'aggregates', 'signature'}
+        """
+
+        state_file = self.dir / 'state.pkl'
+        if not state_file.exists():
+            return None
+        state = _read(state_file)
+        if state['signature'] != self.signature:
+            # Input data changed since the checkpoint: start over
+            shutil.rmtree(self.dir)
+            return None
+        return state
+
+    def commit(self, shard, next_trip, aggregates, done=False, shards=0):
+        """
+        Commit one shard and the state after it
+
+        Args:
+            shard (dict): {'processed', 'errors', 'quarantined'} of the shard
+            next_trip (int): Index of the first trip not yet processed
+            aggregates (dict): Cumulative run aggregates after the shard
+            done (bool): The route is complete
+            shards (int): Shards committed before this one
+
+        Returns:
+            int: Shards committed
+        """
+
+        self.dir.mkdir(parents=True, exist_ok=True)
+        _write_atomic(self.dir / f"shard_{shards:05d}.pkl", shard)
+        _write_atomic(self.dir / 'state.pkl', {
+            'next_trip': next_trip,
+            'shards': shards + 1,
+            'done': done,
+            'aggregates': aggregates,
+            'signature': self.signature
+        })
+        return shards + 1
+
+    def shards(self, count):
+        """The first count committed shards, in order"""
+        for k in range(count):
+            yield _read(self.dir / f"shard_{k:05d}.pkl")
+
+
+def clear_checkpoints(run_dir):
+    """Remove a run's checkpoints once its outputs are written"""
+    if Path(run_dir).exists():
+        shutil.rmtree(run_dir)
+
+
+# Test function
+def test_checkpoints():
+    """Crash a route mid-run, resume it and compare with an uninterrupted run"""
+
+    import tempfile
+    from pipeline import process_trips
+    from pipeline.route_registry import DEFAULT_ROUTE_ID
+
+    print("🧪 Testing Run Checkpoints\n")
+
+    if not (OUTPUT_DIR / route_trips_filename(DEFAULT_ROUTE_ID)).exists():
+        print("❌ Run data_simulator.py first")
+        return
+
+    def outputs(result):
+        route_id, processed, errors, quarantined, aggregates = result
+        return processed, errors, quarantined, {name: a.to_dict() for name, a in aggregates.items()}
+
+    with tempfile.TemporaryDirectory() as root:
+        config = {'shard_size': 40, 'dir': root}
+        run_dir = run_checkpoint_dir({'test': True}, config)
+
+        # Test 1: Crash after 130 trips
+        print("Test 1: Crash mid-route")
+        expected = outputs(process_trips.process_route_trips(DEFAULT_ROUTE_ID))
+
+        original = process_trips.process_single_trip
+        calls = []
+
+        def crashing(*args, **kwargs):
+            calls.append(1)
+            if len(calls) > 130:
+                raise KeyboardInterrupt("simulated crash")
+            return original(*args, **kwargs)
+
+        process_trips.process_single_trip = crashing
+        try:
+            process_trips.process_route_trips(DEFAULT_ROUTE_ID, checkpoint={**config, 'run_dir': run_dir})
+        except KeyboardInterrupt:
+            pass
+        finally:
+            process_trips.process_single_trip = original
+
+        state = RouteCheckpoint(run_dir, DEFAULT_ROUTE_ID).load()
+        print(f"  Committed: {state['shards']} shards, next trip {state['next_trip']}")
+        print()
+
+        # Test 2: Resume and compare
+        print("Test 2: Resume")
+        resumed = outputs(process_trips.process_route_trips(
+            DEFAULT_ROUTE_ID, checkpoint={**config, 'run_dir': run_dir}
+        ))
+        print(f"  Trips processed: {len(resumed[0])} (uninterrupted {len(expected[0])})")
+        print(f"  Same outputs and accumulators as uninterrupted run: {resumed == expected}")
+
+        # Test 3: A finished route is read back without reprocessing
+        process_trips.process_single_trip = crashing
+        try:
+            again = outputs(process_trips.process_route_trips(
+                DEFAULT_ROUTE_ID, checkpoint={**config, 'run_dir': run_dir}
+            ))
+        finally:
+            process_trips.process_single_trip = original
+        print(f"  Completed route reloaded without processing: {again == expected}")
+
+    print("\n✅ Run Checkpoints Test Complete!")
+
+
+if __name__ == "__main__":
+    test_checkpoints()
@@ -0,0 +1,663 @@
+"""
+Conformance Harness
+Differential check of the optimized engines against the reference
+algorithms on randomized and edge-case simulated trips, plus a throughput
+benchmark of every engine on the same inputs
+"""
+
+import copy
+import math
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Run as a script: add parent directory to path to import algorithms
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from algorithms.acceleration_detector import (
+    DETAIL_FULL,
+    DETAIL_SEGMENT,
+    KMH_TO_MS,
+    analyze_trip_acceleration,
+    detect_acceleration_events
+)
+from algorithms.fuel_estimator import estimate_trip_fuel
+from algorithms.load_classifier import BUS_CAPACITY, analyze_trip_load, classify_load
+from algorithms.savings_calculator import calculate_trip_savings
+from algorithms.settings import ACCEL_CATEGORIES, LOAD_CATEGORIES, current_settings
+from pipeline.data_simulator import generate_trip
+from pipeline.route_registry import get_segment_distances, load_route_registry
+
+DEFAULT_CONFORMANCE_CONFIG = {
+    'random_trips': 200,    # Simulated trips on top of the edge cases
+    'seed': 44,
+    'abs_tol': 1e-9,        # Per-trip outputs share the reference's rounding
+    'sweep_abs_tol': 0.011, # Sweep totals are rounded to 2 dp once, the reference per trip
+    'edge_abs_tol': 0.011,  # Fixed point rounds exact values, the reference rounded floats
+    'max_reported': 5       # Mismatches listed per engine
+}
+
+# Fields an engine's detail level leaves out on purpose
+SEGMENT_DETAIL_IGNORE = ('acceleration_events',)
+
+# Reference fields the edge engine reports, per section (nested: segment fields)
+EDGE_FIELDS = {
+    'load': ('dominant_load_category', 'max_passenger_count', 'heavy_load_segments', 'total_segments', 'error'),
+    'acceleration': (
+        'dominant_pattern', 'avg_acceleration', 'max_acceleration', 'total_events',
+        'gentle_count', 'gentle_percentage', 'moderate_count', 'moderate_percentage',
+        'aggressive_count', 'aggressive_percentage', ('segments', ('segment_id', 'category')), 'error'
+    ),
+    'fuel': (
+        'total_distance_km', 'total_fuel_liters', 'optimal_fuel_liters', 'wasted_fuel_liters',
+        'problem_segments',
+        ('segments', ('load_category', 'accel_category', 'total_fuel_liters', 'optimal_fuel_liters')),
+        'error'
+    )
+}
+
+# Dates and start hours random trips are drawn from (one simulated week)
+WEEK_START = datetime(2024, 12, 16)
+START_HOURS = range(5, 24)
+
+
+def _pair_speeds(accelerations_ms2, dt=5):
+    """Speed ramp whose consecutive pairs accelerate at exactly the given rates"""
+    speeds = [0.0]
+    for accel in accelerations_ms2:
+        speeds.append(round(speeds[-1] + accel * KMH_TO_MS * dt, 6))
+    return speeds
+
+
+def _set_speeds(trip, speeds_for_segment):
+    """Replace every segment's samples with timestamps 0, 5, 10… and the given speeds"""
+    samples = []
+    for s, event in enumerate(trip['passenger_events'][:-1]):
+        for k, speed in enumerate(speeds_for_segment(s)):
+            samples.append({
+                'timestamp': k * 5, 'speed_kmh': speed, 'segment': s,
+                'passenger_load': event['total_onboard']
+            })
+    trip['speed_data'] = samples
+
+
+def _set_onboard(trip, onboard):
+    for event in trip['passenger_events']:
+        event['total_onboard'] = onboard
+    for sample in trip['speed_data']:
+        sample['passenger_load'] = onboard
+
+
+def _edge_no_speed_data(trip):
+    trip['speed_data'] = []
+
+
+def _edge_single_sample(trip):
+    trip['speed_data'] = trip['speed_data'][:1]
+
+
+def _edge_constant_speed(trip):
+    for sample in trip['speed_data']:
+        sample['speed_kmh'] = 30.0
+
+
+def _edge_duplicate_timestamps(trip):
+    trip['speed_data'] = [
+        dict(sample) for i, sample in enumerate(trip['speed_data'])
+        for _ in range(2 if i % 5 == 2 else 1)
+    ]
+
+
+def _edge_out_of_order(trip):
+    samples = trip['speed_data']
+    for i in range(2, len(samples) - 1, 9):
+        if samples[i]['segment'] == samples[i + 1]['segment']:
+            samples[i], samples[i + 1] = samples[i + 1], samples[i]
+
+
+def _edge_missing_segment(trip):
+    trip['speed_data'] = [s for s in trip['speed_data'] if s['segment'] != 2]
+
+
+def _edge_one_sample_segment(trip):
+    seen = set()
+    samples = []
+    for sample in trip['speed_data']:
+        if sample['segment'] != 1 or 1 not in seen:
+            samples.append(sample)
+        seen.add(sample['segment'])
+    trip['speed_data'] = samples
+
+
+def _edge_segment_out_of_range(trip):
+    num_segments = len(trip['passenger_events']) - 1
+    for sample in trip['speed_data'][::7]:
+        sample['segment'] = num_segments + 5
+    trip['speed_data'][-1]['segment'] = -1
+
+
+def _edge_empty_bus(trip):
+    _set_onboard(trip, 0)
+
+
+def _edge_full_bus(trip):
+    _set_onboard(trip, BUS_CAPACITY)
+
+
+def _edge_over_capacity(trip):
+    _set_onboard(trip, BUS_CAPACITY + 6)
+
+
+def _edge_load_thresholds(trip):
+    settings = current_settings()
+    cutoffs = [settings.light_threshold, settings.medium_threshold]
+    for i, event in enumerate(trip['passenger_events']):
+        event['total_onboard'] = cutoffs[i % 2] + (i // 2) % 2
+
+
+def _edge_threshold_accel(trip):
+    settings = current_settings()
+    gentle, moderate = settings.gentle_threshold, settings.moderate_threshold
+    ramps = [[gentle], [moderate], [gentle, moderate, moderate], [0.1, gentle, 0.1]]
+    _set_speeds(trip, lambda s: _pair_speeds(ramps[s % len(ramps)]) + [0.0])
+
+
+def _edge_single_stop(trip):
+    trip['passenger_events'] = trip['passenger_events'][:1]
+
+
+def _edge_no_stops(trip):
+    trip['passenger_events'] = []
+
+
+def _edge_fractional_timestamps(trip):
+    for i, sample in enumerate(trip['speed_data']):
+        sample['timestamp'] = sample['timestamp'] + (i % 3) * 0.25
+
+
+# Deterministic mutations of a simulated trip, each probing one boundary
+EDGE_CASES = {
+    'no_speed_data': _edge_no_speed_data,
+    'single_sample': _edge_single_sample,
+    'constant_speed': _edge_constant_speed,
+    'duplicate_timestamps': _edge_duplicate_timestamps,
+    'out_of_order': _edge_out_of_order,
+    'missing_segment': _edge_missing_segment,
+    'one_sample_segment': _edge_one_sample_segment,
+    'segment_out_of_range': _edge_segment_out_of_range,
+    'empty_bus': _edge_empty_bus,
+    'full_bus': _edge_full_bus,
+    'over_capacity': _edge_over_capacity,
+    'load_thresholds': _edge_load_thresholds,
+    'threshold_accel': _edge_threshold_accel,
+    'single_stop': _edge_single_stop,
+    'no_stops': _edge_no_stops,
+    'fractional_timestamps': _edge_fractional_timestamps
+}
+
+
+def generate_cases(registry, num_random=200, seed=44):
+    """
+    Randomized simulator trips plus every edge case on each route
+
+    Args:
+        registry (dict): Route registry
+        num_random (int): Random trips (route, driver, day and hour drawn at random)
+        seed (int): Random seed; the simulator draws from the global generator
+
+    Returns:
+        list: (case name, trip) pairs
+    """
+
+    random.seed(seed)
+    rng = random.Random(seed)
+    route_ids = sorted(registry)
+    cases = []
+
+    for i in range(num_random):
+        route = registry[rng.choice(route_ids)]
+        day = WEEK_START + timedelta(days=rng.randrange(7))
+        trip = generate_trip(f"SBS{rng.randint(1, 9999):04d}A", f"D{rng.randint(1, 60):03d}",
+                             i % 100, day, rng.choice(START_HOURS), route)
+        cases.append((f"random_{i:04d}", trip))
+
+    for route_id in route_ids:
+        base = generate_trip("SBS0001A", "D001", 1, WEEK_START, 8, registry[route_id])
+        for name, mutate in EDGE_CASES.items():
+            trip = copy.deepcopy(base)
+            trip['trip_id'] = f"{base['trip_id']}_{name}"
+            mutate(trip)
+            cases.append((f"{name}@{route_id}", trip))
+
+    return cases
+
+
+def _guarded(fn, *args):
+    """Engine output, or the exception type it raised (compared like any output)"""
+    try:
+        return fn(*args)
+    except Exception as e:
+        return {'exception': type(e).__name__}
+
+
+def reference_analysis(trip, route, detail=DETAIL_FULL):
+    """
+    The four algorithms in their original form: sample-pair events with
+    per-event dicts, fuel from the route's stop spacing
+
+    Returns:
+        dict: {'load', 'acceleration', 'fuel', 'savings'}
+    """
+
+    load = analyze_trip_load(trip)
+    accel = analyze_trip_acceleration(trip, detail=detail)
+    fuel = estimate_trip_fuel(trip, load, accel, get_segment_distances(route))
+    return {
+        'load': load,
+        'acceleration': accel,
+        'fuel': fuel,
+        'savings': calculate_trip_savings(fuel)
+    }
+
+
+def _sample_load(sample):
+    return classify_load(sample.get('passenger_load', 0))['category']
+
+
+def _pairwise_matrix(samples):
+    """Load × Acceleration events of consecutive sample pairs, one pair at a time"""
+    matrix = {load: {accel: 0 for accel in ACCEL_CATEGORIES} for load in LOAD_CATEGORIES}
+    for current, following in zip(samples, samples[1:]):
+        for event in detect_acceleration_events([current, following]):
+            matrix[_sample_load(current)][event['category']] += 1
+    return matrix
+
+
+def reference_load_accel(trip, route):
+    """
+    The four algorithms with the load-aware fields added the slow way:
+    each sample pair's load looked up on its own, each segment's load by
+    counting its samples, fuel joined on that load
+
+    Returns:
+        dict: {'load', 'acceleration', 'fuel', 'savings'}
+    """
+
+    load = analyze_trip_load(trip)
+    accel = analyze_trip_acceleration(trip, detail=DETAIL_FULL)
+
+    if 'error' not in accel:
+        samples = trip['speed_data']
+        accel['load_accel_matrix'] = _pairwise_matrix(samples)
+        for segment in accel.get('segments', []):
+            segment_samples = [s for s in samples if s.get('segment') == segment['segment_id']]
+            counts = [sum(1 for s in segment_samples if _sample_load(s) == c) for c in LOAD_CATEGORIES]
+            segment['load_category'] = LOAD_CATEGORIES[counts.index(max(counts))] if segment_samples else 'UNKNOWN'
+            segment['load_accel_matrix'] = _pairwise_matrix(segment_samples)
+
+    fuel = estimate_trip_fuel(trip, load, accel, get_segment_distances(route))
+    return {
+        'load': load,
+        'acceleration': accel,
+        'fuel': fuel,
+        'savings': calculate_trip_savings(fuel)
+    }
+
+
+def _load_accel_analysis(trip, route):
+    from algorithms.load_accel_classifier import analyze_trip_load_accel
+
+    load = analyze_trip_load(trip)
+    accel = analyze_trip_load_accel(trip, detail=DETAIL_SEGMENT)
+    fuel = estimate_trip_fuel(trip, load, accel, get_segment_distances(route))
+    return {
+        'load': load,
+        'acceleration': accel,
+        'fuel': fuel,
+        'savings': calculate_trip_savings(fuel)
+    }
+
+
+def _project(output, fields):
+    """The given fields of an output, where present (nested for (name, fields) pairs)"""
+    view = {}
+    for field in fields:
+        if isinstance(field, tuple):
+            name, nested = field
+            if name in output:
+                view[name] = [_project(item, nested) for item in output[name]]
+        elif field in output:
+            view[field] = output[field]
+    return view
+
+
+def edge_view(analysis):
+    """A reference analysis cut down to the fields the edge engine reports"""
+    if 'exception' in analysis:
+        return analysis
+    return {section: _project(analysis[section], fields) for section, fields in EDGE_FIELDS.items()}
+
+
+def _edge_inputs(cases, registry):
+    from algorithms.edge_engine import trip_readings
+    return [trip_readings(trip, get_segment_distances(registry[trip['route']])) for _, trip in cases]
+
+
+def _edge_analysis(engine, readings):
+    from algorithms.edge_engine import edge_analysis, run_trip
+    return edge_analysis(run_trip(engine, readings))
+
+
+def _stats_pass_analysis(trip, route):
+    return reference_analysis(trip, route, DETAIL_SEGMENT)
+
+
+def _pipeline_analysis(trip, route, analyzer):
+    from pipeline.process_trips import process_single_trip
+    result = process_single_trip(trip, route, analyzer)
+    if 'load' not in result:
+        return None  # Quarantined: the pipeline does not analyze it
+    return {key: result[key] for key in ('load', 'acceleration', 'fuel', 'savings')}
+
+
+def _archive_inputs(cases, workdir):
+    """The case trips written to a columnar archive and read back"""
+    from pipeline.trip_archive import load_archived_trips, write_archive
+    path = write_archive([trip for _, trip in cases], Path(workdir) / 'conformance')
+    return [(name, trip) for (name, _), trip in zip(cases, load_archived_trips(path))]
+
+
+def sweep_totals(analysis):
+    """
+    Reference trip totals in evaluate_policies' terms (segment figures
+    summed, as the sweep does, rather than the trip's rounded totals)
+    """
+
+    segments = analysis['fuel']['segments']
+    load_segments = analysis['load']['segments'][:len(segments)]
+    return {
+        'weekly_fuel_liters': sum(s['total_fuel_liters'] for s in segments),
+        'weekly_fuel_waste': sum(s['total_fuel_liters'] - s['optimal_fuel_liters'] for s in segments),
+        'heavy_aggressive_segments': sum(
+            1 for s in segments if s['load_category'] == 'HEAVY' and s['accel_category'] == 'AGGRESSIVE'
+        ),
+        'segment_load_counts': [
+            sum(1 for s in load_segments if s['load_category'] == load) for load in LOAD_CATEGORIES
+        ]
+    }
+
+
+def _expected_sweep_result(totals):
+    """Summed reference totals rounded the way evaluate_policies reports them"""
+    num_segments = max(sum(totals['segment_load_counts']), 1)
+    return {
+        'weekly_fuel_liters': round(totals['weekly_fuel_liters'], 2),
+        'weekly_fuel_waste': round(totals['weekly_fuel_waste'], 2),
+        'heavy_aggressive_segments': totals['heavy_aggressive_segments'],
+        'segment_load_share': {
+            load: round(count / num_segments * 100, 1)
+            for load, count in zip(LOAD_CATEGORIES, totals['segment_load_counts'])
+        }
+    }
+
+
+def _sweep_result(result):
+    return {key: result[key] for key in (
+        'weekly_fuel_liters', 'weekly_fuel_waste', 'heavy_aggressive_segments', 'segment_load_share'
+    )}
+
+
+def diff_outputs(expected, actual, abs_tol=1e-9, ignore=(), path=''):
+    """
+    Differences between two engine outputs
+
+    Numbers match within abs_tol (bools and ints of different value never
+    do); dicts must have the same keys apart from the ignored ones; lists
+    must have the same length.
+
+    Returns:
+        list: (path, expected, actual) for every difference
+    """
+
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        diffs = []
+        for key in sorted(set(expected) | set(actual), key=str):
+            if key in ignore:
+                continue
+            where = f"{path}.{key}" if path else str(key)
+            if key not in actual:
+                diffs.append((where, expected[key], '<missing>'))
+            elif key not in expected:
+                diffs.append((where, '<missing>', actual[key]))
+            else:
+                diffs.extend(diff_outputs(expected[key], actual[key], abs_tol, ignore, where))
+        return diffs
+
+    if isinstance(expected, (list, tuple)) and isinstance(actual, (list, tuple)):
+        if len(expected) != len(actual):
+            return [(f"{path}.len", len(expected), len(actual))]
+        diffs = []
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            diffs.extend(diff_outputs(e, a, abs_tol, ignore, f"{path}[{i}]"))
+        return diffs
+
+    numbers = (int, float)
+    if (isinstance(expected, numbers) and isinstance(actual, numbers)
+            and not isinstance(expected, bool) and not isinstance(actual, bool)):
+        if math.isclose(expected, actual, rel_tol=0, abs_tol=abs_tol):
+            return []
+        return [(path, expected, actual)]
+
+    return [] if expected == actual else [(path, expected, actual)]
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run_conformance(config=None, registry=None):
+    """
+    Check every engine against the reference on the same cases and time them
+
+    Engines:
+        - stats_pass: single-pass statistics (DETAIL_SEGMENT, no event dicts)
+        - archive: the load-aware classifier (column-native) on
+          archive-backed speed_data against reference_load_accel
+        - pipeline: process_single_trip with the default run analyzer
+          (quarantined trips are skipped, not compared)
+        - policy_sweep: vectorized sweep at the current settings, per trip
+          and over all cases in one batch (only trips the reference can
+          estimate fuel for: the sweep has no "missing data" outcome)
+        - load_accel: the load-aware classifier (DETAIL_SEGMENT) against
+          reference_load_accel
+        - edge: the fixed-point edge engine against the reference fields
+          it reports (edge_view), within edge_abs_tol
+
+    Args:
+        config (dict): Overrides for DEFAULT_CONFORMANCE_CONFIG
+        registry (dict): Route registry (default: load_route_registry())
+
+    Returns:
+        dict: {'cases', 'edge_cases', 'reference': {...}, 'engines': {name:
+            {'compared', 'skipped', 'mismatched', 'mismatches', 'trips_per_sec',
+            'speedup'}}, 'ok'}
+    """
+
+    from pipeline.process_trips import make_accel_analyzer
+    from algorithms.policy_sweep import build_sweep_cache, evaluate_policies
+
+    config = {**DEFAULT_CONFORMANCE_CONFIG, **(config or {})}
+    registry = registry or load_route_registry()
+    cases = generate_cases(registry, config['random_trips'], config['seed'])
+    distances = {route_id: get_segment_distances(route) for route_id, route in registry.items()}
+
+    def route_of(trip):
+        return registry[trip['route']]
+
+    reference, reference_sec = _timed(
+        lambda: [_guarded(reference_analysis, trip, route_of(trip)) for _, trip in cases]
+    )
+
+    engines = {}
+
+    def check(name, outputs, seconds, ignore=(), inputs=None, expected_outputs=None, abs_tol=None):
+        report = {'compared': 0, 'skipped': 0, 'mismatched': 0, 'mismatches': []}
+        for (case, _), expected, actual in zip(inputs or cases, expected_outputs or reference, outputs):
+            if actual is None:
+                report['skipped'] += 1
+                continue
+            report['compared'] += 1
+            diffs = diff_outputs(expected, actual, abs_tol or config['abs_tol'], ignore)
+            if diffs:
+                report['mismatched'] += 1
+                if len(report['mismatches']) < config['max_reported']:
+                    report['mismatches'].append({'case': case, 'diffs': diffs[:3], 'total_diffs': len(diffs)})
+        report['trips_per_sec'] = round(len(cases) / seconds) if seconds else None
+        report['speedup'] = round(reference_sec / seconds, 2) if seconds else None
+        engines[name] = report
+        return report
+
+    # Single-pass statistics
+    outputs, seconds = _timed(
+        lambda: [_guarded(_stats_pass_analysis, trip, route_of(trip)) for _, trip in cases]
+    )
+    check('stats_pass', outputs, seconds, SEGMENT_DETAIL_IGNORE)
+
+    # Archive-backed speed_data through a column-native analyzer (as process_trips reads it)
+    load_accel_reference = [_guarded(reference_load_accel, trip, route_of(trip)) for _, trip in cases]
+    with tempfile.TemporaryDirectory() as workdir:
+        archived = _archive_inputs(cases, workdir)
+        outputs, seconds = _timed(
+            lambda: [_guarded(_load_accel_analysis, trip, route_of(trip)) for _, trip in archived]
+        )
+        check('archive', outputs, seconds, SEGMENT_DETAIL_IGNORE, inputs=archived,
+              expected_outputs=load_accel_reference)
+
+    # Full pipeline entry point
+    analyzer = make_accel_analyzer()
+    outputs, seconds = _timed(
+        lambda: [_guarded(_pipeline_analysis, copy.copy(trip), route_of(trip), analyzer) for _, trip in cases]
+    )
+    check('pipeline', outputs, seconds, SEGMENT_DETAIL_IGNORE)
+
+    # Policy sweep: per trip for localized diffs, then all comparable cases in one batch
+    comparable = [
+        i for i, expected in enumerate(reference) if 'segments' in expected.get('fuel', {})
+    ]
+    sweep_reference = {i: sweep_totals(reference[i]) for i in comparable}
+
+    def sweep_trip(trip):
+        return _sweep_result(evaluate_policies(build_sweep_cache([trip], distances), [{}])[0])
+
+    sweep_report = {'compared': 0, 'skipped': len(cases) - len(comparable), 'mismatched': 0, 'mismatches': []}
+    for i in comparable:
+        expected = _expected_sweep_result(sweep_reference[i])
+        diffs = diff_outputs(expected, _guarded(sweep_trip, cases[i][1]), config['sweep_abs_tol'])
+        sweep_report['compared'] += 1
+        if diffs:
+            sweep_report['mismatched'] += 1
+            if len(sweep_report['mismatches']) < config['max_reported']:
+                sweep_report['mismatches'].append({'case': cases[i][0], 'diffs': diffs[:3], 'total_diffs': len(diffs)})
+
+    batch_trips = [cases[i][1] for i in comparable]
+
+    def sweep_batch():
+        return evaluate_policies(build_sweep_cache(batch_trips, distances), [{}])[0]
+
+    batch, seconds = _timed(sweep_batch)
+    summed = {
+        key: sum(totals[key] for totals in sweep_reference.values())
+        for key in ('weekly_fuel_liters', 'weekly_fuel_waste', 'heavy_aggressive_segments')
+    }
+    summed['segment_load_counts'] = [
+        sum(totals['segment_load_counts'][c] for totals in sweep_reference.values())
+        for c in range(len(LOAD_CATEGORIES))
+    ]
+    batch_diffs = diff_outputs(_expected_sweep_result(summed), _sweep_result(batch), config['sweep_abs_tol'])
+    if batch_diffs:
+        sweep_report['mismatched'] += 1
+        sweep_report['mismatches'].append({'case': 'all (batch)', 'diffs': batch_diffs[:3],
+                                           'total_diffs': len(batch_diffs)})
+    sweep_report['trips_per_sec'] = round(len(batch_trips) / seconds) if seconds else None
+    sweep_report['speedup'] = (
+        round(reference_sec / len(cases) * len(batch_trips) / seconds, 2) if seconds else None
+    )
+    engines['policy_sweep'] = sweep_report
+
+    # Load-aware classifier against its own pair-by-pair reference
+    outputs, seconds = _timed(
+        lambda: [_guarded(_load_accel_analysis, trip, route_of(trip)) for _, trip in cases]
+    )
+    check('load_accel', outputs, seconds, SEGMENT_DETAIL_IGNORE, expected_outputs=load_accel_reference)
+
+    # Fixed-point edge engine on the readings a unit would push (conversion not timed)
+    from algorithms.edge_engine import EdgeEngine, edge_tables
+    readings = _edge_inputs(cases, registry)
+    engine = EdgeEngine(edge_tables(), max(len(distances) for distances, _, _ in readings))
+    outputs, seconds = _timed(lambda: [_guarded(_edge_analysis, engine, r) for r in readings])
+    check('edge', outputs, seconds, expected_outputs=[edge_view(output) for output in reference],
+          abs_tol=config['edge_abs_tol'])
+
+    return {
+        'cases': len(cases),
+        'edge_cases': sum(1 for name, _ in cases if not name.startswith('random_')),
+        'reference': {
+            'trips_per_sec': round(len(cases) / reference_sec) if reference_sec else None,
+            'exceptions': sum(1 for output in reference if 'exception' in output)
+        },
+        'engines': engines,
+        'ok': all(report['mismatched'] == 0 for report in engines.values())
+    }
+
+
+def print_conformance(result):
+    """Per-engine verdict, throughput and the first mismatches"""
+
+    print(f"\n🔬 Conformance ({result['cases']} trips, {result['edge_cases']} edge cases)\n")
+    reference = result['reference']
+    print(f"  reference: {reference['trips_per_sec']:,} trips/s"
+          + (f", {reference['exceptions']} raised" if reference['exceptions'] else ''))
+
+    for name, report in result['engines'].items():
+        mark = '✅' if report['mismatched'] == 0 else '❌'
+        skipped = f", {report['skipped']} skipped" if report['skipped'] else ''
+        print(f"  {mark} {name}: {report['compared']} compared{skipped}, "
+              f"{report['mismatched']} mismatched — {report['trips_per_sec']:,} trips/s "
+              f"({report['speedup']}x)")
+        for mismatch in report['mismatches']:
+            print(f"      {mismatch['case']}: {mismatch['total_diffs']} difference(s)")
+            for path, expected, actual in mismatch['diffs']:
+                print(f"        {path}: expected {expected!r}, got {actual!r}")
+
+
+# Test function
+def test_conformance():
+    """Run the harness on a small case set and show that it catches a drift"""
+
+    print("🧪 Testing Conformance Harness\n")
+
+    # Test 1: Every engine against the reference
+    print("Test 1: Engines vs reference")
+    result = run_conformance({'random_trips': 60})
+    print_conformance(result)
+    print(f"\n  All engines conform: {result['ok']}")
+    print()
+
+    # Test 2: The diff reports a drifted rounding and a dropped key
+    print("Test 2: Diff catches drift")
+    expected = {'fuel': {'total_fuel_liters': 4.21, 'segments': [{'category': 'GENTLE'}]}}
+    actual = {'fuel': {'total_fuel_liters': 4.2, 'segments': [{}]}}
+    for path, e, a in diff_outputs(expected, actual):
+        print(f"  {path}: expected {e!r}, got {a!r}")
+
+    print("\n✅ Conformance Harness Test Complete!")
+
+
+if __name__ == "__main__":
+    test_conformance()
@@ -1,45 +1,59 @@
 """
 Data Simulator for ProjectBus
-Generates realistic Route 12 bus trip data for testing algorithms
+Generates realistic bus trip data for every route in the route registry
 """
 
 import json
 import random
+import sys
 from datetime import datetime, timedelta
 from pathlib import Path
 
-# Constants
-ROUTE_12_STOPS = [
-    {"id": "S001", "name": "Tampines Interchange", "position_km": 0.0},
-    {"id": "S002", "name": "Tampines Ave 4", "position_km": 1.2},
-    {"id": "S003", "name": "Simei MRT", "position_km": 2.8},
-    {"id": "S004", "name": "Bedok North", "position_km": 4.5},
-    {"id": "S005", "name": "Bedok Reservoir", "position_km": 6.2},
-    {"id": "S006", "name": "Bedok Interchange", "position_km": 8.0},
-    {"id": "S007", "name": "Bedok South", "position_km": 9.5},
-    {"id": "S008", "name": "Tanah Merah", "position_km": 11.2},
-    {"id": "S009", "name": "Siglap", "position_km": 13.0},
-    {"id": "S010", "name": "Marine Parade", "position_km": 15.2},
-]
+# Run as a script: add parent directory to path to import pipeline modules
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from algorithms.settings import current_settings
+from pipeline.route_registry import (
+    DEFAULT_ROUTE_ID,
+    load_route_registry,
+    route_trips_filename
+)
+from pipeline.trip_archive import route_archive_path, write_archive
 
+# Constants
 BUS_CAPACITY = 84
-ROUTE_LENGTH_KM = 15.2
-NUM_BUSES = 10
-TRIPS_PER_BUS_PER_DAY = 6  # ~420 trips per week
+NUM_BUSES = 10  # Default buses per route when the registry does not say
+TRIPS_PER_BUS_PER_DAY = 6  # ~300 trips per route per week
+FIRST_BUS_NUMBER = 1235
 
+# Driver behaviour pattern, repeated across the network by driver number
+DRIVER_BEHAVIOR_PATTERN = [
+    "gentle",      # D001
+    "gentle",      # D002
+    "moderate",    # D003
+    "moderate",    # D004
+    "moderate",    # D005
+    "moderate",    # D006
+    "aggressive",  # D007
+    "aggressive",  # D008
+    "moderate",    # D009
+    "gentle",      # D010
+]
 
-def generate_passenger_load(stop_index, time_of_day, is_peak):
+
+def generate_passenger_load(stop_index, time_of_day, is_peak, num_stops=10, is_hub=False):
     """Generate realistic passenger boarding/alighting based on stop and time"""
     
     # Peak hours: 7-9 AM, 5-7 PM
     if is_peak:
-        if stop_index <= 2:  # Tampines/Simei area (morning peak - boarding)
+        if stop_index <= (num_stops - 1) * 0.25:  # Start of route (boarding)
             boarding = random.randint(15, 35)
             alighting = random.randint(0, 5)
-        elif stop_index == 5:  # Bedok Interchange (major hub)
+        elif is_hub:  # Interchange / MRT hub
             boarding = random.randint(20, 40)
             alighting = random.randint(10, 25)
-        elif stop_index >= 8:  # Marine Parade area (evening peak - alighting)
+        elif stop_index >= (num_stops - 1) * 0.85:  # End of route (alighting)
             boarding = random.randint(5, 15)
             alighting = random.randint(15, 30)
         else:
@@ -127,43 +141,47 @@ def determine_acceleration_style(passenger_load, driver_behavior):
             return "MODERATE"
 
 
-def generate_trip(bus_id, driver_id, trip_num, date, start_hour):
+def get_driver_behavior(driver_id):
+    """Driving behaviour for a driver (consistent per driver across the network)"""
+    
+    try:
+        driver_num = int(driver_id[1:])
+    except ValueError:
+        return "moderate"
+    
+    return DRIVER_BEHAVIOR_PATTERN[(driver_num - 1) % len(DRIVER_BEHAVIOR_PATTERN)]
+
+
+def generate_trip(bus_id, driver_id, trip_num, date, start_hour, route=None):
     """Generate a complete trip with passenger data and GPS speeds"""
     
+    if route is None:
+        route = load_route_registry()[DEFAULT_ROUTE_ID]
+    
+    stops = route['stops']
+    
     # Determine if peak hour
     is_peak = (7 <= start_hour <= 9) or (17 <= start_hour <= 19)
     
     # Assign driver behavior (consistent per driver)
-    driver_behaviors = {
-        "D001": "gentle",
-        "D002": "gentle", 
-        "D003": "moderate",
-        "D004": "moderate",
-        "D005": "moderate",
-        "D006": "moderate",
-        "D007": "aggressive",
-        "D008": "aggressive",
-        "D009": "moderate",
-        "D010": "gentle",
-    }
-    driver_behavior = driver_behaviors.get(driver_id, "moderate")
+    driver_behavior = get_driver_behavior(driver_id)
     
     # Generate trip
-    trip_id = f"T{date.strftime('%Y%m%d')}{bus_id[-3:]}{trip_num:02d}"
+    trip_id = f"T{date.strftime('%Y%m%d')}{bus_id[3:-1]}{trip_num:02d}"
     
     passenger_events = []
     speed_data = []
     current_passengers = 0
-    total_distance = 0
     
     # Process each stop
-    for i, stop in enumerate(ROUTE_12_STOPS):
+    for i, stop in enumerate(stops):
         # Passenger boarding/alighting
+        boarding, alighting = generate_passenger_load(
+            i, start_hour, is_peak, len(stops), stop.get('hub', False)
+        )
         if i == 0:
-            boarding, alighting = generate_passenger_load(i, start_hour, is_peak)
             alighting = 0  # First stop, no one alights
         else:
-            boarding, alighting = generate_passenger_load(i, start_hour, is_peak)
             alighting = min(alighting, current_passengers)  # Can't alight more than onboard
         
         current_passengers = max(0, current_passengers + boarding - alighting)
@@ -178,8 +196,8 @@ def generate_trip(bus_id, driver_id, trip_num, date, start_hour):
         })
         
         # Generate speed data for segment to next stop
-        if i < len(ROUTE_12_STOPS) - 1:
-            segment_distance = ROUTE_12_STOPS[i + 1]["position_km"] - stop["position_km"]
+        if i < len(stops) - 1:
+            segment_distance = stops[i + 1]["position_km"] - stop["position_km"]
             
             # Determine acceleration style for this segment
             accel_style = determine_acceleration_style(current_passengers, driver_behavior)
@@ -199,40 +217,107 @@ def generate_trip(bus_id, driver_id, trip_num, date, start_hour):
         "trip_id": trip_id,
         "bus_id": bus_id,
         "driver_id": driver_id,
-        "route": "12",
+        "route": route['route_id'],
         "date": date.strftime("%Y-%m-%d"),
         "start_time": f"{start_hour:02d}:00:00",
         "is_peak": is_peak,
-        "total_distance_km": ROUTE_LENGTH_KM,
+        "total_distance_km": route['length_km'],
         "passenger_events": passenger_events,
         "speed_data": speed_data
     }
 
 
-def generate_week_data():
-    """Generate a full week of trip data for Route 12"""
+def generate_route_week_data(route, first_bus_num=1):
+    """
+    Generate a full week of trip data for one route
     
-    all_trips = []
+    Args:
+        route (dict): Route definition from the route registry
+        first_bus_num (int): Network-wide number of the route's first bus/driver
     
-    # Generate for Monday-Friday (5 days)
+    Returns:
+        list: Trips for the route
+    """
+    
+    route_trips = []
+    num_buses = route.get('num_buses', NUM_BUSES)
+    
+    # Generate for each operating day from Monday (Monday-Friday by default)
     start_date = datetime(2024, 12, 16)  # Monday
     
-    for day in range(5):
+    for day in range(current_settings().days_per_week):
         current_date = start_date + timedelta(days=day)
         
         # Each bus makes 6 trips per day
-        for bus_num in range(1, NUM_BUSES + 1):
-            bus_id = f"SBS{1234 + bus_num}K"
+        for bus_num in range(first_bus_num, first_bus_num + num_buses):
+            bus_id = f"SBS{FIRST_BUS_NUMBER - 1 + bus_num}K"
             driver_id = f"D{bus_num:03d}"
             
             # Trip times throughout the day
             trip_hours = [6, 9, 12, 15, 18, 21]
             
             for trip_num, hour in enumerate(trip_hours, 1):
-                trip = generate_trip(bus_id, driver_id, trip_num, current_date, hour)
-                all_trips.append(trip)
+                trip = generate_trip(bus_id, driver_id, trip_num, current_date, hour, route)
+                route_trips.append(trip)
+    
+    return route_trips
+
+
+def generate_week_data(route_ids=None, registry=None):
+    """
+    Generate a full week of trip data for every route
+    
+    Args:
+        route_ids (list): Routes to simulate (default: all routes in the registry)
+        registry (dict): Preloaded route registry
+    
+    Returns:
+        dict: {route_id: list of trips}
+    """
+    
+    if registry is None:
+        registry = load_route_registry()
+    
+    # Buses and drivers are numbered across the whole network so IDs stay unique
+    trips_by_route = {}
+    next_bus_num = 1
     
-    return all_trips
+    for route_id, route in registry.items():
+        if route_ids is None or route_id in route_ids:
+            trips_by_route[route_id] = generate_route_week_data(route, next_bus_num)
+        next_bus_num += route.get('num_buses', NUM_BUSES)
+    
+    return trips_by_route
+
+
+def summarize_trips(trips):
+    """Count peak/off-peak and load category trips"""
+    
+    total_trips = len(trips)
+    peak_trips = sum(1 for t in trips if t["is_peak"])
+    
+    # Count by load category
+    light_load = 0
+    medium_load = 0
+    heavy_load = 0
+    
+    for trip in trips:
+        max_load = max(event["total_onboard"] for event in trip["passenger_events"])
+        if max_load <= 30:
+            light_load += 1
+        elif max_load <= 60:
+            medium_load += 1
+        else:
+            heavy_load += 1
+    
+    return {
+        "total_trips": total_trips,
+        "peak_trips": peak_trips,
+        "off_peak_trips": total_trips - peak_trips,
+        "light_load_trips": light_load,
+        "medium_load_trips": medium_load,
+        "heavy_load_trips": heavy_load
+    }
 
 
 def save_to_file(data, filename):
@@ -248,56 +333,51 @@ def save_to_file(data, filename):
     return filepath
 
 
-def main():
+def main(route_ids=None):
     """Main function to generate all data"""
     
+    registry = load_route_registry()
+    if route_ids is None:
+        route_ids = list(registry)
+    
+    total_buses = sum(registry[r].get('num_buses', NUM_BUSES) for r in route_ids)
+    
     print("🚌 ProjectBus Data Simulator")
     print("=" * 50)
-    print(f"Generating trip data for Route 12...")
-    print(f"- Buses: {NUM_BUSES}")
+    print(f"Generating trip data for {len(route_ids)} route(s): {', '.join(route_ids)}")
+    print(f"- Buses: {total_buses}")
     print(f"- Days: 5 (Mon-Fri)")
     print(f"- Trips per bus per day: {TRIPS_PER_BUS_PER_DAY}")
-    print(f"- Total trips: {NUM_BUSES * 5 * TRIPS_PER_BUS_PER_DAY}")
+    print(f"- Total trips: {total_buses * 5 * TRIPS_PER_BUS_PER_DAY}")
     print("=" * 50)
     
     # Generate all trips
-    all_trips = generate_week_data()
+    trips_by_route = generate_week_data(route_ids, registry)
     
-    # Save raw trip data
-    save_to_file(all_trips, "route_12_trips.json")
+    # Save raw trip data, one file (and columnar archive) per route
+    for route_id, route_trips in trips_by_route.items():
+        save_to_file(route_trips, route_trips_filename(route_id))
+        print(f"✅ Saved: {write_archive(route_trips, route_archive_path(route_id))}/")
     
     # Generate summary statistics
-    total_trips = len(all_trips)
-    peak_trips = sum(1 for t in all_trips if t["is_peak"])
-    off_peak_trips = total_trips - peak_trips
-    
-    # Count by load category
-    light_load = 0
-    medium_load = 0
-    heavy_load = 0
-    
-    for trip in all_trips:
-        max_load = max(event["total_onboard"] for event in trip["passenger_events"])
-        if max_load <= 30:
-            light_load += 1
-        elif max_load <= 60:
-            medium_load += 1
-        else:
-            heavy_load += 1
-    
-    summary = {
-        "total_trips": total_trips,
-        "peak_trips": peak_trips,
-        "off_peak_trips": off_peak_trips,
-        "light_load_trips": light_load,
-        "medium_load_trips": medium_load,
-        "heavy_load_trips": heavy_load,
-        "route": "12",
-        "period": "Week of Dec 16-20, 2024"
+    all_trips = [trip for route_trips in trips_by_route.values() for trip in route_trips]
+    summary = summarize_trips(all_trips)
+    summary["routes"] = list(trips_by_route)
+    summary["period"] = "Week of Dec 16-20, 2024"
+    summary["by_route"] = {
+        route_id: summarize_trips(route_trips)
+        for route_id, route_trips in trips_by_route.items()
     }
     
     save_to_file(summary, "data_summary.json")
     
+    total_trips = summary["total_trips"]
+    peak_trips = summary["peak_trips"]
+    off_peak_trips = summary["off_peak_trips"]
+    light_load = summary["light_load_trips"]
+    medium_load = summary["medium_load_trips"]
+    heavy_load = summary["heavy_load_trips"]
+    
     print("\n📊 Summary:")
     print(f"  Total trips: {total_trips}")
     print(f"  Peak trips: {peak_trips} ({peak_trips/total_trips*100:.1f}%)")
@@ -310,4 +390,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(sys.argv[1:] or None)
@@ -0,0 +1,484 @@
+"""
+Driver Feed
+Local push server for in-cab displays: keeps each bus's live load category,
+acceleration category and running waste estimate from telemetry, and pushes
+only what changed over Server-Sent Events, coalesced to a bounded rate
+
+    GET /feed?bus=<bus_id>   SSE stream for one bus (omit bus for all buses)
+    GET /state               JSON snapshot of every bus
+
+Telemetry (stream_reassembly format, door events as in telemetry_replay)
+arrives in-process via DriverFeed.ingest or as newline-delimited JSON on
+the ingest port, e.g. from `projectbus replay --target 127.0.0.1:9750`.
+
+SSE events:
+    snapshot  {bus_id: {field: value}} on connect
+    delta     {'bus_id', 'timestamp', changed fields...}
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+# Run as a script: add parent directory to path to import algorithms and pipeline modules
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from algorithms.acceleration_detector import (
+    EVENT_THRESHOLD,
+    KMH_TO_MS,
+    calculate_acceleration,
+    classify_acceleration,
+    dominant_segment_category
+)
+from algorithms.fuel_estimator import estimate_segment_fuel
+from algorithms.load_classifier import BUS_CAPACITY, classify_load
+from algorithms.settings import ACCEL_CATEGORIES, current_settings
+from pipeline.route_registry import get_segment_distances, load_route_registry
+from pipeline.stream_reassembly import DEFAULT_STREAM_CONFIG, assign_segment
+
+# Default feed settings
+DEFAULT_FEED_CONFIG = {
+    'min_interval_sec': 0.05,  # At most one delta per bus per interval; bursts coalesce
+    'keepalive_sec': 15,       # SSE comment when a client has had nothing to read
+    'trip_gap_sec': DEFAULT_STREAM_CONFIG['trip_gap_sec'],   # Silence this long resets the waste estimate
+    'restart_km': DEFAULT_STREAM_CONFIG['restart_km']        # So does the position jumping back this far
+}
+
+DEFAULT_HTTP_PORT = 8765
+DEFAULT_INGEST_PORT = 9750  # telemetry_replay.SocketTarget default
+
+# Display fields; 'timestamp' rides along with every delta but is not a change by itself
+FEED_FIELDS = (
+    'route', 'driver_id', 'stop_name', 'passenger_count', 'capacity_percentage',
+    'load_category', 'accel_category', 'accel_ms2', 'waste_liters', 'waste_cost_sgd'
+)
+
+
+def new_bus_state():
+    return {'values': {}, 'last': None, 'waste': 0.0, **_new_segment(None)}
+
+
+def _new_segment(segment):
+    """Running state of the segment a bus is driving"""
+    return {'segment': segment, 'counts': dict.fromkeys(ACCEL_CATEGORIES, 0),
+            'segment_km': 0.0, 'segment_waste': 0.0}
+
+
+def route_segments(registry):
+    """{route_id: (stop positions, segment distances)} for segment lookup"""
+    return {
+        route_id: ([stop['position_km'] for stop in route['stops']], get_segment_distances(route))
+        for route_id, route in registry.items()
+    }
+
+
+def apply_message(state, message, config, routes=None):
+    """
+    Update one bus's live values from a telemetry message
+
+    The waste estimate follows the fuel estimator's rule, so the display
+    ends each trip on the dashboard's figure: finished segments keep their
+    excess fuel, and the current segment is charged the excess for its
+    load and the dominant category of its events so far over the whole
+    segment distance. A segment is the stretch between two stops
+    (stream_reassembly.assign_segment on 'position_km'); without a known
+    route or position the trip is one segment charged over the distance
+    driven so far.
+
+    Args:
+        state (dict): The bus's state (new_bus_state)
+        message (dict): GPS or door message
+        config (dict): Feed settings (DEFAULT_FEED_CONFIG)
+        routes (dict): route_segments of the registry
+
+    Returns:
+        bool: False if the message was older than the bus's last sample
+    """
+
+    values = state['values']
+    last = state['last']
+    ts = message['timestamp']
+
+    if last is not None and ts < last['timestamp']:
+        return False
+
+    values['route'] = message.get('route')
+    values['driver_id'] = message.get('driver_id')
+    values['timestamp'] = ts
+
+    if message.get('type') == 'door':
+        values['stop_name'] = message['stop_name']
+        passengers = message['total_onboard']
+    else:
+        passengers = message.get('passenger_load', values.get('passenger_count', 0))
+
+    load = classify_load(passengers)
+    values['passenger_count'] = passengers
+    values['capacity_percentage'] = round(passengers / BUS_CAPACITY * 100)
+    values['load_category'] = load['category']
+
+    if message.get('type') == 'door':
+        return True
+
+    if last is not None and (
+        ts - last['timestamp'] > config['trip_gap_sec']
+        or message.get('position_km', 0) < last.get('position_km', 0) - config['restart_km']
+    ):
+        # New trip: start the running estimate again
+        state.update(waste=0.0, **_new_segment(None))
+        last = None
+
+    route = (routes or {}).get(message.get('route'))
+    segment = None
+    if route is not None and 'position_km' in message:
+        segment = assign_segment(route[0], message['position_km'])
+
+    if segment != state['segment']:
+        # Entering the next stop's segment: the last one's charge is final
+        state['waste'] += state['segment_waste']
+        state.update(_new_segment(segment))
+        last = None
+
+    if last is not None and ts > last['timestamp']:
+        settings = current_settings()
+        dt = ts - last['timestamp']
+        accel = calculate_acceleration(last['speed_kmh'], message['speed_kmh'], dt)
+        category = 'GENTLE'
+        if accel > EVENT_THRESHOLD:
+            category = classify_acceleration(accel)
+            state['counts'][category] += 1
+
+        state['segment_km'] += (last['speed_kmh'] + message['speed_kmh']) / 2 / KMH_TO_MS * dt / 1000
+        distance_km = route[1][segment] if segment is not None else state['segment_km']
+        dominant = dominant_segment_category(*(state['counts'][c] for c in ACCEL_CATEGORIES))
+        state['segment_waste'] = estimate_segment_fuel(load['category'], dominant, distance_km)['excess_fuel_liters']
+        waste = state['waste'] + state['segment_waste']
+
+        values['accel_category'] = category
+        values['accel_ms2'] = round(max(accel, 0.0), 1)
+        values['waste_liters'] = round(waste, 2)
+        values['waste_cost_sgd'] = round(waste * settings.fuel_cost_sgd, 2)
+
+    state['last'] = message
+    return True
+
+
+class _Client:
+    """One SSE connection: undelivered deltas merged per bus"""
+
+    def __init__(self, bus_id):
+        self.bus_id = bus_id
+        self.pending = {}
+        self.wake = asyncio.Event()
+
+
+class DriverFeed:
+    """
+    Live per-bus state with coalesced, rate-bounded delta fan-out
+
+    A change is pushed at once if the bus's last push was at least
+    min_interval_sec ago, otherwise once the interval is up, with whatever
+    changed in the meantime. A slow client never queues more than one
+    pending delta per bus: new deltas merge into it.
+
+    All methods run on the event loop thread.
+    """
+
+    def __init__(self, config=None, registry=None):
+        self.config = {**DEFAULT_FEED_CONFIG, **(config or {})}
+        self.routes = route_segments(registry if registry is not None else load_route_registry())
+        self.buses = {}
+        self.sent = {}
+        self.clients = set()
+        self.stats = {'messages': 0, 'stale': 0, 'malformed': 0, 'deltas': 0, 'clients': 0}
+        self._last_push = {}
+        self._scheduled = set()
+
+    def ingest(self, message):
+        """Apply one telemetry message and schedule a delta if a field changed"""
+
+        self.stats['messages'] += 1
+        bus_id = message['bus_id']
+        state = self.buses.get(bus_id)
+        if state is None:
+            state = self.buses[bus_id] = new_bus_state()
+
+        if not apply_message(state, message, self.config, self.routes):
+            self.stats['stale'] += 1
+            return
+
+        if bus_id in self._scheduled or not self._changes(bus_id):
+            return
+
+        loop = asyncio.get_running_loop()
+        wait = self._last_push.get(bus_id, float('-inf')) + self.config['min_interval_sec'] - loop.time()
+        if wait <= 0:
+            self._push(bus_id)
+        else:
+            self._scheduled.add(bus_id)
+            loop.call_later(wait, self._push, bus_id)
+
+    def _changes(self, bus_id):
+        values = self.buses[bus_id]['values']
+        sent = self.sent.get(bus_id, {})
+        return {field: values[field] for field in FEED_FIELDS
+                if field in values and sent.get(field) != values[field]}
+
+    def _push(self, bus_id):
+        self._scheduled.discard(bus_id)
+        delta = self._changes(bus_id)
+        if not delta:
+            return
+
+        self.sent.setdefault(bus_id, {}).update(delta)
+        delta['timestamp'] = self.buses[bus_id]['values']['timestamp']
+        self._last_push[bus_id] = asyncio.get_running_loop().time()
+        self.stats['deltas'] += 1
+
+        for client in self.clients:
+            if client.bus_id is None or client.bus_id == bus_id:
+                client.pending.setdefault(bus_id, {}).update(delta)
+                client.wake.set()
+
+    def snapshot(self, bus_id=None):
+        """Values clients have been sent, {bus_id: {field: value}}"""
+        if bus_id is not None:
+            return {bus_id: dict(self.sent.get(bus_id, {}))}
+        return {bus: dict(values) for bus, values in self.sent.items()}
+
+    def subscribe(self, bus_id=None):
+        client = _Client(bus_id)
+        self.clients.add(client)
+        self.stats['clients'] = len(self.clients)
+        return client
+
+    def unsubscribe(self, client):
+        self.clients.discard(client)
+        self.stats['clients'] = len(self.clients)
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+async def _stream(feed, client, reader, writer):
+    """Write a client's snapshot, then its coalesced deltas, until it disconnects"""
+
+    writer.write(_sse('snapshot', feed.snapshot(client.bus_id)))
+    await writer.drain()
+
+    # SSE clients send nothing more: any read completing means they hung up
+    hangup = asyncio.ensure_future(reader.read())
+    wake = asyncio.ensure_future(client.wake.wait())
+    try:
+        while True:
+            done, _ = await asyncio.wait(
+                {hangup, wake}, timeout=feed.config['keepalive_sec'],
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if hangup in done:
+                return
+            if not done:
+                writer.write(b": keepalive\n\n")
+                await writer.drain()
+                continue
+
+            client.wake.clear()
+            wake = asyncio.ensure_future(client.wake.wait())
+            batch, client.pending = client.pending, {}
+            for bus_id, delta in batch.items():
+                writer.write(_sse('delta', {'bus_id': bus_id, **delta}))
+            await writer.drain()
+    finally:
+        hangup.cancel()
+        wake.cancel()
+
+
+async def _handle_http(feed, reader, writer):
+    """Minimal HTTP/1.1: GET /feed (SSE) and GET /state (JSON)"""
+
+    client = None
+    try:
+        request = (await reader.readline()).decode('latin-1').split()
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+
+        if len(request) < 2 or request[0] != 'GET':
+            writer.write(b"HTTP/1.1 405 Method Not Allowed\r\nContent-Length: 0\r\n\r\n")
+            return
+
+        url = urlsplit(request[1])
+        bus_id = parse_qs(url.query).get('bus', [None])[0]
+
+        if url.path == '/state':
+            body = json.dumps(feed.snapshot(bus_id)).encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Access-Control-Allow-Origin: *\r\n"
+                         + f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            return
+
+        if url.path != '/feed':
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+            return
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n"
+                     b"Access-Control-Allow-Origin: *\r\n\r\n")
+        client = feed.subscribe(bus_id)
+        await _stream(feed, client, reader, writer)
+
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        if client is not None:
+            feed.unsubscribe(client)
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def _handle_ingest(feed, reader, writer):
+    """Newline-delimited JSON telemetry into the feed"""
+
+    try:
+        while line := await reader.readline():
+            # A bad line is counted and skipped; the connection keeps going
+            try:
+                feed.ingest(json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                feed.stats['malformed'] += 1
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_feed_servers(feed, host='127.0.0.1', http_port=DEFAULT_HTTP_PORT,
+                             ingest_port=DEFAULT_INGEST_PORT):
+    """
+    Start the SSE and ingest servers on the running loop
+
+    Returns:
+        tuple: (http server, ingest server); port 0 picks a free port
+    """
+
+    http = await asyncio.start_server(lambda r, w: _handle_http(feed, r, w), host, http_port)
+    ingest = await asyncio.start_server(lambda r, w: _handle_ingest(feed, r, w), host, ingest_port)
+    return http, ingest
+
+
+def run_feed(host='127.0.0.1', http_port=DEFAULT_HTTP_PORT, ingest_port=DEFAULT_INGEST_PORT, config=None):
+    """Serve the driver feed until interrupted"""
+
+    async def serve():
+        feed = DriverFeed(config)
+        http, ingest = await start_feed_servers(feed, host, http_port, ingest_port)
+        print(f"🚌 Driver feed: http://{host}:{http_port}/feed?bus=<bus_id> "
+              f"(telemetry NDJSON on {host}:{ingest_port})")
+        async with http, ingest:
+            await asyncio.gather(http.serve_forever(), ingest.serve_forever())
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+# Test function
+def test_driver_feed():
+    """Replay a few buses into the feed and read one bus's SSE stream"""
+
+    from datetime import datetime
+    from pipeline.data_simulator import generate_trip
+    from pipeline.process_trips import process_single_trip
+    from pipeline.telemetry_replay import replay_stream
+
+    print("🧪 Testing Driver Feed\n")
+
+    registry = load_route_registry()
+    day = datetime(2024, 12, 16)
+    # D007/D008 drive aggressively (data_simulator.DRIVER_BEHAVIOR_PATTERN)
+    trips = [generate_trip(f"SBS{b:04d}A", f"D{b:03d}", 1, day, 8, registry['12']) for b in (7, 8, 1)]
+    messages = list(replay_stream({'12': trips}, registry))
+    watched = trips[0]['bus_id']
+    dashboard_waste = process_single_trip(trips[0], registry['12'])['fuel']['wasted_fuel_liters']
+
+    async def read_events(reader, events):
+        event = None
+        while line := await reader.readline():
+            line = line.decode().rstrip('\n')
+            if line.startswith('event: '):
+                event = line[7:]
+            elif line.startswith('data: '):
+                events.append((event, json.loads(line[6:]), time.perf_counter()))
+
+    async def run(speed):
+        feed = DriverFeed()
+        http, ingest = await start_feed_servers(feed, http_port=0, ingest_port=0)
+        port = http.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f"GET /feed?bus={watched} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        while (await reader.readline()) != b'\r\n':
+            pass
+        events = []
+        listener = asyncio.create_task(read_events(reader, events))
+        await asyncio.sleep(0.05)
+
+        # Paced producer; remember when each watched sample was ingested
+        ingested = {}
+        start = time.perf_counter()
+        first_ts = messages[0]['timestamp']
+        for message in messages:
+            delay = start + (message['timestamp'] - first_ts) / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if message['bus_id'] == watched:
+                ingested.setdefault(message['timestamp'], time.perf_counter())
+            feed.ingest(message)
+        await asyncio.sleep(feed.config['min_interval_sec'] * 2)
+
+        listener.cancel()
+        writer.close()
+        await asyncio.sleep(0.05)
+        print(f"  Clients after hang-up: {feed.stats['clients']}")
+        http.close()
+        ingest.close()
+
+        deltas = [(data, received) for event, data, received in events if event == 'delta']
+        latencies = sorted((received - ingested[data['timestamp']]) * 1000 for data, received in deltas)
+        display = {}
+        for data, _ in deltas:
+            display.update({k: v for k, v in data.items() if k not in ('bus_id', 'timestamp')})
+
+        sent = sum(1 for m in messages if m['bus_id'] == watched)
+        print(f"  Watched bus: {sent} messages → {len(deltas)} deltas "
+              f"({sum(len(json.dumps(d)) for d, _ in deltas) / 1024:.1f} KB)")
+        print(f"  Latency ingest → display: p50 {latencies[len(latencies) // 2]:.1f} ms, "
+              f"max {latencies[-1]:.1f} ms")
+        print(f"  Display matches feed state: {display == feed.snapshot(watched)[watched]}")
+        print(f"  Final: {display['load_category']} load, {display['accel_category']}, "
+              f"waste {display['waste_liters']} L (S${display['waste_cost_sgd']}), "
+              f"dashboard {dashboard_waste} L")
+
+    # Test 1: Real-time-like pacing, each change pushed at once
+    print(f"Test 1: 3 buses on route 12 at 50× real time")
+    asyncio.run(run(50))
+    print()
+
+    # Test 2: Faster than the update rate, bursts coalesce
+    print(f"Test 2: Same trips at 1000× (a sample every 5 ms per bus, at most 1 delta / 50 ms)")
+    asyncio.run(run(1000))
+
+    print("\n✅ Driver Feed Test Complete!")
+
+
+if __name__ == "__main__":
+    test_driver_feed()
@@ -4,29 +4,74 @@ Connects all 4 algorithms and generates output files for the dashboard
 """
 
 import json
+import os
 import sys
+from contextlib import nullcontext
+from functools import partial
 from pathlib import Path
 
-# Add parent directory to path to import algorithms
-sys.path.append(str(Path(__file__).parent.parent))
+# Run as a script: add parent directory to path to import algorithms
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
 
 from algorithms.load_classifier import analyze_trip_load
-from algorithms.acceleration_detector import analyze_trip_acceleration
+from algorithms.acceleration_detector import (
+    DETAIL_LEVELS,
+    DETAIL_SEGMENT,
+    analyze_trip_acceleration
+)
 from algorithms.fuel_estimator import estimate_trip_fuel
-from algorithms.savings_calculator import (
-    calculate_trip_savings,
-    calculate_fleet_savings,
-    project_fleet_wide_impact
+from algorithms.savings_calculator import calculate_trip_savings, calculate_fleet_savings
+from algorithms.settings import current_settings, pin_settings
+from algorithms.trip_validator import QUALITY_LIMITS, build_quality_report, check_passenger_events
+from pipeline.route_registry import (
+    DEFAULT_ROUTE_ID,
+    get_segment_distances,
+    load_route_registry,
+    route_trips_filename
 )
 
+# Optional engines (GPS filter, launch detector, map matcher, archive reader,
+# fleet projection) load NumPy and are imported where they are used, so a
+# process that only runs process_single_trip starts without them. The memory
+# profiler is imported only when a run asks for it.
+
+
+def has_trip_data(route_id, output_dir=None):
+    """Whether a route has simulated trips, as a JSON file or a columnar archive"""
+    data_file = Path(output_dir or Path(__file__).parent.parent / "output") / route_trips_filename(route_id)
+    return data_file.exists() or (data_file.with_suffix('') / 'trips.json').exists()
+
 
-def load_trip_data():
-    """Load trip data from data_simulator output"""
+def load_trip_data(route_id=DEFAULT_ROUTE_ID, columnar=False):
+    """
+    Load trip data for one route from data_simulator output
+    
+    Args:
+        route_id (str): Route number
+        columnar (bool): The run's analyzer reads sample columns (launch
+            detector, load-aware classifier): prefer the columnar archive
+            (memory-mapped, trips are zero-copy slices) unless the JSON file
+            is newer. Analyzers that iterate sample dicts read the JSON file,
+            which is faster than building the dicts from the archive; the
+            archive is their fallback when there is no JSON file.
+    """
     
-    data_file = Path(__file__).parent.parent / "output" / "route_12_trips.json"
+    filename = route_trips_filename(route_id)
+    data_file = Path(__file__).parent.parent / "output" / filename
+    archive = data_file.with_suffix('')  # trip_archive.route_archive_path
+    
+    if (archive / 'trips.json').exists() and (
+        not data_file.exists()
+        or columnar and (archive / 'trips.json').stat().st_mtime >= data_file.stat().st_mtime
+    ):
+        from pipeline.trip_archive import load_archived_trips
+        trips = load_archived_trips(archive)
+        print(f"✅ Loaded {len(trips)} trips from {archive.name}/ (archive)")
+        return trips
     
     if not data_file.exists():
-        print("❌ Error: route_12_trips.json not found!")
+        print(f"❌ Error: {filename} not found!")
         print("   Run data_simulator.py first: python3 backend/pipeline/data_simulator.py")
         return None
     
@@ -37,31 +82,132 @@ def load_trip_data():
     return trips
 
 
-def process_single_trip(trip_data):
+def needs_map_matching(speed_data):
+    """True for samples recorded with coordinates only (no segment labels)"""
+    if not speed_data:
+        return False
+    if hasattr(speed_data, 'needs_map_matching'):
+        return speed_data.needs_map_matching()
+    return 'segment' not in speed_data[0] and 'lat' in speed_data[0]
+
+
+# Acceleration output detail for pipeline runs: segment statistics, no event dicts
+DEFAULT_DETAIL = DETAIL_SEGMENT
+
+
+def make_accel_analyzer(gps_filter=None, launches=False, detail=DEFAULT_DETAIL, load_aware=False):
+    """
+    Pick the acceleration analyzer for a run
+    
+    Args:
+        gps_filter (dict): GPS filter settings, None for raw samples
+        launches (bool): Segment into launches with compact per-segment summaries
+        detail (str): 'summary' | 'segment' | 'full' (per-event dicts)
+        load_aware (bool): Charge every event to the load on board when it
+            starts (Load × Acceleration matrices; segment loads from samples)
+    
+    Returns:
+        callable: trip_data -> acceleration analysis
+    """
+    
+    if launches and load_aware:
+        raise ValueError("The launch detector and the load-aware classifier cannot be combined")
+    
+    if load_aware:
+        from algorithms.load_accel_classifier import analyze_trip_load_accel
+        return partial(analyze_trip_load_accel, detail=detail, gps_filter=gps_filter)
+    
+    if launches:
+        from algorithms.launch_detector import analyze_trip_launches
+        return partial(
+            analyze_trip_launches,
+            config={'gps_filter': gps_filter},
+            detail=detail
+        )
+    
+    if gps_filter is not None:
+        from algorithms.gps_filter import make_event_detector
+        return partial(
+            analyze_trip_acceleration,
+            event_detector=make_event_detector(gps_filter),
+            detail=detail
+        )
+    
+    return partial(analyze_trip_acceleration, detail=detail)
+
+
+def process_single_trip(trip_data, route=None, accel_analyzer=analyze_trip_acceleration,
+                        profiler=None, accel_sink=None):
     """
     Process a single trip through all 4 algorithms
     
     Args:
         trip_data (dict): Raw trip data
+        route (dict): Route definition (segment distances come from its stops)
+        accel_analyzer (callable): Acceleration analysis (see make_accel_analyzer)
+        profiler (MemoryProfiler): Measures each algorithm as a stage
+            (see memory_profile); None runs unmeasured
+        accel_sink (list): Passed to the analyzer to collect every event's
+            (segment, acceleration, load) for the run's distributions
     
     Returns:
-        dict: Complete analysis results
+        dict: Complete analysis results; trips that fail validation only
+            carry their 'data_quality' report with 'quarantine' set
     """
     
-    # Algorithm 1: Load Classification
-    load_analysis = analyze_trip_load(trip_data)
+    # All four algorithms use one settings version, even if it is reloaded meanwhile
+    with pin_settings() as settings:
+        result = _analyze_trip(trip_data, route, accel_analyzer, profiler, accel_sink)
     
-    # Algorithm 2: Acceleration Detection
-    accel_analysis = analyze_trip_acceleration(trip_data)
+    result['config_version'] = settings.version
+    return result
+
+
+def _unmeasured_stage(name):
+    return nullcontext()
+
+
+def _analyze_trip(trip_data, route, accel_analyzer, profiler=None, accel_sink=None):
+    """Body of process_single_trip, run with the trip's settings pinned"""
+    
+    stage = profiler.stage if profiler is not None else _unmeasured_stage
+    segment_distances = get_segment_distances(route) if route else None
+    
+    # Validation rides along with acceleration detection (same sample pass)
+    with stage('acceleration'):
+        quality_counts = check_passenger_events(trip_data.get('passenger_events', []))
+        
+        # Algorithm 2: Acceleration Detection
+        sink = {} if accel_sink is None else {'accel_sink': accel_sink}
+        accel_analysis = accel_analyzer(
+            trip_data, quality_counts=quality_counts, quality_limits=QUALITY_LIMITS, **sink
+        )
+    data_quality = build_quality_report(trip_data['trip_id'], quality_counts)
+    
+    if data_quality['quarantine']:
+        return {
+            'trip_id': trip_data['trip_id'],
+            'route': trip_data.get('route', DEFAULT_ROUTE_ID),
+            'data_quality': data_quality
+        }
+    
+    # Algorithm 1: Load Classification
+    with stage('load_classification'):
+        load_analysis = analyze_trip_load(trip_data)
     
     # Algorithm 3: Fuel Estimation
-    fuel_estimation = estimate_trip_fuel(trip_data, load_analysis, accel_analysis)
+    with stage('fuel_estimation'):
+        fuel_estimation = estimate_trip_fuel(
+            trip_data, load_analysis, accel_analysis, segment_distances
+        )
     
     # Algorithm 4: Savings Calculation
-    savings_analysis = calculate_trip_savings(fuel_estimation)
+    with stage('savings'):
+        savings_analysis = calculate_trip_savings(fuel_estimation)
     
     return {
         'trip_id': trip_data['trip_id'],
+        'route': trip_data.get('route', DEFAULT_ROUTE_ID),
         'bus_id': trip_data['bus_id'],
         'driver_id': trip_data['driver_id'],
         'date': trip_data['date'],
@@ -69,19 +215,181 @@ def process_single_trip(trip_data):
         'load': load_analysis,
         'acceleration': accel_analysis,
         'fuel': fuel_estimation,
-        'savings': savings_analysis
+        'savings': savings_analysis,
+        'data_quality': data_quality
     }
 
 
-def aggregate_fleet_statistics(processed_trips):
+def new_run_aggregates(memory_profile=None):
+    """
+    Mergeable run-wide trackers, filled trip by trip in each route worker
+    
+    Args:
+        memory_profile (dict): Memory profiler settings (see
+            memory_profile.DEFAULT_MEMORY_PROFILE_CONFIG); None for no profiler
+    
+    Returns:
+        dict: {'worst_offenders': WorstOffenders, 'hotspots': HotspotIndex,
+            'distributions': FleetDistributions}, plus 'memory_profile'
+            (MemoryProfiler) when profiling
+    """
+    # Imported here so starting a single-trip run does not pay for them
+    from algorithms.distribution_sketches import FleetDistributions
+    from algorithms.hotspot_index import HotspotIndex
+    from algorithms.worst_offenders import WorstOffenders
+    
+    aggregates = {
+        'worst_offenders': WorstOffenders(),
+        'hotspots': HotspotIndex(),
+        'distributions': FleetDistributions()
+    }
+    if memory_profile is not None:
+        from pipeline.memory_profile import MemoryProfiler
+        aggregates['memory_profile'] = MemoryProfiler(memory_profile)
+    return aggregates
+
+
+def add_to_run_aggregates(aggregates, trip, result, accelerations=()):
+    """
+    Account one processed trip in every tracker
+    
+    Args:
+        aggregates (dict): Run aggregates (see new_run_aggregates)
+        trip (dict): Raw trip
+        result (dict): Processed trip
+        accelerations (list): Events the analyzer reported to its accel_sink
+    """
+    aggregates['worst_offenders'].add_trip(result)
+    aggregates['hotspots'].add_trip(trip, result)
+    aggregates['distributions'].add_trip(result, accelerations)
+
+
+def process_route_trips(route_id, gps_filter=None, launches=False, detail=DEFAULT_DETAIL,
+                        memory_profile=None, checkpoint=None, load_aware=False):
+    """
+    Load and process every trip of one route (runs in a worker process)
+    
+    Args:
+        route_id (str): Route number
+        gps_filter (dict): GPS filter settings (see gps_filter.DEFAULT_FILTER_CONFIG);
+            None keeps the raw sample-pair detector
+        launches (bool): Use the launch detector instead of sample-pair events
+        detail (str): Acceleration output detail level
+        memory_profile (dict): Memory profiler settings; None runs unprofiled
+        checkpoint (dict): {'run_dir', 'shard_size'} to commit every shard of
+            trips with the aggregates so far (see checkpoints.RouteCheckpoint)
+            and resume after the last committed shard; None keeps it in memory
+        load_aware (bool): Use the load-aware classifier (see make_accel_analyzer)
+    
+    Returns:
+        tuple: (route_id, processed trips, list of (trip_id, error message),
+            quarantined raw trips with their 'data_quality' report,
+            run aggregates of the processed trips (see new_run_aggregates))
+    """
+    
+    aggregates = new_run_aggregates(memory_profile)
+    processed_trips = []
+    errors = []
+    quarantined = []
+    
+    route_checkpoint = None
+    first_trip = 0
+    shards = 0
+    if checkpoint is not None:
+        from pipeline.checkpoints import RouteCheckpoint
+        route_checkpoint = RouteCheckpoint(checkpoint['run_dir'], route_id)
+        state = route_checkpoint.load()
+        if state is not None:
+            first_trip, shards, aggregates = state['next_trip'], state['shards'], state['aggregates']
+            for shard in route_checkpoint.shards(shards):
+                processed_trips.extend(shard['processed'])
+                errors.extend(shard['errors'])
+                quarantined.extend(shard['quarantined'])
+            if state['done']:
+                print(f"  ♻️ Route {route_id}: {first_trip} trips restored from checkpoint")
+                return route_id, processed_trips, errors, quarantined, aggregates
+            print(f"  ♻️ Route {route_id}: resuming at trip {first_trip} ({shards} shards committed)")
+    
+    # Lengths of the output lists at the last commit
+    marks = (len(processed_trips), len(errors), len(quarantined))
+    
+    def commit(next_trip, done=False):
+        nonlocal shards, marks
+        shard = {
+            'processed': processed_trips[marks[0]:],
+            'errors': errors[marks[1]:],
+            'quarantined': quarantined[marks[2]:]
+        }
+        shards = route_checkpoint.commit(shard, next_trip, aggregates, done, shards)
+        marks = (len(processed_trips), len(errors), len(quarantined))
+    
+    profiler = aggregates.get('memory_profile')
+    stage = _unmeasured_stage
+    if profiler is not None:
+        profiler.start(route_id)
+        stage = profiler.stage
+    
+    route = load_route_registry()[route_id]
+    with stage('load_trips'):
+        trips = load_trip_data(route_id, columnar=launches or load_aware) or []
+    accel_analyzer = make_accel_analyzer(gps_filter, launches, detail, load_aware)
+    
+    route_index = None
+    
+    for i in range(first_trip, len(trips)):
+        trip = trips[i]
+        if route_checkpoint is not None and i > first_trip and i % checkpoint['shard_size'] == 0:
+            commit(i)
+        
+        if profiler is not None:
+            profiler.begin_trip()
+        
+        # A trip that raises is still closed, so the next one is measured on its own
+        try:
+            # Devices that only report coordinates are map-matched to segments first
+            if needs_map_matching(trip.get('speed_data')):
+                from pipeline.map_matcher import assign_trip_segments, build_route_index
+                route_index = route_index or build_route_index(route)
+                trip = assign_trip_segments(trip, route_index)
+            
+            accelerations = []
+            try:
+                result = process_single_trip(trip, route, accel_analyzer, profiler, accelerations)
+            except Exception as e:
+                errors.append((trip['trip_id'], str(e)))
+                continue
+            
+            if result['data_quality']['quarantine']:
+                quarantined.append({
+                    **trip,
+                    'speed_data': list(trip['speed_data']),
+                    'data_quality': result['data_quality']
+                })
+            else:
+                processed_trips.append(result)
+                add_to_run_aggregates(aggregates, trip, result, accelerations)
+        finally:
+            if profiler is not None:
+                profiler.end_trip()
+    
+    if profiler is not None:
+        profiler.stop()
+    
+    if route_checkpoint is not None:
+        commit(len(trips), done=True)
+    
+    return route_id, processed_trips, errors, quarantined, aggregates
+
+
+def summarize_by_load_category(processed_trips):
     """
-    Aggregate all trip data into fleet-wide statistics
+    Fuel stats for each dominant load category
     
     Args:
         processed_trips (list): List of processed trip results
     
     Returns:
-        dict: Fleet summary statistics
+        dict: {category: {count, percentage, avg_fuel_per_km, total_fuel}}
     """
     
     total_trips = len(processed_trips)
@@ -107,28 +415,72 @@ def aggregate_fleet_statistics(processed_trips):
                 'total_fuel': round(total_fuel, 1)
             }
     
+    return fuel_by_load
+
+
+def aggregate_fleet_statistics(processed_trips, route_ids=None):
+    """
+    Aggregate trip data into fleet statistics for a set of routes
+    
+    Args:
+        processed_trips (list): List of processed trip results
+        route_ids (list): Routes the trips cover (default: taken from the trips)
+    
+    Returns:
+        dict: Fleet summary statistics (the fleet-wide projection is added
+            by aggregate_network_statistics from per-route measured waste)
+    """
+    
+    if route_ids is None:
+        route_ids = sorted({t.get('route', DEFAULT_ROUTE_ID) for t in processed_trips})
+    
     # Calculate savings opportunity
     all_savings = [t['savings'] for t in processed_trips if t['savings']['has_savings']]
     fleet_savings = calculate_fleet_savings(all_savings)
     
-    # Fleet-wide projection
-    projection = project_fleet_wide_impact(fleet_savings)
-    
     return {
-        'route': '12',
+        'route': ', '.join(route_ids),
         'period': 'Week of Dec 16-20, 2024',
-        'total_trips': total_trips,
-        'by_load_category': fuel_by_load,
-        'fleet_savings': fleet_savings,
-        'sbs_fleet_projection': projection
+        'total_trips': len(processed_trips),
+        'by_load_category': summarize_by_load_category(processed_trips),
+        'fleet_savings': fleet_savings
     }
 
 
+def aggregate_network_statistics(trips_by_route):
+    """
+    Per-route and network-wide statistics in one pass over the results
+    
+    Args:
+        trips_by_route (dict): {route_id: processed trips}
+    
+    Returns:
+        dict: Network-wide fleet statistics with a 'by_route' breakdown
+    """
+    
+    all_trips = [trip for trips in trips_by_route.values() for trip in trips]
+    
+    network_stats = aggregate_fleet_statistics(all_trips, list(trips_by_route))
+    network_stats['by_route'] = {
+        route_id: aggregate_fleet_statistics(trips, [route_id])
+        for route_id, trips in trips_by_route.items()
+    }
+    
+    # Project from measured per-route waste rather than scaling one route
+    from algorithms.fleet_projection import collect_trip_waste, project_measured_fleet_impact
+    network_stats['sbs_fleet_projection'] = project_measured_fleet_impact(
+        collect_trip_waste(trips_by_route)
+    )
+    
+    return network_stats
+
+
 def create_manual_wasteful_scenario():
     """
     Create the KEY demo scenario manually: Heavy Load + Aggressive Acceleration
     This shows THE PROBLEM that our solution fixes
     """
+    heavy_above = current_settings().medium_threshold
     return {
         'trip_id': 'DEMO_HEAVY_WASTEFUL',
         'bus_id': 'SBS1238K',
@@ -215,8 +567,8 @@ def create_manual_wasteful_scenario():
             'heavy_aggressive_segments': 5,
             'heavy_aggressive_waste': 1.44,
             'priority': 'CRITICAL',
-            'main_issue': '5 segments with HEAVY load (>60 passengers) + AGGRESSIVE acceleration',
-            'main_action': 'Use GENTLE acceleration when passenger count exceeds 60',
+            'main_issue': f'5 segments with HEAVY load (>{heavy_above} passengers) + AGGRESSIVE acceleration',
+            'main_action': f'Use GENTLE acceleration when passenger count exceeds {heavy_above}',
             'segments': [
                 {'segment_id': 0, 'stop_name': 'Tampines Interchange', 'has_savings_potential': True, 'wasted_fuel': 0.06, 'wasted_cost': 0.09, 'priority': 'LOW'},
                 {'segment_id': 1, 'stop_name': 'Tampines Ave 4', 'has_savings_potential': True, 'wasted_fuel': 0.11, 'wasted_cost': 0.17, 'priority': 'MEDIUM'},
@@ -293,44 +645,145 @@ def save_output(data, filename):
     return filepath
 
 
-def main():
-    """Main processing pipeline"""
+def process_routes(route_ids, max_workers=None, gps_filter=None, launches=False,
+                   detail=DEFAULT_DETAIL, memory_profile=None, checkpoint=None, load_aware=False):
+    """
+    Process several routes in parallel, one worker process per route
+    
+    Args:
+        route_ids (list): Routes to process
+        max_workers (int): Worker processes (default: one per route, up to CPU count)
+        gps_filter (dict): GPS filter settings passed to every worker
+        launches (bool): Use the launch detector in every worker
+        detail (str): Acceleration output detail level
+        memory_profile (dict): Memory profiler settings for every worker;
+            None runs unprofiled
+        checkpoint (dict): {'run_dir', 'shard_size'} for every worker; None
+            runs without checkpoints
+        load_aware (bool): Use the load-aware classifier in every worker
+    
+    Returns:
+        tuple: ({route_id: processed trips} in route_ids order,
+            list of quarantined raw trips, run aggregates merged over all routes)
+    """
+    
+    if max_workers is None:
+        max_workers = min(len(route_ids), os.cpu_count() or 1)
+    
+    trips_by_route = {}
+    quarantined_trips = []
+    aggregates = new_run_aggregates(memory_profile)
+    
+    filters = [gps_filter] * len(route_ids)
+    launch_flags = [launches] * len(route_ids)
+    details = [detail] * len(route_ids)
+    profiles = [memory_profile] * len(route_ids)
+    checkpoints = [checkpoint] * len(route_ids)
+    load_flags = [load_aware] * len(route_ids)
+    
+    if max_workers <= 1:
+        pool = nullcontext()
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=max_workers)
+    
+    # The pool shuts its workers down even when a route raises
+    with pool as executor:
+        run = executor.map if executor is not None else map
+        results = run(
+            process_route_trips, route_ids, filters, launch_flags, details, profiles, checkpoints,
+            load_flags
+        )
+        
+        for route_id, processed_trips, errors, quarantined, route_aggregates in results:
+            for trip_id, error in errors:
+                print(f"  ⚠️ Error processing trip {trip_id}: {error}")
+            for trip in quarantined:
+                print(f"  🚧 Quarantined trip {trip['trip_id']}: {trip['data_quality']['issues']}")
+            print(f"  Route {route_id}: processed {len(processed_trips)} trips")
+            trips_by_route[route_id] = processed_trips
+            quarantined_trips.extend(quarantined)
+            for name, aggregate in route_aggregates.items():
+                aggregates[name].merge(aggregate)
+    
+    return trips_by_route, quarantined_trips, aggregates
+
+
+def main(route_ids=None, gps_filter=None, launches=False, detail=DEFAULT_DETAIL,
+         memory_profile=None, checkpoint=None, load_aware=False):
+    """
+    Main processing pipeline
+    
+    Args:
+        route_ids (list): Routes to process (default: all with simulated data)
+        gps_filter (dict): Smooth/resample GPS before acceleration detection
+            (see gps_filter.DEFAULT_FILTER_CONFIG); None uses raw samples
+        launches (bool): Detect launches and keep compact per-segment summaries
+        detail (str): Acceleration detail in the outputs: 'summary', 'segment'
+            (default) or 'full' to keep every acceleration event
+        memory_profile (dict): Profile memory per stage with these settings
+            (see memory_profile.DEFAULT_MEMORY_PROFILE_CONFIG) and write
+            memory_timeline.json; None runs unprofiled
+        checkpoint (dict): Commit processed shards and accumulator state while
+            running (see checkpoints.DEFAULT_CHECKPOINT_CONFIG), resume an
+            interrupted run with the same options, and remove the checkpoints
+            once the outputs are written; None runs without checkpoints
+        load_aware (bool): Classify load and acceleration per sample pair
+            (Load × Acceleration event matrices, segment loads from the
+            samples' passenger_load)
+    """
     
     print("\n" + "=" * 60)
     print("🚌 PROJECTBUS PROCESSING PIPELINE")
     print("=" * 60)
-    print("\nStep 1: Load trip data")
+    print("\nStep 1: Load route registry")
     print("-" * 60)
     
-    # Load data
-    trips = load_trip_data()
-    if not trips:
+    registry = load_route_registry()
+    output_dir = Path(__file__).parent.parent / "output"
+    
+    # Default to every registered route that has simulated data (JSON or archive)
+    if route_ids is None:
+        route_ids = [r for r in registry if has_trip_data(r, output_dir)]
+    
+    if not route_ids:
+        print("❌ Error: no route trip files found!")
+        print("   Run data_simulator.py first: python3 backend/pipeline/data_simulator.py")
         return
     
+    print(f"✅ Routes: {', '.join(route_ids)}")
+    
     print(f"\nStep 2: Process trips through 4 algorithms")
     print("-" * 60)
     
-    # Process all trips
-    processed_trips = []
-    
-    for i, trip in enumerate(trips, 1):
-        if i % 50 == 0:  # Progress indicator every 50 trips
-            print(f"  Processing trip {i}/{len(trips)}...")
-        
-        try:
-            result = process_single_trip(trip)
-            processed_trips.append(result)
-        except Exception as e:
-            print(f"  ⚠️ Error processing trip {trip['trip_id']}: {e}")
-            continue
-    
-    print(f"✅ Successfully processed {len(processed_trips)}/{len(trips)} trips")
+    run_checkpoint = None
+    if checkpoint is not None:
+        from pipeline.checkpoints import DEFAULT_CHECKPOINT_CONFIG, run_checkpoint_dir
+        checkpoint = {**DEFAULT_CHECKPOINT_CONFIG, **checkpoint}
+        run_dir = run_checkpoint_dir({
+            'gps_filter': gps_filter, 'launches': launches, 'detail': detail,
+            'memory_profile': memory_profile, 'load_aware': load_aware
+        }, checkpoint)
+        run_checkpoint = {'run_dir': str(run_dir), 'shard_size': checkpoint['shard_size']}
+        print(f"💾 Checkpoints every {checkpoint['shard_size']} trips in {run_dir}")
+    
+    # Process all routes in parallel
+    trips_by_route, quarantined_trips, aggregates = process_routes(
+        route_ids, gps_filter=gps_filter, launches=launches, detail=detail,
+        memory_profile=memory_profile, checkpoint=run_checkpoint, load_aware=load_aware
+    )
+    processed_trips = [trip for trips in trips_by_route.values() for trip in trips]
+    
+    print(f"✅ Successfully processed {len(processed_trips)} trips across {len(route_ids)} route(s)")
+    if quarantined_trips:
+        print(f"🚧 Quarantined {len(quarantined_trips)} trip(s) that failed data-quality checks")
     
     print(f"\nStep 3: Aggregate fleet statistics")
     print("-" * 60)
     
-    # Generate fleet statistics
-    fleet_stats = aggregate_fleet_statistics(processed_trips)
+    # Generate per-route and network-wide statistics
+    fleet_stats = aggregate_network_statistics(trips_by_route)
+    fleet_stats['distributions'] = aggregates['distributions'].to_dict()
     
     print(f"\n📊 Fleet Summary:")
     print(f"  Total trips: {fleet_stats['total_trips']}")
@@ -341,10 +794,27 @@ def main():
     print(f"\n  💰 Savings Opportunity:")
     savings = fleet_stats['fleet_savings']
     print(f"    Weekly waste: {savings['weekly_fuel_waste']} L (${savings['weekly_cost_waste']})")
-    print(f"    Annual (Route 12): ${savings['annual_cost_waste']:,.0f}")
+    for route_id, route_stats in fleet_stats['by_route'].items():
+        print(f"    Annual (Route {route_id}): ${route_stats['fleet_savings']['annual_cost_waste']:,.0f}")
     
     projection = fleet_stats['sbs_fleet_projection']
-    print(f"    Fleet-wide projection: ${projection['projected_annual_cost_waste']:,.0f}")
+    cost_low, cost_high = projection['projected_annual_cost_waste_ci']
+    print(f"    Fleet-wide projection: ${projection['projected_annual_cost_waste']:,.0f} "
+          f"({int(projection['confidence_level'] * 100)}% CI ${cost_low:,.0f} - ${cost_high:,.0f})")
+    
+    accel = fleet_stats['distributions']['acceleration_ms2'].get('fleet')
+    if accel:
+        print(f"\n  📈 Acceleration: p50 {accel['p50']} / p95 {accel['p95']} / p99 {accel['p99']} m/s² "
+              f"over {accel['count']:,} events")
+    
+    worst = aggregates['worst_offenders'].to_dict()
+    if worst['worst_trips']:
+        trip = worst['worst_trips'][0]
+        stop = worst['worst_stops'][0]
+        print(f"\n  🔥 Worst trip: {trip['trip_id']} (Route {trip['route']}, driver {trip['driver_id']}): "
+              f"{trip['wasted_fuel_liters']} L wasted")
+        print(f"  🔥 Worst stop: {stop['stop_name']} (Route {stop['route']}): "
+              f"{stop['excess_fuel_liters']} L excess over {stop['segments']} departures")
     
     print(f"\nStep 4: Generate demo scenarios")
     print("-" * 60)
@@ -359,19 +829,40 @@ def main():
     print(f"\nStep 5: Save output files")
     print("-" * 60)
     
-    # Save all outputs
-    save_output(fleet_stats, 'fleet_weekly_stats.json')
-    save_output(processed_trips, 'all_trips_processed.json')
+    profiler = aggregates.get('memory_profile')
+    stage = _unmeasured_stage
+    if profiler is not None:
+        profiler.start('output')
+        stage = profiler.stage
     
-    # Save demo scenarios
-    if scenarios['light_load_optimal']:
-        save_output(scenarios['light_load_optimal'], 'scenario_light_load.json')
+    # Save all outputs
+    with stage('serialization'):
+        save_output(fleet_stats, 'fleet_weekly_stats.json')
+        save_output(processed_trips, 'all_trips_processed.json')
+        save_output(quarantined_trips, 'quarantined_trips.json')
+        save_output(worst, 'worst_offenders.json')
+        save_output(aggregates['hotspots'].to_dict(), 'hotspot_index.json')
+        
+        # Save demo scenarios
+        if scenarios['light_load_optimal']:
+            save_output(scenarios['light_load_optimal'], 'scenario_light_load.json')
+        
+        if scenarios['heavy_load_optimal']:
+            save_output(scenarios['heavy_load_optimal'], 'scenario_heavy_optimal.json')
+        
+        if scenarios['heavy_load_wasteful']:
+            save_output(scenarios['heavy_load_wasteful'], 'scenario_heavy_wasteful.json')
     
-    if scenarios['heavy_load_optimal']:
-        save_output(scenarios['heavy_load_optimal'], 'scenario_heavy_optimal.json')
+    if profiler is not None:
+        profiler.stop()
+        from pipeline.memory_profile import print_memory_report
+        memory_report = profiler.to_dict()
+        save_output(memory_report, 'memory_timeline.json')
+        print_memory_report(memory_report)
     
-    if scenarios['heavy_load_wasteful']:
-        save_output(scenarios['heavy_load_wasteful'], 'scenario_heavy_wasteful.json')
+    if run_checkpoint is not None:
+        from pipeline.checkpoints import clear_checkpoints
+        clear_checkpoints(run_checkpoint['run_dir'])
     
     print("\n" + "=" * 60)
     print("✅ PIPELINE COMPLETE!")
@@ -385,4 +876,25 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # --filter turns on GPS smoothing with the default settings,
+    # --launches switches to the launch detector,
+    # --load-aware charges every acceleration event to the load on board,
+    # --detail=summary|segment|full picks the acceleration output detail,
+    # --memory-profile measures memory per stage (memory_timeline.json),
+    # --checkpoint commits progress so an interrupted run resumes
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    detail = next(
+        (a.split('=', 1)[1] for a in sys.argv[1:] if a.startswith('--detail=')),
+        DEFAULT_DETAIL
+    )
+    if detail not in DETAIL_LEVELS:
+        sys.exit(f"Unknown detail level: {detail} (expected one of {', '.join(DETAIL_LEVELS)})")
+    main(
+        args or None,
+        gps_filter={} if '--filter' in sys.argv else None,
+        launches='--launches' in sys.argv,
+        detail=detail,
+        memory_profile={} if '--memory-profile' in sys.argv else None,
+        checkpoint={} if '--checkpoint' in sys.argv else None,
+        load_aware='--load-aware' in sys.argv
+    )
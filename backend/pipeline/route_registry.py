@@ -0,0 +1,157 @@
+"""
+Route Registry
+Loads bus route definitions (stops with position_km) from backend/data/routes.json
+so the simulator, pipeline and aggregation are not tied to a single route
+"""
+
+import json
+from datetime import timedelta, timezone
+from pathlib import Path
+
+# Default location of the route definitions
+ROUTES_FILE = Path(__file__).parent.parent / "data" / "routes.json"
+
+# Route used when a caller does not ask for a specific one
+DEFAULT_ROUTE_ID = "12"
+
+# Service time zone (Singapore, UTC+8) for routes without 'utc_offset_hours'
+DEFAULT_UTC_OFFSET_HOURS = 8
+
+
+def _validate_route(route):
+    """Raise ValueError if a route definition cannot be used by the pipeline"""
+
+    route_id = route.get('route_id')
+    stops = route.get('stops', [])
+
+    if not route_id:
+        raise ValueError("Route definition is missing 'route_id'")
+
+    if len(stops) < 2:
+        raise ValueError(f"Route {route_id} needs at least 2 stops")
+
+    positions = [stop['position_km'] for stop in stops]
+    if any(b <= a for a, b in zip(positions, positions[1:])):
+        raise ValueError(f"Route {route_id} stops must have increasing position_km")
+
+    # Coordinates are optional, but map-matching needs them on every stop
+    with_coordinates = sum(1 for stop in stops if 'lat' in stop and 'lon' in stop)
+    if with_coordinates not in (0, len(stops)):
+        raise ValueError(f"Route {route_id} stops must all have lat/lon or none")
+
+
+def load_route_registry(path=None):
+    """
+    Load all route definitions from the registry file
+
+    Args:
+        path (str | Path): Registry JSON file (default backend/data/routes.json)
+
+    Returns:
+        dict: {route_id: route} in file order. Each route has
+            'route_id', 'name', 'num_buses', 'stops' and a derived 'length_km'
+    """
+
+    registry_file = Path(path) if path else ROUTES_FILE
+
+    with open(registry_file, 'r') as f:
+        data = json.load(f)
+
+    registry = {}
+
+    for route in data.get('routes', []):
+        _validate_route(route)
+
+        route_id = str(route['route_id'])
+        if route_id in registry:
+            raise ValueError(f"Duplicate route_id in registry: {route_id}")
+
+        route = dict(route)
+        route['route_id'] = route_id
+        route['length_km'] = round(route['stops'][-1]['position_km'] - route['stops'][0]['position_km'], 3)
+        registry[route_id] = route
+
+    return registry
+
+
+def route_timezone(route=None):
+    """
+    Fixed-offset time zone a route's dates and departure times are in
+
+    Args:
+        route (dict): Route from the registry; an optional 'utc_offset_hours'
+            overrides DEFAULT_UTC_OFFSET_HOURS
+
+    Returns:
+        datetime.timezone: Independent of the host's local time zone
+    """
+
+    hours = (route or {}).get('utc_offset_hours', DEFAULT_UTC_OFFSET_HOURS)
+    return timezone(timedelta(hours=hours))
+
+
+def get_route(route_id, registry=None):
+    """
+    Look up a single route definition
+
+    Args:
+        route_id (str): Route number, e.g. '12'
+        registry (dict): Preloaded registry (loaded from file if omitted)
+
+    Returns:
+        dict: Route definition
+    """
+
+    if registry is None:
+        registry = load_route_registry()
+
+    route_id = str(route_id)
+    if route_id not in registry:
+        raise KeyError(f"Unknown route: {route_id}")
+
+    return registry[route_id]
+
+
+def get_segment_distances(route):
+    """
+    Distance in km of each segment between consecutive stops
+
+    Args:
+        route (dict): Route definition
+
+    Returns:
+        list: Segment distances, one per stop pair
+    """
+
+    stops = route['stops']
+    return [
+        round(stops[i + 1]['position_km'] - stops[i]['position_km'], 3)
+        for i in range(len(stops) - 1)
+    ]
+
+
+def route_trips_filename(route_id):
+    """Raw trip file name written by the simulator for a route"""
+    return f"route_{route_id}_trips.json"
+
+
+# Test function
+def test_registry():
+    """Print the routes available in the registry"""
+
+    print("🧪 Testing Route Registry\n")
+
+    registry = load_route_registry()
+
+    for route_id, route in registry.items():
+        distances = get_segment_distances(route)
+        print(f"Route {route_id}: {route['name']}")
+        print(f"  Stops: {len(route['stops'])}, Length: {route['length_km']} km, Buses: {route.get('num_buses')}")
+        print(f"  Segments: {distances}")
+        print()
+
+    print("✅ Route Registry Test Complete!")
+
+
+if __name__ == "__main__":
+    test_registry()
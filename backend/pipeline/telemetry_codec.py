@@ -0,0 +1,425 @@
+"""
+Telemetry Codec
+Compact binary uplink for speed samples: one frame per bus batch with
+delta-encoded timestamps and speeds in fixed point and varint segment and
+load fields, decoded in one vectorized pass straight into the columns
+gps_filter.speed_data_to_arrays returns
+
+Frame layout (varints are LEB128, signed fields zigzag-encoded):
+    b'PB' version
+    bus_id, driver_id, route   varint length + UTF-8 each
+    base_ms                    signed varint, timestamp of the first sample in ms
+    count, payload_len         varints
+    payload                    per sample: Δtimestamp (ms), Δspeed (0.1 km/h),
+                               segment (signed), passenger_load
+
+Deltas restart in every frame, so each frame decodes on its own; frames of
+any buses are simply concatenated. Timestamps are exact to the ms and
+speeds to 0.1 km/h (lossless for the simulator's 1-decimal speeds).
+"""
+
+import json
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Run as a script: add parent directory to path to import algorithms and pipeline modules
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from algorithms.edge_engine import SPEED_SCALE, TIME_SCALE
+
+MAGIC = b'PB'
+VERSION = 1
+
+# Samples per frame when a trip is split for the uplink
+DEFAULT_FRAME_SAMPLES = 64
+
+# Payload varints per sample and which of them are zigzag-encoded
+FIELDS_PER_SAMPLE = 4
+SIGNED_FIELDS = (True, True, True, False)
+
+
+def _write_varint(out, value):
+    """Append an unsigned LEB128 varint"""
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _read_varint(buffer, pos):
+    """Unsigned varint at pos; returns (value, next pos)"""
+    value = shift = 0
+    while True:
+        if pos >= len(buffer):
+            raise ValueError(f"Truncated varint at byte {pos}")
+        byte = buffer[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def _write_text(out, text):
+    encoded = text.encode('utf-8')
+    _write_varint(out, len(encoded))
+    out += encoded
+
+
+def _read_text(buffer, pos):
+    length, pos = _read_varint(buffer, pos)
+    return bytes(buffer[pos:pos + length]).decode('utf-8'), pos + length
+
+
+def encode_frame(bus_id, driver_id, route, samples):
+    """
+    Encode one batch of a bus's samples
+
+    Pure Python, so it runs on units without NumPy.
+
+    Args:
+        bus_id (str): Bus
+        driver_id (str): Driver
+        route (str): Route id
+        samples (list): speed_data dicts {'timestamp', 'speed_kmh', 'segment', 'passenger_load'}
+
+    Returns:
+        bytes: The frame
+    """
+
+    payload = bytearray()
+    base_ms = round(samples[0]['timestamp'] * TIME_SCALE) if samples else 0
+    previous_ms = base_ms
+    previous_speed = 0
+
+    for sample in samples:
+        time_ms = round(sample['timestamp'] * TIME_SCALE)
+        speed = round(sample['speed_kmh'] * SPEED_SCALE)
+        load = sample.get('passenger_load', 0)
+        if load < 0:
+            raise ValueError(f"Negative passenger_load: {load}")
+
+        _write_varint(payload, _zigzag(time_ms - previous_ms))
+        _write_varint(payload, _zigzag(speed - previous_speed))
+        _write_varint(payload, _zigzag(sample.get('segment', 0)))
+        _write_varint(payload, load)
+        previous_ms = time_ms
+        previous_speed = speed
+
+    frame = bytearray(MAGIC)
+    frame.append(VERSION)
+    for text in (bus_id, driver_id, route):
+        _write_text(frame, text)
+    _write_varint(frame, _zigzag(base_ms))
+    _write_varint(frame, len(samples))
+    _write_varint(frame, len(payload))
+    frame += payload
+    return bytes(frame)
+
+
+def encode_trip(trip, frame_samples=DEFAULT_FRAME_SAMPLES):
+    """
+    A trip's speed_data as consecutive frames of at most frame_samples
+
+    Returns:
+        bytes: Concatenated frames
+    """
+
+    samples = trip['speed_data']
+    return b''.join(
+        encode_frame(trip['bus_id'], trip['driver_id'], trip['route'], samples[i:i + frame_samples])
+        for i in range(0, len(samples), frame_samples)
+    )
+
+
+def _read_header(buffer, pos):
+    """Frame header at pos; returns (header dict, payload start)"""
+
+    prefix = bytes(buffer[pos:pos + 3])
+    if len(prefix) < 3 or prefix[:2] != MAGIC:
+        raise ValueError(f"Not a telemetry frame at byte {pos}")
+    if prefix[2] != VERSION:
+        raise ValueError(f"Unsupported frame version {prefix[2]} at byte {pos}")
+    pos += 3
+
+    header = {}
+    for field in ('bus_id', 'driver_id', 'route'):
+        header[field], pos = _read_text(buffer, pos)
+    base_ms, pos = _read_varint(buffer, pos)
+    header['base_ms'] = _unzigzag(base_ms)
+    header['count'], pos = _read_varint(buffer, pos)
+    header['payload_len'], pos = _read_varint(buffer, pos)
+
+    if pos + header['payload_len'] > len(buffer):
+        raise ValueError(f"Truncated frame at byte {pos}")
+    return header, pos
+
+
+def decode_frames(buffer):
+    """
+    Decode frames back into speed_data dicts, one varint at a time
+
+    The pure-Python path (and the reference for decode_columns).
+
+    Returns:
+        list: (header, samples) per frame
+    """
+
+    frames = []
+    pos = 0
+    while pos < len(buffer):
+        header, pos = _read_header(buffer, pos)
+        time_ms = header['base_ms']
+        speed = 0
+        samples = []
+        for _ in range(header['count']):
+            values = []
+            for signed in SIGNED_FIELDS:
+                value, pos = _read_varint(buffer, pos)
+                values.append(_unzigzag(value) if signed else value)
+            time_ms += values[0]
+            speed += values[1]
+            samples.append({
+                'timestamp': time_ms / TIME_SCALE,
+                'speed_kmh': speed / SPEED_SCALE,
+                'segment': values[2],
+                'passenger_load': values[3]
+            })
+        frames.append((header, samples))
+    return frames
+
+
+def decode_varints(data):
+    """
+    Every unsigned varint in a byte array at once
+
+    Args:
+        data (np.ndarray): uint8 bytes holding whole varints only
+
+    Returns:
+        np.ndarray: int64 values
+    """
+
+    import numpy as np
+
+    if len(data) == 0:
+        return np.zeros(0, dtype=np.int64)
+    if data[-1] >= 0x80:
+        raise ValueError("Truncated varint at the end of the payload")
+
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    shifts = (np.arange(len(data)) - np.repeat(starts, ends - starts + 1)) * 7
+    return np.add.reduceat((data & 0x7f).astype(np.int64) << shifts, starts)
+
+
+def decode_columns(buffer):
+    """
+    Batch-decode frames into sample columns
+
+    The headers are read in Python; the payload varints of all frames are
+    decoded together, and deltas are accumulated per frame.
+
+    Args:
+        buffer (bytes): Concatenated frames
+
+    Returns:
+        list: (header, (timestamps, speeds_kmh, segments, passenger_loads))
+            per frame, columns as gps_filter.speed_data_to_arrays returns them
+    """
+
+    import numpy as np
+
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    headers = []
+    payloads = []
+    pos = 0
+    while pos < len(data):
+        header, pos = _read_header(buffer, pos)
+        headers.append(header)
+        payloads.append(data[pos:pos + header['payload_len']])
+        pos += header['payload_len']
+
+    values = decode_varints(np.concatenate(payloads) if payloads else data[:0])
+    counts = np.array([header['count'] for header in headers], dtype=np.int64)
+    if len(values) != counts.sum() * FIELDS_PER_SAMPLE:
+        raise ValueError("Frame payloads do not hold their sample counts")
+    values = values.reshape(-1, FIELDS_PER_SAMPLE)
+
+    signed = values[:, :3]
+    values[:, :3] = (signed >> 1) ^ -(signed & 1)
+
+    # Running sums over all frames, restarted at each frame's first sample
+    bases = np.array([header['base_ms'] for header in headers], dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+    running = np.cumsum(values[:, :2], axis=0)
+    before = np.zeros((len(headers), 2), dtype=np.int64)
+    nonempty = counts > 0
+    before[nonempty] = running[starts[nonempty]] - values[starts[nonempty], :2]
+    running -= np.repeat(before, counts, axis=0)
+
+    timestamps = (running[:, 0] + np.repeat(bases, counts)) / TIME_SCALE
+    speeds = running[:, 1] / SPEED_SCALE
+    segments = values[:, 2].astype(np.int32)
+    loads = values[:, 3].astype(np.int32)
+
+    frames = []
+    for header, start, count in zip(headers, starts.tolist(), counts.tolist()):
+        end = start + count
+        frames.append((header, (timestamps[start:end], speeds[start:end],
+                                segments[start:end], loads[start:end])))
+    return frames
+
+
+def benchmark_codec(num_trips=200, frame_samples=DEFAULT_FRAME_SAMPLES, seed=50):
+    """
+    Bytes per sample and decode throughput against JSON
+
+    JSON baselines: one message per sample as telemetry_replay sends it
+    (bus, driver and route in every line) and one speed_data array per
+    frame. JSON decode includes building the same columns.
+
+    Returns:
+        dict: Bytes per sample per format and samples/s per decoder
+    """
+
+    from algorithms.gps_filter import speed_data_to_arrays
+    from pipeline.data_simulator import generate_trip
+    from pipeline.route_registry import load_route_registry
+
+    registry = load_route_registry()
+    route_ids = sorted(registry)
+    random.seed(seed)
+    day = datetime(2024, 12, 16)
+    trips = [
+        generate_trip(f"SBS{i + 1:04d}A", f"D{i % 60 + 1:03d}", i, day, 6 + i % 17,
+                      registry[route_ids[i % len(route_ids)]])
+        for i in range(num_trips)
+    ]
+    num_samples = sum(len(trip['speed_data']) for trip in trips)
+
+    def batches(trip):
+        samples = trip['speed_data']
+        return [samples[i:i + frame_samples] for i in range(0, len(samples), frame_samples)]
+
+    json_messages = b''.join(
+        json.dumps({'bus_id': trip['bus_id'], 'driver_id': trip['driver_id'], 'route': trip['route'],
+                    **sample}, separators=(',', ':')).encode() + b'\n'
+        for trip in trips for sample in trip['speed_data']
+    )
+    json_frames = b''.join(
+        json.dumps({'bus_id': trip['bus_id'], 'driver_id': trip['driver_id'], 'route': trip['route'],
+                    'speed_data': batch}, separators=(',', ':')).encode() + b'\n'
+        for trip in trips for batch in batches(trip)
+    )
+
+    start = time.perf_counter()
+    binary = b''.join(encode_trip(trip, frame_samples) for trip in trips)
+    encode_sec = time.perf_counter() - start
+
+    def timed(fn):
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+
+    def decode_json_frames():
+        for line in json_frames.splitlines():
+            speed_data_to_arrays(json.loads(line)['speed_data'])
+
+    def decode_json_messages():
+        speed_data_to_arrays([json.loads(line) for line in json_messages.splitlines()])
+
+    seconds = {
+        'json_messages': timed(decode_json_messages),
+        'json_frames': timed(decode_json_frames),
+        'binary_python': timed(lambda: decode_frames(binary)),
+        'binary_columns': timed(lambda: decode_columns(binary))
+    }
+
+    return {
+        'trips': num_trips,
+        'samples': num_samples,
+        'frame_samples': frame_samples,
+        'bytes_per_sample': {
+            'json_messages': round(len(json_messages) / num_samples, 1),
+            'json_frames': round(len(json_frames) / num_samples, 1),
+            'binary': round(len(binary) / num_samples, 1)
+        },
+        'encode_samples_per_sec': round(num_samples / encode_sec),
+        'decode_samples_per_sec': {name: round(num_samples / sec) for name, sec in seconds.items()}
+    }
+
+
+# Test function
+def test_telemetry_codec():
+    """Round-trip simulated trips and compare size and decode speed with JSON"""
+
+    from algorithms.acceleration_detector import DETAIL_SUMMARY, analyze_trip_acceleration
+    from pipeline.data_simulator import generate_trip
+    from pipeline.route_registry import load_route_registry
+    from pipeline.trip_archive import ArchivedSpeedData
+
+    print("🧪 Testing Telemetry Codec\n")
+
+    registry = load_route_registry()
+    random.seed(1)
+    day = datetime(2024, 12, 16)
+    trips = [
+        generate_trip(f"SBS{b + 1:04d}A", f"D{b + 1:03d}", 1, day, 8, registry[route_id])
+        for b, route_id in enumerate(['12', '17'])
+    ]
+    trips[1]['speed_data'][3]['timestamp'] += 0.25
+
+    # Test 1: Lossless round trip, both decoders
+    print("Test 1: Round trip (2 trips, 16-sample frames)")
+    buffer = b''.join(encode_trip(trip, frame_samples=16) for trip in trips)
+    frames = decode_frames(buffer)
+    decoded = [s for header, samples in frames if header['bus_id'] == 'SBS0001A' for s in samples]
+    fields = ('timestamp', 'speed_kmh', 'segment', 'passenger_load')
+    expected = [{k: s[k] for k in fields} for s in trips[0]['speed_data']]
+    print(f"  Frames: {len(frames)}, {len(buffer):,} bytes; samples identical: {decoded == expected}")
+
+    columns = decode_columns(buffer)
+    same = all(
+        all(list(a) == [s[k] for s in samples] for a, k in zip(cols, fields))
+        for (_, samples), (_, cols) in zip(frames, columns)
+    )
+    print(f"  Columnar decode matches: {same}")
+
+    # Test 2: Columns feed the detectors directly
+    print("\nTest 2: Detection on decoded columns")
+    import numpy as np
+    bus_columns = [cols for header, cols in columns if header['bus_id'] == 'SBS0002A']
+    trip = {**trips[1], 'speed_data': ArchivedSpeedData(
+        tuple(np.concatenate(parts) for parts in zip(*bus_columns))
+    )}
+    reference = analyze_trip_acceleration(trips[1], detail=DETAIL_SUMMARY)
+    print(f"  Same analysis: {analyze_trip_acceleration(trip, detail=DETAIL_SUMMARY) == reference}")
+
+    # Test 3: Size and speed against JSON
+    print("\nTest 3: Benchmark against JSON")
+    result = benchmark_codec(num_trips=50)
+    for name, size in result['bytes_per_sample'].items():
+        print(f"  {name}: {size} bytes/sample")
+    for name, rate in result['decode_samples_per_sec'].items():
+        print(f"  decode {name}: {rate:,} samples/s")
+
+    print("\n✅ Telemetry Codec Test Complete!")
+
+
+if __name__ == "__main__":
+    test_telemetry_codec()
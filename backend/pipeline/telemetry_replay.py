@@ -0,0 +1,466 @@
+"""
+Telemetry Replay
+Replays recorded or simulated trips as live GPS and door telemetry from
+every bus, in timestamp order, at a multiple of real time, into an
+in-process consumer or a local socket; reports message rate and lag
+
+GPS messages are the stream_reassembly telemetry format plus 'type': 'gps'.
+Door messages are sent as the bus leaves each stop:
+    {'type': 'door', 'bus_id', 'driver_id', 'route', 'timestamp',
+     'stop_id', 'stop_name', 'boarding', 'alighting', 'total_onboard'}
+"""
+
+import heapq
+import json
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Run as a script: add parent directory to path to import algorithms and pipeline modules
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from algorithms.distribution_sketches import QuantileSketch
+from pipeline.route_registry import load_route_registry, route_timezone
+from pipeline.stream_reassembly import StreamReassembler, trip_to_messages
+
+# Default replay settings
+DEFAULT_REPLAY_CONFIG = {
+    'speed': 100.0,         # Multiple of real time; None replays as fast as possible
+    'max_idle_sec': None,   # Stream gaps longer than this (e.g. overnight) are cut to it
+    'duration_sec': None    # Stop after this much wall time
+}
+
+# Pacing sleeps only when the replay is this far ahead of schedule
+MIN_SLEEP_SEC = 0.001
+
+CONSUMERS = ('null', 'reassemble', 'process')
+
+
+def trip_start_ts(trip, route=None):
+    """Epoch seconds of a trip's departure ('date' + 'start_time' in the route's time zone)"""
+    start = datetime.strptime(f"{trip['date']} {trip['start_time']}", '%Y-%m-%d %H:%M:%S')
+    return start.replace(tzinfo=route_timezone(route)).timestamp()
+
+
+def trip_events(trip, route):
+    """
+    GPS and door messages of one trip in timestamp order
+
+    Args:
+        trip (dict): Raw trip (simulated or from a route trip file)
+        route (dict): The trip's route
+
+    Returns:
+        list: Messages, door events placed at each stop's departure
+    """
+
+    gps = trip_to_messages(trip, route, trip_start_ts(trip, route))
+    for message in gps:
+        message['type'] = 'gps'
+
+    # trip_to_messages emits segments in order; a segment starts at its stop
+    samples_per_segment = {}
+    for sample in trip['speed_data']:
+        samples_per_segment[sample['segment']] = samples_per_segment.get(sample['segment'], 0) + 1
+
+    departures = {}
+    index = 0
+    for segment, count in sorted(samples_per_segment.items()):
+        departures[segment] = gps[index]['timestamp']
+        index += count
+
+    events = trip['passenger_events']
+    door = []
+    for i, event in enumerate(events):
+        # The last stop is served when the final sample arrives
+        ts = departures.get(i, gps[-1]['timestamp']) if i < len(events) - 1 else gps[-1]['timestamp']
+        door.append({
+            'type': 'door',
+            'bus_id': trip['bus_id'],
+            'driver_id': trip['driver_id'],
+            'route': trip['route'],
+            'timestamp': ts,
+            **event
+        })
+
+    # Stable: at equal timestamps the door event precedes the first GPS sample
+    return sorted(door + gps, key=lambda message: message['timestamp'])
+
+
+def replay_stream(trips_by_route, registry=None):
+    """
+    One timestamp-ordered message stream across every bus
+
+    Trips are opened only when the stream reaches their departure, so
+    memory grows with the buses on the road, not with the whole week.
+
+    Args:
+        trips_by_route (dict): {route_id: trips} (e.g. generate_week_data())
+        registry (dict): Route registry
+
+    Yields:
+        dict: GPS and door messages
+    """
+
+    registry = registry if registry is not None else load_route_registry()
+    pending = sorted(
+        ((trip_start_ts(trip, registry[route_id]), i, route_id, trip)
+         for i, (route_id, trip) in enumerate(
+             (route_id, trip) for route_id, trips in trips_by_route.items() for trip in trips)),
+        key=lambda entry: entry[:2]
+    )
+
+    heap = []
+    next_trip = 0
+    seq = 0
+
+    while heap or next_trip < len(pending):
+        # Open every trip departing before the next queued message
+        while next_trip < len(pending) and (not heap or pending[next_trip][0] <= heap[0][0]):
+            _, _, route_id, trip = pending[next_trip]
+            next_trip += 1
+            messages = iter(trip_events(trip, registry[route_id]))
+            first = next(messages, None)
+            if first is not None:
+                seq += 1
+                heapq.heappush(heap, (first['timestamp'], seq, first, messages))
+
+        ts, _, message, messages = heap[0]
+        following = next(messages, None)
+        if following is None:
+            heapq.heappop(heap)
+        else:
+            seq += 1
+            heapq.heapreplace(heap, (following['timestamp'], seq, following, messages))
+        yield message
+
+
+class SocketTarget:
+    """
+    Send messages to a local socket as newline-delimited JSON
+
+    Each line carries 'sent_wall' (epoch seconds) so the receiver can
+    measure its lag. A slow receiver fills the socket buffers and blocks
+    the sender, which then shows up as replay lag. Lines are flushed every
+    flush_every messages: 1 for paced replays, more at max speed.
+    """
+
+    def __init__(self, host='127.0.0.1', port=9750, flush_every=1):
+        self._sock = socket.create_connection((host, port))
+        self._file = self._sock.makefile('w', encoding='utf-8', buffering=1 << 16)
+        self._flush_every = flush_every
+        self._pending = 0
+
+    def __call__(self, message):
+        self._file.write(json.dumps({**message, 'sent_wall': time.time()}, separators=(',', ':')))
+        self._file.write('\n')
+        self._pending += 1
+        if self._pending >= self._flush_every:
+            self._file.flush()
+            self._pending = 0
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SocketConsumer:
+    """
+    Receive a SocketTarget stream (one connection) and feed a consumer
+
+    Reports messages received and the lag from send to consumed.
+    """
+
+    def __init__(self, consume, host='127.0.0.1', port=0):
+        self.consume = consume
+        self._server = socket.create_server((host, port))
+        self.port = self._server.getsockname()[1]
+        self._thread = None
+        self.result = None
+
+    def serve(self):
+        """Handle one connection until the sender closes it"""
+
+        lag = QuantileSketch()
+        received = 0
+        connection, _ = self._server.accept()
+        with connection, connection.makefile('r', encoding='utf-8') as lines:
+            for line in lines:
+                message = json.loads(line)
+                self.consume(message)
+                received += 1
+                lag.add(time.time() - message['sent_wall'])
+        self._server.close()
+
+        self.result = {'received': received, 'lag_ms': _ms_summary(lag)}
+        return self.result
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve, name='replay-consumer', daemon=True)
+        self._thread.start()
+        return self
+
+    def join(self):
+        self._thread.join()
+        return self.result
+
+
+def _ms_summary(sketch):
+    """Seconds sketch → {p50, p95, p99, max} in ms"""
+    if sketch.count == 0:
+        return None
+    p50, p95, p99 = sketch.quantiles([0.50, 0.95, 0.99])
+    return {'p50': round(p50 * 1000, 2), 'p95': round(p95 * 1000, 2),
+            'p99': round(p99 * 1000, 2), 'max': round(sketch.max * 1000, 2)}
+
+
+def replay(messages, target, config=None):
+    """
+    Deliver messages to a target at a multiple of real time
+
+    Message i is due at start + (its stream time - first stream time) / speed
+    (minus cut idle gaps). Lag is how long after its due time the target
+    finished with it: it grows when the consumer cannot keep up.
+
+    Args:
+        messages (iterable): Timestamp-ordered messages (see replay_stream)
+        target (callable): Called with each message (consumer or SocketTarget)
+        config (dict): Replay settings (see DEFAULT_REPLAY_CONFIG)
+
+    Returns:
+        dict: Messages by type, wall and stream seconds, achieved and
+            scheduled rates, lag and per-message consumer time (ms)
+    """
+
+    config = {**DEFAULT_REPLAY_CONFIG, **(config or {})}
+    speed = config['speed']
+    max_idle = config['max_idle_sec']
+    deadline = config['duration_sec']
+
+    lag = QuantileSketch()
+    busy = QuantileSketch()
+    counts = {'gps': 0, 'door': 0}
+    first_ts = previous_ts = None
+    skipped = 0.0
+    start = time.perf_counter()
+
+    for message in messages:
+        ts = message['timestamp']
+        if first_ts is None:
+            first_ts = previous_ts = ts
+        if max_idle is not None and ts - previous_ts > max_idle:
+            skipped += ts - previous_ts - max_idle
+        previous_ts = ts
+
+        handed = time.perf_counter()
+        if deadline is not None and handed - start >= deadline:
+            break
+
+        due = handed
+        if speed:
+            due = start + (ts - first_ts - skipped) / speed
+            if due - handed > MIN_SLEEP_SEC:
+                time.sleep(due - handed)
+                handed = time.perf_counter()
+
+        target(message)
+        done = time.perf_counter()
+
+        counts[message.get('type', 'gps')] += 1
+        busy.add(done - handed)
+        lag.add(max(done - due, 0.0))
+
+    wall = time.perf_counter() - start
+    total = sum(counts.values())
+    stream = (previous_ts - first_ts - skipped) if total else 0.0
+
+    return {
+        'messages': total,
+        **counts,
+        'speed': speed,
+        'wall_sec': round(wall, 3),
+        'stream_sec': round(stream, 1),
+        'messages_per_sec': round(total / wall) if wall else None,
+        'scheduled_per_sec': round(total / stream * speed) if speed and stream else None,
+        'lag_ms': _ms_summary(lag) if speed else None,
+        'consumer_ms': _ms_summary(busy)
+    }
+
+
+def make_consumer(kind='reassemble', registry=None):
+    """
+    In-process consumer standing in for the onboard/depot live path
+
+    Args:
+        kind (str): 'null' (harness only), 'reassemble' (StreamReassembler)
+            or 'process' (reassemble and run process_single_trip per trip)
+        registry (dict): Route registry
+
+    Returns:
+        tuple: (consume(message), finish() → {'trips': completed trips})
+    """
+
+    if kind not in CONSUMERS:
+        raise ValueError(f"Unknown consumer: {kind} (expected one of {', '.join(CONSUMERS)})")
+
+    if kind == 'null':
+        return (lambda message: None), (lambda: {'trips': 0})
+
+    registry = registry if registry is not None else load_route_registry()
+    on_trip = None
+    if kind == 'process':
+        from pipeline.process_trips import process_single_trip
+        on_trip = lambda trip: process_single_trip(trip, registry[trip['route']])
+
+    reassembler = StreamReassembler(registry, on_trip=on_trip)
+
+    def consume(message):
+        # Door counts ride along in the GPS samples' passenger_load
+        if message.get('type') != 'door':
+            reassembler.ingest(message)
+
+    def finish():
+        reassembler.flush()
+        return {'trips': reassembler.stats['trips_completed']}
+
+    return consume, finish
+
+
+def load_replay_trips(route_ids=None, source='files'):
+    """
+    Trips to replay
+
+    Args:
+        route_ids (list): Routes (default: every route with data / in the registry)
+        source (str): 'files' (route trip files from data_simulator.py) or
+            'simulated' (a fresh generate_week_data week)
+
+    Returns:
+        dict: {route_id: trips}
+    """
+
+    if source == 'simulated':
+        from pipeline.data_simulator import generate_week_data
+        return generate_week_data(route_ids)
+
+    from pipeline.process_trips import load_trip_data
+    from pipeline.route_registry import route_trips_filename
+
+    output_dir = Path(__file__).parent.parent / "output"
+    if route_ids is None:
+        route_ids = [r for r in load_route_registry()
+                     if (output_dir / route_trips_filename(r)).exists()
+                     or (output_dir / route_trips_filename(r)).with_suffix('').exists()]
+
+    return {route_id: load_trip_data(route_id) or [] for route_id in route_ids}
+
+
+def run_replay(route_ids=None, source='files', target=None, consumer='reassemble', config=None):
+    """
+    Replay trips into a consumer in-process or over a socket
+
+    Args:
+        route_ids (list): Routes to replay
+        source (str): 'files' or 'simulated' (see load_replay_trips)
+        target (str): None for in-process, or 'HOST:PORT' of a listening consumer
+        consumer (str): In-process consumer kind (see make_consumer)
+        config (dict): Replay settings (see DEFAULT_REPLAY_CONFIG)
+
+    Returns:
+        dict: replay() report, plus 'trips' completed in-process
+    """
+
+    config = {**DEFAULT_REPLAY_CONFIG, **(config or {})}
+    registry = load_route_registry()
+    messages = replay_stream(load_replay_trips(route_ids, source), registry)
+
+    if target:
+        host, port = target.rsplit(':', 1)
+        with SocketTarget(host, int(port), flush_every=1 if config['speed'] else 256) as send:
+            return replay(messages, send, config)
+
+    consume, finish = make_consumer(consumer, registry)
+    report = replay(messages, consume, config)
+    report.update(finish())
+    return report
+
+
+def print_report(report):
+    print(f"  Messages: {report['messages']:,} ({report['gps']:,} GPS, {report['door']:,} door) "
+          f"in {report['wall_sec']} s")
+    scheduled = f", scheduled {report['scheduled_per_sec']:,} msg/s" if report['scheduled_per_sec'] else ''
+    print(f"  Achieved: {report['messages_per_sec']:,} msg/s{scheduled}")
+    if report['lag_ms']:
+        lag = report['lag_ms']
+        print(f"  Lag: p50 {lag['p50']} ms, p99 {lag['p99']} ms, max {lag['max']} ms")
+    busy = report['consumer_ms']
+    if busy:
+        print(f"  Consumer time per message: p50 {busy['p50']} ms, p99 {busy['p99']} ms, max {busy['max']} ms")
+    if 'trips' in report:
+        print(f"  Trips completed: {report['trips']:,}")
+
+
+# Test function
+def test_replay():
+    """Replay a simulated week in-process and over a local socket"""
+
+    from pipeline.data_simulator import generate_week_data
+
+    print("🧪 Testing Telemetry Replay\n")
+
+    registry = load_route_registry()
+    trips_by_route = generate_week_data(['12', '17'], registry)
+    total_trips = sum(len(trips) for trips in trips_by_route.values())
+
+    # Test 1: Order and completeness at max speed
+    print(f"Test 1: {total_trips} trips, max speed into the reassembler")
+    consume, finish = make_consumer('reassemble', registry)
+    last = [float('-inf')]
+
+    def checked(message):
+        if message['timestamp'] < last[0]:
+            raise AssertionError("stream out of order")
+        last[0] = message['timestamp']
+        consume(message)
+
+    report = replay(replay_stream(trips_by_route, registry), checked, {'speed': None})
+    report.update(finish())
+    print_report(report)
+    print(f"  In timestamp order: True, trips back: {report['trips']}/{total_trips}")
+    print()
+
+    # Test 2: Paced replay, overnight gaps cut to a minute
+    print("Test 2: 600× real time for 2 s, idle gaps cut to 60 s, reassemble + process")
+    consume, finish = make_consumer('process', registry)
+    report = replay(replay_stream(trips_by_route, registry), consume,
+                    {'speed': 600, 'max_idle_sec': 60, 'duration_sec': 2})
+    report.update(finish())
+    print_report(report)
+    print()
+
+    # Test 3: Local socket
+    print("Test 3: Max speed over a local socket into a reassembler")
+    consume, finish = make_consumer('reassemble', registry)
+    receiver = SocketConsumer(consume).start()
+    with SocketTarget('127.0.0.1', receiver.port, flush_every=256) as send:
+        report = replay(replay_stream(trips_by_route, registry), send, {'speed': None})
+    received = receiver.join()
+    print_report(report)
+    print(f"  Received: {received['received']:,}, trips back: {finish()['trips']}/{total_trips}, "
+          f"send→consume lag p99 {received['lag_ms']['p99']} ms")
+
+    print("\n✅ Telemetry Replay Test Complete!")
+
+
+if __name__ == "__main__":
+    test_replay()
@@ -0,0 +1,298 @@
+"""
+Trip Archive
+Columnar on-disk format for raw trips: one memory-mapped NumPy array per
+sample column plus an offsets index, so any trip is a zero-copy slice
+
+Layout of route_<id>_trips/ (next to route_<id>_trips.json):
+    timestamp.npy, speed_kmh.npy, segment.npy, passenger_load.npy
+    lat.npy, lon.npy  only when samples carry coordinates (NaN where missing)
+    offsets.npy   trip i owns samples offsets[i]:offsets[i + 1]
+    trips.json    per-trip fields and passenger_events (no speed_data)
+
+Samples without a segment (coordinates-only devices) are stored with
+segment MISSING_SEGMENT, so the pipeline still map-matches them.
+"""
+
+import json
+import shutil
+import sys
+import time
+from collections.abc import Sequence
+from pathlib import Path
+
+import numpy as np
+
+# Run as a script: add parent directory to path to import pipeline modules
+if not __package__:
+    sys.path.append(str(Path(__file__).parent.parent))
+
+from pipeline.route_registry import load_route_registry, route_trips_filename
+
+# Sample columns in the order gps_filter.speed_data_to_arrays returns them
+ARCHIVE_COLUMNS = (
+    ('timestamp', np.float64),
+    ('speed_kmh', np.float64),
+    ('segment', np.int32),
+    ('passenger_load', np.int32)
+)
+
+# Optional per-sample coordinates, kept apart from the analyzer columns
+COORDINATE_COLUMNS = (
+    ('lat', np.float64),
+    ('lon', np.float64)
+)
+
+# Stored segment of a sample recorded without one (valid segments are >= 0)
+MISSING_SEGMENT = -1
+
+OUTPUT_DIR = Path(__file__).parent.parent / "output"
+
+
+class ArchivedSpeedData(Sequence):
+    """
+    speed_data backed by archive columns
+
+    Columnar code reads .columns directly (zero-copy); code that iterates
+    sample dicts gets them built once on first access. .coordinates holds
+    (lat, lon) columns, or None for an archive without coordinates.
+    """
+
+    def __init__(self, columns, coordinates=None):
+        self.columns = columns
+        self.coordinates = coordinates
+        self._rows = None
+
+    def needs_map_matching(self):
+        """True for samples recorded with coordinates but without segments"""
+        return self.coordinates is not None and len(self) > 0 and self.columns[2][0] == MISSING_SEGMENT
+
+    def _materialize(self):
+        if self._rows is None:
+            names = [name for name, _ in ARCHIVE_COLUMNS]
+            self._rows = [
+                dict(zip(names, values))
+                for values in zip(*(column.tolist() for column in self.columns))
+            ]
+            if self.coordinates is not None:
+                for row, lat, lon in zip(self._rows, *(column.tolist() for column in self.coordinates)):
+                    if lat == lat:  # NaN where the sample had no coordinates
+                        row['lat'], row['lon'] = lat, lon
+        return self._rows
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def __getitem__(self, index):
+        return self._materialize()[index]
+
+    def __iter__(self):
+        return iter(self._materialize())
+
+
+def route_archive_path(route_id, output_dir=None):
+    """Archive directory for a route's raw trips"""
+    filename = route_trips_filename(route_id)
+    return Path(output_dir or OUTPUT_DIR) / filename[:-len('.json')]
+
+
+def write_archive(trips, path):
+    """
+    Write raw trips to a columnar archive
+
+    The archive is written next to its final location and renamed into
+    place, so readers never see a half-written archive.
+
+    Args:
+        trips (list): Raw trips in the simulator format
+        path (str | Path): Archive directory
+
+    Returns:
+        Path: Archive directory
+    """
+
+    path = Path(path)
+    staging = path.with_name(path.name + '.tmp')
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+
+    lengths = np.fromiter((len(t['speed_data']) for t in trips), dtype=np.int64, count=len(trips))
+    offsets = np.zeros(len(trips) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    total = int(offsets[-1])
+
+    defaults = {'segment': MISSING_SEGMENT, 'lat': np.nan, 'lon': np.nan}
+    columns = ARCHIVE_COLUMNS
+    if any('lat' in s for t in trips for s in t['speed_data']):
+        columns += COORDINATE_COLUMNS
+
+    for name, dtype in columns:
+        default = defaults.get(name, 0)
+        column = np.lib.format.open_memmap(staging / f"{name}.npy", mode='w+', dtype=dtype, shape=(total,))
+        column[:] = np.fromiter(
+            (s.get(name, default) for t in trips for s in t['speed_data']), dtype=dtype, count=total
+        )
+        column.flush()
+        del column
+
+    np.save(staging / 'offsets.npy', offsets)
+
+    with open(staging / 'trips.json', 'w') as f:
+        json.dump([{k: v for k, v in t.items() if k != 'speed_data'} for t in trips], f)
+
+    if path.exists():
+        shutil.rmtree(path)
+    staging.rename(path)
+
+    return path
+
+
+def convert_json_trips(json_path, archive_path=None):
+    """
+    Convert a route_<id>_trips.json file to an archive
+
+    Args:
+        json_path (str | Path): Simulator trip file
+        archive_path (str | Path): Archive directory (default: same name without .json)
+
+    Returns:
+        Path: Archive directory
+    """
+
+    json_path = Path(json_path)
+
+    with open(json_path, 'r') as f:
+        trips = json.load(f)
+
+    return write_archive(trips, archive_path or json_path.with_suffix(''))
+
+
+def open_archive(path):
+    """
+    Open an archive with read-only memory-mapped columns
+
+    Args:
+        path (str | Path): Archive directory
+
+    Returns:
+        dict: {'trips': per-trip fields, 'offsets': array,
+               'columns': (timestamps, speeds, segments, loads) read-only
+               views of the memory maps, 'coordinates': (lat, lon) views,
+               or None without coordinates}
+    """
+
+    path = Path(path)
+
+    with open(path / 'trips.json', 'r') as f:
+        trips = json.load(f)
+
+    def mapped(name):
+        # Plain ndarray view of the map: same pages, no memmap subclass overhead
+        return np.asarray(np.load(path / f"{name}.npy", mmap_mode='r'))
+
+    coordinates = None
+    if (path / 'lat.npy').exists():
+        coordinates = tuple(mapped(name) for name, _ in COORDINATE_COLUMNS)
+
+    return {
+        'trips': trips,
+        'offsets': np.load(path / 'offsets.npy'),
+        'columns': tuple(mapped(name) for name, _ in ARCHIVE_COLUMNS),
+        'coordinates': coordinates
+    }
+
+
+def trip_columns(archive, i):
+    """Zero-copy (timestamps, speeds, segments, loads) views of trip i"""
+    start, end = archive['offsets'][i], archive['offsets'][i + 1]
+    return tuple(column[start:end] for column in archive['columns'])
+
+
+def archived_trip(archive, i):
+    """Trip i in the raw trip format, with speed_data backed by the archive"""
+    coordinates = None
+    if archive['coordinates'] is not None:
+        start, end = archive['offsets'][i], archive['offsets'][i + 1]
+        coordinates = tuple(column[start:end] for column in archive['coordinates'])
+    return {**archive['trips'][i], 'speed_data': ArchivedSpeedData(trip_columns(archive, i), coordinates)}
+
+
+def load_archived_trips(path):
+    """All trips of an archive, each with archive-backed speed_data"""
+    archive = open_archive(path)
+    return [archived_trip(archive, i) for i in range(len(archive['trips']))]
+
+
+def benchmark_load(json_path, archive_path):
+    """
+    Compare reload cost of the JSON file and the archive
+
+    Returns:
+        dict: Seconds for JSON load, archive open, a columnar pass over all
+            trips and materializing every sample dict from the archive
+    """
+
+    def timed(fn):
+        start = time.perf_counter()
+        result = fn()
+        return result, time.perf_counter() - start
+
+    trips, json_sec = timed(lambda: json.load(open(json_path)))
+    archived, open_sec = timed(lambda: load_archived_trips(archive_path))
+
+    _, scan_sec = timed(lambda: sum(float(t['speed_data'].columns[1].sum()) for t in archived))
+    _, rows_sec = timed(lambda: sum(len(list(t['speed_data'])) for t in archived))
+
+    json_bytes = Path(json_path).stat().st_size
+    archive_bytes = sum(f.stat().st_size for f in Path(archive_path).iterdir())
+
+    return {
+        'trips': len(trips),
+        'samples': sum(len(t['speed_data']) for t in trips),
+        'json_mb': round(json_bytes / 1e6, 2),
+        'archive_mb': round(archive_bytes / 1e6, 2),
+        'json_load_sec': round(json_sec, 4),
+        'archive_open_sec': round(open_sec, 4),
+        'archive_scan_sec': round(scan_sec, 4),
+        'archive_rows_sec': round(rows_sec, 4)
+    }
+
+
+def main(route_ids=None):
+    """
+    Convert simulator JSON trip files to archives and report load times
+
+    Args:
+        route_ids (list): Routes to convert (default: all with a JSON file)
+    """
+
+    print("\n🗄️  Converting raw trips to columnar archives\n")
+
+    registry = load_route_registry()
+    if route_ids is None:
+        route_ids = [r for r in registry if (OUTPUT_DIR / route_trips_filename(r)).exists()]
+
+    if not route_ids:
+        print("❌ Error: no route trip files found!")
+        print("   Run data_simulator.py first: python3 backend/pipeline/data_simulator.py")
+        return
+
+    for route_id in route_ids:
+        json_path = OUTPUT_DIR / route_trips_filename(route_id)
+        archive_path = convert_json_trips(json_path, route_archive_path(route_id))
+        result = benchmark_load(json_path, archive_path)
+
+        print(f"Route {route_id}: {result['trips']} trips, {result['samples']:,} samples")
+        print(f"  Size: JSON {result['json_mb']} MB → archive {result['archive_mb']} MB")
+        print(f"  JSON load: {result['json_load_sec'] * 1000:.1f} ms, "
+              f"archive open: {result['archive_open_sec'] * 1000:.1f} ms "
+              f"({result['json_load_sec'] / result['archive_open_sec']:.0f}× faster)")
+        print(f"  Columnar pass over all trips: {result['archive_scan_sec'] * 1000:.1f} ms, "
+              f"materializing every sample dict: {result['archive_rows_sec'] * 1000:.1f} ms")
+        print()
+
+    print("✅ Archives written to backend/output/route_<id>_trips/")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or None)
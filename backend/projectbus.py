@@ -0,0 +1,345 @@
+"""
+ProjectBus CLI
+One entry point for the backend: simulate, process, export and bench
+
+    projectbus simulate [ROUTE ...]
+    projectbus process [ROUTE ...] [--filter] [--launches|--load-aware] [--detail=LEVEL]
+                       [--memory-profile] [--checkpoint [--shard-size=N]]
+    projectbus approx [ROUTE ...] [--fractions=0.05,0.1,...] [--seed=N]
+    projectbus export [--dest DIR]
+    projectbus bench [startup|matching|stream|conformance|edge|codec|all]
+    projectbus replay [ROUTE ...] [--speed=N|max] [--target HOST:PORT] [--consumer=KIND]
+    projectbus feed [--port=8765] [--ingest-port=9750]
+
+Subcommands import their modules only when they run, so `--help` and
+light commands do not pay for NumPy or the optional engines.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent
+OUTPUT_DIR = BACKEND_DIR / "output"
+FRONTEND_DATA_DIR = BACKEND_DIR.parent / "frontend" / "public" / "data"
+
+# Output files the dashboard loads by name
+FRONTEND_FILES = (
+    'data_summary.json',
+    'fleet_weekly_stats.json',
+    'scenario_light_load.json',
+    'scenario_heavy_optimal.json',
+    'scenario_heavy_wasteful.json',
+    'worst_offenders.json',
+    'hotspot_index.json'
+)
+
+# Must match acceleration_detector.DETAIL_LEVELS (not imported for --help)
+DETAIL_LEVELS = ('summary', 'segment', 'full')
+
+# Must match telemetry_replay.CONSUMERS
+REPLAY_CONSUMERS = ('null', 'reassemble', 'process')
+
+# Cold-start checks: import time over a bare interpreter, median of runs.
+# 'cli' is argument parsing alone; 'process_trip' is everything a per-message
+# worker imports to call process_single_trip. The checks put the backend on
+# the path themselves, as an installed package would be.
+STARTUP_CHECKS = {
+    'cli': f"import sys; sys.path.insert(0, {str(BACKEND_DIR)!r}); "
+           f"import projectbus; projectbus.build_parser()",
+    'process_trip': f"import sys; sys.path.insert(0, {str(BACKEND_DIR)!r}); "
+                    f"from pipeline.process_trips import process_single_trip"
+}
+
+# Budgets as multiples of the bare interpreter's start, so the gate scales with
+# the machine. Measured baseline: about 1.7x for both (2.6x worst case over
+# repeated runs); the budgets leave roughly 2x headroom on the typical run.
+STARTUP_BUDGET_RATIO = {
+    'cli': 3.5,
+    'process_trip': 4.0
+}
+
+# Modules that must not load during a cold start
+HEAVY_MODULES = ('numpy', 'concurrent.futures.process', 'multiprocessing')
+
+
+def cmd_simulate(args):
+    from pipeline.data_simulator import main
+    main(args.routes or None)
+
+
+def cmd_process(args):
+    from pipeline.process_trips import main
+    main(
+        args.routes or None,
+        gps_filter={} if args.filter else None,
+        launches=args.launches,
+        detail=args.detail,
+        memory_profile={} if args.memory_profile else None,
+        checkpoint={'shard_size': args.shard_size} if args.checkpoint else None,
+        load_aware=args.load_aware
+    )
+
+
+def sample_fractions(value):
+    """--fractions: comma-separated fractions in (0, 1]"""
+    try:
+        fractions = sorted(float(f) for f in value.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError("fractions must be numbers, e.g. 0.05,0.25")
+    if not fractions or fractions[0] <= 0 or fractions[-1] > 1:
+        raise argparse.ArgumentTypeError("fractions must be in (0, 1]")
+    return fractions
+
+
+def cmd_approx(args):
+    from pipeline.approximate_stats import main
+    if main(args.routes or None, fractions=args.fractions, seed=args.seed) is None:
+        return 1
+
+
+def cmd_export(args):
+    """Copy the dashboard JSON files to the frontend"""
+
+    import shutil
+
+    dest = Path(args.dest)
+    missing = [name for name in FRONTEND_FILES if not (OUTPUT_DIR / name).exists()]
+    if missing:
+        print(f"❌ Error: missing outputs: {', '.join(missing)}")
+        print("   Run the pipeline first: projectbus process")
+        return 1
+
+    dest.mkdir(parents=True, exist_ok=True)
+    for name in FRONTEND_FILES:
+        shutil.copy2(OUTPUT_DIR / name, dest / name)
+        print(f"✅ {name} → {dest}")
+    return 0
+
+
+def measure_startup(runs=7):
+    """
+    Cold-start import time of each STARTUP_CHECKS entry in fresh interpreters
+
+    Returns:
+        dict: {check: {'ms': median ms over a bare interpreter, 'ratio': ms
+            as a multiple of the bare start, 'budget_ratio', 'ok',
+            'heavy': heavy modules that were imported}}
+    """
+
+    import statistics
+    import subprocess
+    import time
+
+    def timed(code):
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', code], check=True)
+            samples.append(time.perf_counter() - start)
+        return statistics.median(samples) * 1000
+
+    def imported_modules(code):
+        done = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                              capture_output=True, text=True, check=True)
+        return {line.rsplit('|', 1)[-1].strip() for line in done.stderr.splitlines()}
+
+    bare_ms = timed('pass')
+    results = {}
+
+    for name, code in STARTUP_CHECKS.items():
+        overhead = max(timed(code) - bare_ms, 0)
+        ratio = overhead / bare_ms
+        heavy = [module for module in HEAVY_MODULES if module in imported_modules(code)]
+        results[name] = {
+            'ms': round(overhead, 1),
+            'ratio': round(ratio, 2),
+            'budget_ratio': STARTUP_BUDGET_RATIO[name],
+            'ok': ratio <= STARTUP_BUDGET_RATIO[name] and not heavy,
+            'heavy': heavy
+        }
+
+    return results
+
+
+def cmd_bench(args):
+    """Run the benchmark suite; non-zero exit if a startup budget is exceeded
+    or an engine disagrees with the reference"""
+
+    suites = ('startup', 'matching', 'stream', 'conformance', 'edge', 'codec') if args.suite == 'all' else (args.suite,)
+    status = 0
+
+    if 'startup' in suites:
+        print("\n⏱️  Cold start (import time over a bare interpreter)\n")
+        for name, result in measure_startup(args.runs).items():
+            mark = '✅' if result['ok'] else '❌'
+            heavy = f", loaded {', '.join(result['heavy'])}" if result['heavy'] else ''
+            print(f"  {mark} {name}: {result['ms']} ms, {result['ratio']}x bare interpreter "
+                  f"(budget {result['budget_ratio']}x){heavy}")
+            if not result['ok']:
+                status = 1
+
+    if 'matching' in suites:
+        from pipeline.map_matcher import benchmark_matching
+        result = benchmark_matching()
+        print(f"\n🗺️  Map matching ({result['routes']} routes)\n")
+        print(f"  Index build: {result['index_build_sec'] * 1000:.0f} ms")
+        print(f"  Batched: {result['batch_points_per_sec']:,} points/s, "
+              f"streaming: {result['stream_points_per_sec']:,} points/s")
+
+    if 'stream' in suites:
+        from pipeline.stream_reassembly import benchmark_reassembly
+        result = benchmark_reassembly()
+        print(f"\n📡 Stream reassembly ({result['messages']:,} messages)\n")
+        print(f"  {result['messages_per_sec']:,} messages/s, {result['trips']} trips")
+
+    if 'edge' in suites:
+        from algorithms.edge_engine import benchmark_edge_engine
+        result = benchmark_edge_engine()
+        print(f"\n📟 Edge engine ({result['samples']:,} samples, {result['trips']} trips)\n")
+        print(f"  {result['edge_ns_per_sample']:,} ns/sample vs {result['reference_ns_per_sample']:,} ns "
+              f"reference ({result['speedup']}x)")
+        print(f"  Engine buffers: {result['engine_bytes']:,} bytes; peak while streaming "
+              f"{result['trip_samples']} samples: {result['edge_stream_peak_bytes']:,} bytes "
+              f"(reference {result['reference_peak_bytes']:,})")
+
+    if 'codec' in suites:
+        from pipeline.telemetry_codec import benchmark_codec
+        result = benchmark_codec()
+        print(f"\n📦 Telemetry codec ({result['samples']:,} samples, "
+              f"{result['frame_samples']}-sample frames)\n")
+        print("  Bytes/sample: " + ", ".join(f"{name} {size}" for name, size in result['bytes_per_sample'].items()))
+        print("  Decode: " + ", ".join(
+            f"{name} {rate:,}/s" for name, rate in result['decode_samples_per_sec'].items()
+        ))
+        print(f"  Encode: {result['encode_samples_per_sec']:,} samples/s")
+
+    if 'conformance' in suites:
+        from pipeline.conformance import print_conformance, run_conformance
+        result = run_conformance()
+        print_conformance(result)
+        if not result['ok']:
+            status = 1
+
+    print()
+    return status
+
+
+def replay_speed(value):
+    """--speed: a positive multiple of real time, or 'max'"""
+    if value == 'max':
+        return None
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+def cmd_replay(args):
+    """Replay trips as live telemetry and report rate and lag"""
+
+    from pipeline.telemetry_replay import print_report, run_replay
+
+    speed = 'max' if args.speed is None else f"{args.speed:g}×"
+    where = args.target or f"in-process {args.consumer} consumer"
+    print(f"\n📡 Replaying {args.source} trips at {speed} into {where}\n")
+
+    report = run_replay(
+        args.routes or None,
+        source=args.source,
+        target=args.target,
+        consumer=args.consumer,
+        config={'speed': args.speed, 'max_idle_sec': args.max_idle, 'duration_sec': args.duration}
+    )
+    if not report['messages']:
+        print("❌ Error: no trips to replay")
+        print("   Run the simulator first (projectbus simulate) or use --source simulated")
+        return 1
+
+    print_report(report)
+    print()
+
+
+def cmd_feed(args):
+    """Serve the live driver-display feed until interrupted"""
+
+    from pipeline.driver_feed import run_feed
+    run_feed(args.host, args.port, args.ingest_port, {'min_interval_sec': args.min_interval})
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='projectbus', description="ProjectBus backend pipeline")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    simulate = commands.add_parser('simulate', help="Generate a simulated week of trips")
+    simulate.add_argument('routes', nargs='*', help="Route numbers (default: all registered)")
+    simulate.set_defaults(func=cmd_simulate)
+
+    process = commands.add_parser('process', help="Run the 4 algorithms and write dashboard outputs")
+    process.add_argument('routes', nargs='*', help="Route numbers (default: all with simulated data)")
+    process.add_argument('--filter', action='store_true', help="Smooth GPS speeds first")
+    engine = process.add_mutually_exclusive_group()
+    engine.add_argument('--launches', action='store_true', help="Use the launch detector")
+    engine.add_argument('--load-aware', action='store_true',
+                        help="Charge each acceleration event to the load on board (Load × Accel matrices)")
+    process.add_argument('--detail', choices=DETAIL_LEVELS, default='segment',
+                         help="Acceleration output detail (default: segment)")
+    process.add_argument('--memory-profile', action='store_true',
+                         help="Measure memory per stage (tracemalloc) and write memory_timeline.json")
+    process.add_argument('--checkpoint', action='store_true',
+                         help="Commit progress per shard; rerun the same command to resume")
+    process.add_argument('--shard-size', type=int, default=100, help="Trips per checkpoint shard")
+    process.set_defaults(func=cmd_process)
+
+    # Default must match approximate_stats.DEFAULT_FRACTIONS
+    approx = commands.add_parser('approx', help="Fleet statistics with error bounds from a stratified sample")
+    approx.add_argument('routes', nargs='*', help="Route numbers (default: all with simulated data)")
+    approx.add_argument('--fractions', type=sample_fractions, default=[0.05, 0.1, 0.25, 0.5, 1.0],
+                        help="Sample fractions to report at (default: 0.05,0.1,0.25,0.5,1)")
+    approx.add_argument('--seed', type=int, default=0, help="Sampling seed (default: 0)")
+    approx.set_defaults(func=cmd_approx)
+
+    export = commands.add_parser('export', help="Copy dashboard outputs to the frontend")
+    export.add_argument('--dest', default=str(FRONTEND_DATA_DIR),
+                        help="Target directory (default: frontend/public/data)")
+    export.set_defaults(func=cmd_export)
+
+    bench = commands.add_parser('bench', help="Benchmarks, including cold-start budgets")
+    bench.add_argument('suite', nargs='?', default='startup', choices=('startup', 'matching', 'stream', 'conformance', 'edge', 'codec', 'all'))
+    bench.add_argument('--runs', type=int, default=7, help="Interpreter launches per startup check")
+    bench.set_defaults(func=cmd_bench)
+
+    replay = commands.add_parser('replay', help="Replay trips as live telemetry for load testing")
+    replay.add_argument('routes', nargs='*', help="Route numbers (default: all with data)")
+    replay.add_argument('--source', choices=('files', 'simulated'), default='files',
+                        help="Route trip files (default) or a freshly simulated week")
+    replay.add_argument('--speed', type=replay_speed, default=100.0,
+                        help="Multiple of real time, or 'max' (default: 100)")
+    replay.add_argument('--target', metavar='HOST:PORT',
+                        help="Send NDJSON to a listening socket instead of an in-process consumer")
+    replay.add_argument('--consumer', choices=REPLAY_CONSUMERS, default='reassemble',
+                        help="In-process consumer (default: reassemble)")
+    replay.add_argument('--max-idle', type=float, metavar='SEC',
+                        help="Cut stream gaps longer than SEC (e.g. overnight)")
+    replay.add_argument('--duration', type=float, metavar='SEC', help="Stop after SEC wall seconds")
+    replay.set_defaults(func=cmd_replay)
+
+    # Defaults must match driver_feed.DEFAULT_HTTP_PORT / DEFAULT_INGEST_PORT / DEFAULT_FEED_CONFIG
+    feed = commands.add_parser('feed', help="Push live load/acceleration/waste deltas to driver displays (SSE)")
+    feed.add_argument('--host', default='127.0.0.1', help="Listen address (default: localhost only)")
+    feed.add_argument('--port', type=int, default=8765, help="SSE port (default: 8765)")
+    feed.add_argument('--ingest-port', type=int, default=9750, help="Telemetry NDJSON port (default: 9750)")
+    feed.add_argument('--min-interval', type=float, default=0.05, metavar='SEC',
+                      help="Minimum time between deltas per bus (default: 0.05)")
+    feed.set_defaults(func=cmd_feed)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())